@@ -0,0 +1,78 @@
+import multiprocessing
+import resource
+import tempfile
+import time
+from typing import Dict, List
+
+import numpy as np
+import lancedb
+
+from ark_engine.bench.search import load_vectors, _latency_row
+from ark_engine.core.utils import current_rss_mb
+
+BUILD_VARIANTS = ("lists+pandas", "arrow")
+
+
+def _peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _build_variant(variant: str, lancedb_uri: str, out_dir: str) -> Dict[str, float]:
+    """Запис таблиці 'vectors' одним зі шляхів; виконується в окремому процесі."""
+    arrow, vectors = load_vectors(lancedb_uri)
+    texts = arrow.column("text").to_pylist()
+    sources = arrow.column("source").to_pylist()
+    ids = arrow.column("id").to_pylist()
+    del arrow
+    baseline = current_rss_mb()
+
+    t0 = time.perf_counter()
+    if variant == "lists+pandas":
+        # Попередній шлях: embeddings.tolist() → pandas DataFrame
+        import pandas as pd
+        data = pd.DataFrame({"vector": vectors.tolist(), "text": texts, "source": sources, "id": ids})
+    else:
+        from ark_engine.core.builder import ArkBuilder
+        data = ArkBuilder._frame(vectors, texts, sources, ids)
+    lancedb.connect(out_dir).create_table("vectors", data=data)
+    elapsed = time.perf_counter() - t0
+
+    return {"seconds": elapsed, "extra_peak_mb": max(0.0, _peak_rss_mb() - baseline)}
+
+
+def benchmark_build(lancedb_uri: str) -> List[Dict[str, object]]:
+    """Час і додаткова пікова пам'ять запису таблиці векторів для кожного шляху."""
+    rows = []
+    ctx = multiprocessing.get_context("spawn")
+    for variant in BUILD_VARIANTS:
+        with tempfile.TemporaryDirectory(prefix="ark_bench_") as tmp, ctx.Pool(1) as pool:
+            result = pool.apply(_build_variant, (variant, lancedb_uri, tmp))
+        rows.append({"stage": "build", "path": variant, **result})
+    return rows
+
+
+def benchmark_search_path(lancedb_uri: str, queries: np.ndarray, k: int = 10) -> List[Dict[str, object]]:
+    """Латентність запиту: to_pandas() + iterrows() проти проекції колонок і читання з Arrow."""
+    from ark_engine.core.rag import RESULT_COLUMNS
+
+    table = lancedb.connect(lancedb_uri).open_table("vectors")
+
+    def legacy(q):
+        df = table.search(q.tolist()).metric("cosine").limit(k).to_pandas()
+        return [(row.get("text", ""), max(0.0, 1.0 - float(row.get("_distance", 0.0)))) for _, row in df.iterrows()]
+
+    def arrow(q):
+        hits = table.search(q).metric("cosine").select(RESULT_COLUMNS).limit(k).to_arrow()
+        scores = np.maximum(0.0, 1.0 - hits.column("_distance").to_numpy())
+        return list(zip(hits.column("text").to_pylist(), scores.tolist()))
+
+    rows = []
+    for name, fn in (("to_pandas+iterrows", legacy), ("arrow projection", arrow)):
+        fn(queries[0])  # прогрів
+        latencies = []
+        for q in queries:
+            t0 = time.perf_counter()
+            fn(q)
+            latencies.append((time.perf_counter() - t0) * 1000)
+        rows.append({"stage": "search", "path": name, **_latency_row(np.asarray(latencies))})
+    return rows
@@ -0,0 +1,57 @@
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from ark_engine.core.embedding_engine import EmbeddingEngine, load_embedding_model
+
+
+def benchmark_embedding(
+    texts: List[str],
+    model_name: str = 'all-MiniLM-L6-v2',
+    workers: List[int] = (1,),
+    torch_threads: Optional[int] = None,
+) -> List[Dict[str, float]]:
+    """
+    Порівнює попередній шлях Embedder (один SentenceTransformer.encode з
+    розміром батчу за замовчуванням і вхідним порядком) з EmbeddingEngine
+    для кожної кількості воркерів. Повертає рядки з chunks/s та паритетом.
+    """
+    baseline_model = load_embedding_model(model_name)
+    baseline_model.encode(texts[:8], show_progress_bar=False)  # прогрів
+
+    t0 = time.perf_counter()
+    reference = np.asarray(baseline_model.encode(texts, show_progress_bar=False), dtype=np.float32)
+    baseline_s = time.perf_counter() - t0
+    rows = [{
+        "engine": "SentenceTransformer.encode",
+        "workers": 1,
+        "seconds": baseline_s,
+        "chunks_per_s": len(texts) / baseline_s,
+        "speedup": 1.0,
+        "min_cosine": 1.0,
+    }]
+
+    for n in workers:
+        engine = EmbeddingEngine(model_name, workers=n, torch_threads=torch_threads)
+        try:
+            # Прогрів: старт пулу та завантаження моделей не входять у вимір
+            engine.encode(texts[:max(8, n)])
+            t0 = time.perf_counter()
+            vectors = engine.encode(texts)
+            elapsed = time.perf_counter() - t0
+        finally:
+            engine.close()
+
+        cosine = np.sum(vectors * reference, axis=1) / (
+            np.linalg.norm(vectors, axis=1) * np.linalg.norm(reference, axis=1) + 1e-12
+        )
+        rows.append({
+            "engine": "EmbeddingEngine",
+            "workers": n,
+            "seconds": elapsed,
+            "chunks_per_s": len(texts) / elapsed,
+            "speedup": baseline_s / elapsed,
+            "min_cosine": float(cosine.min()),
+        })
+    return rows
@@ -0,0 +1,99 @@
+import gc
+import queue
+import threading
+import time
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from ark_engine.core.llm import LLM_THREADS, LLMEngine, load_instances
+
+
+def time_to_first_token(engine: LLMEngine, query: str, context: str) -> float:
+    """Мілісекунди до першого токена відповіді; генерація далі не продовжується."""
+    t0 = time.perf_counter()
+    stream = engine.generate_stream(query, context)
+    try:
+        next(stream, None)
+        return (time.perf_counter() - t0) * 1000
+    finally:
+        stream.close()
+
+
+def benchmark_ttft(engine: LLMEngine, requests: List[Tuple[str, str]]) -> List[Dict[str, object]]:
+    """
+    TTFT без KV системного промпту (контекст скидається перед кожним запитом —
+    як перший запит після рестарту) і з відновленням збереженого префікса.
+    `requests` — пари (питання, документи).
+    """
+    engine.load_model()
+    prefix_cache = engine.prefix_cache
+    rows = []
+    try:
+        for label, cached in (("full prefill", False), ("system prompt KV", True)):
+            engine.prefix_cache = cached
+            latencies = []
+            for query, context in requests:
+                engine.clear_context()
+                latencies.append(time_to_first_token(engine, query, context))
+            lat = np.array(latencies)
+            rows.append({"mode": label, "requests": len(lat), "mean_ms": float(lat.mean()),
+                         "p50_ms": float(np.percentile(lat, 50)), "p95_ms": float(np.percentile(lat, 95))})
+    finally:
+        engine.prefix_cache = prefix_cache
+    rows[1]["speedup"] = rows[0]["mean_ms"] / rows[1]["mean_ms"] if rows[1]["mean_ms"] else 0.0
+    rows[0]["speedup"] = 1.0
+    return rows
+
+
+def benchmark_instances(engine: LLMEngine, requests: List[Tuple[str, str]], ks: Sequence[int],
+                        max_tokens: int = 128, threads: int = LLM_THREADS) -> List[Dict[str, object]]:
+    """
+    Сумарна пропускна здатність (токенів/с) пулу з K екземплярів моделі, що ділять
+    `threads` ядер порівну. Кожен екземпляр обслуговує свій потік запитів зі спільної
+    черги — як слоти LLMScheduler під навантаженням кількох користувачів.
+    """
+    model_path = engine._find_model()
+    rows = []
+    for k in ks:
+        models = load_instances(model_path, k, threads)
+        jobs = queue.Queue()
+        for request in requests:
+            jobs.put(request)
+        latencies, tokens = [], []
+        lock = threading.Lock()
+
+        def worker(model):
+            while True:
+                try:
+                    query, context = jobs.get_nowait()
+                except queue.Empty:
+                    return
+                model.reset()
+                t0 = time.perf_counter()
+                out = model.create_chat_completion(messages=engine._messages(query, context),
+                                                   max_tokens=max_tokens, temperature=0.0)
+                with lock:
+                    latencies.append(time.perf_counter() - t0)
+                    tokens.append(out["usage"]["completion_tokens"])
+
+        t0 = time.perf_counter()
+        workers = [threading.Thread(target=worker, args=(m,)) for m in models]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        elapsed = time.perf_counter() - t0
+
+        lat = np.array(latencies)
+        rows.append({"instances": k, "threads_each": max(1, threads // k), "requests": len(lat),
+                     "tokens_per_s": sum(tokens) / elapsed if elapsed else 0.0,
+                     "p50_s": float(np.percentile(lat, 50)), "p95_s": float(np.percentile(lat, 95))})
+        # Наступна конфігурація не повинна ділити пам'ять і ядра з цією
+        del models
+        gc.collect()
+
+    best = max(rows, key=lambda r: r["tokens_per_s"])
+    for row in rows:
+        row["best"] = "*" if row is best else ""
+    return rows
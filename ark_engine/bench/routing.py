@@ -0,0 +1,40 @@
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from ark_engine.store.federated import FederatedSearch
+
+
+def benchmark_routing(federated: FederatedSearch, queries: List[str], k: int = 10,
+                      top_ms: List[int] = (1, 2, 4, 8)) -> List[Dict[str, object]]:
+    """
+    Recall@k маршрутизованого федеративного пошуку відносно пошуку по всіх модулях
+    (частка глобального top-k, яку знаходить пошук лише в top-M модулях) і скільки модулів відсічено.
+    """
+    def run(fn):
+        found, latencies = [], []
+        for q in queries:
+            t0 = time.perf_counter()
+            found.append({(h.module_id, h.text) for h in fn(q)})
+            latencies.append((time.perf_counter() - t0) * 1000)
+        return found, float(np.mean(latencies))
+
+    truth, full_ms = run(lambda q: federated.search(q, top_k=k))
+    modules = len(federated.index.list_packages())
+    rows = [{"top_m": "all", "modules": modules, "searched": float(modules), "pruned": 0.0,
+             "recall": 1.0, "mean_ms": full_ms}]
+
+    for top_m in top_ms:
+        searched = []
+
+        def routed(q):
+            module_ids, stats = federated.route(q, top_m)
+            searched.append(stats.searched)
+            return federated.search(q, top_k=k, module_ids=module_ids)
+
+        found, mean_ms = run(routed)
+        recall = np.mean([len(f & t) / len(t) for f, t in zip(found, truth) if t]) if any(truth) else 1.0
+        rows.append({"top_m": top_m, "modules": modules, "searched": float(np.mean(searched)),
+                     "pruned": float(modules - np.mean(searched)), "recall": float(recall), "mean_ms": mean_ms})
+    return rows
@@ -0,0 +1,183 @@
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pyarrow as pa
+import lancedb
+
+from ark_engine.core.quantization import QuantizedVectorWriter, QuantizedVectors
+from ark_engine.core.shards import DEFAULT_TABLE, ShardPool, merge_top_k, split_by_shard
+from ark_engine.core.vector_index import AnnIndexConfig, apply_search_params
+
+
+def _dir_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file()) if path.exists() else 0
+
+
+def exact_top_k(vectors: np.ndarray, ids: np.ndarray, queries: np.ndarray, k: int) -> List[set]:
+    """Точний top-k за косинусом (ground truth): повний перебір у NumPy."""
+    vectors = vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+    queries = queries / np.clip(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12, None)
+    truth = []
+    for q in queries:
+        scores = vectors @ q
+        top = np.argpartition(-scores, min(k, len(scores)) - 1)[:k]
+        truth.append(set(ids[top].tolist()))
+    return truth
+
+
+def load_vectors(lancedb_uri: str):
+    """Таблиця 'vectors' модуля (або всі її шарди) як Arrow та float32 матриця її векторів."""
+    db = lancedb.connect(lancedb_uri)
+    names = [n for n in db.table_names() if n == DEFAULT_TABLE or n.startswith(DEFAULT_TABLE + "_")]
+    arrow = pa.concat_tables([db.open_table(n).to_arrow() for n in sorted(names)])
+    vectors = np.asarray(arrow.column("vector").combine_chunks().flatten(), dtype=np.float32)
+    return arrow, vectors.reshape(arrow.num_rows, -1)
+
+
+def _latency_row(lat: np.ndarray) -> Dict[str, float]:
+    return {
+        "p50_ms": float(np.percentile(lat, 50)),
+        "p95_ms": float(np.percentile(lat, 95)),
+        "p99_ms": float(np.percentile(lat, 99)),
+    }
+
+
+def _run_queries(table, queries: np.ndarray, k: int, params: Dict[str, Optional[int]], truth: List[set]):
+    latencies, hits = [], 0
+    # Прогрів: відкриття файлів індексу не входить у вимір
+    apply_search_params(table.search(queries[0].tolist()).metric("cosine").limit(k), params).to_pandas()
+    for q, expected in zip(queries, truth):
+        t0 = time.perf_counter()
+        query = apply_search_params(table.search(q.tolist()).metric("cosine").limit(k), params)
+        found = query.select(["id"]).to_arrow().column("id").to_pylist()
+        latencies.append((time.perf_counter() - t0) * 1000)
+        hits += len(expected.intersection(found))
+    return hits / max(1, sum(len(t) for t in truth)), np.asarray(latencies)
+
+
+def benchmark_search(
+    lancedb_uri: str,
+    queries: np.ndarray,
+    k: int = 10,
+    index_configs: Sequence[AnnIndexConfig] = (AnnIndexConfig(min_rows=0),),
+    nprobes: Sequence[int] = (10, 20, 50),
+    refine_factors: Sequence[Optional[int]] = (None, 10),
+) -> List[Dict[str, object]]:
+    """
+    Sweep параметрів векторного пошуку на копії таблиці 'vectors' модуля.
+    Перший рядок — brute force без індексу; далі для кожної конфігурації індексу
+    та кожної пари (nprobes, refine_factor): recall@k відносно точного top-k,
+    p50/p95/p99 латентності запиту та розмір індексу на диску.
+    """
+    arrow, vectors = load_vectors(lancedb_uri)
+    truth = exact_top_k(vectors, arrow.column("id").to_numpy(), queries, k)
+    dim = vectors.shape[1]
+    del vectors
+
+    def row(index: str, params: Dict[str, Optional[int]], recall: float, lat: np.ndarray, size: int):
+        return {
+            "index": index,
+            "nprobes": params.get("nprobes") or "-",
+            "refine_factor": params.get("refine_factor") or "-",
+            f"recall@{k}": recall,
+            **_latency_row(lat),
+            "index_mb": size / 1e6,
+        }
+
+    rows = []
+    with tempfile.TemporaryDirectory(prefix="ark_bench_") as tmp:
+        # Модуль не чіпаємо: кожна конфігурація — окрема копія таблиці без індексу модуля
+        db = lancedb.connect(tmp)
+        flat = db.create_table("flat", data=arrow)
+        recall, lat = _run_queries(flat, queries, k, {}, truth)
+        rows.append(row("flat", {}, recall, lat, 0))
+
+        for i, config in enumerate(index_configs):
+            table = db.create_table(f"ann_{i}", data=arrow)
+            # Індекс будуємо незалежно від порогу min_rows модуля
+            resolved = config.resolve(arrow.num_rows, dim)
+            table.create_index(metric="cosine", vector_column_name="vector",
+                               index_type=config.index_type, replace=True, **resolved)
+            size = _dir_size(Path(tmp) / f"ann_{i}.lance" / "_indices")
+            name = f"{config.index_type} p={resolved['num_partitions']} sv={resolved['num_sub_vectors']}"
+
+            for n in nprobes:
+                for refine in refine_factors:
+                    params = {"nprobes": n, "refine_factor": refine}
+                    recall, lat = _run_queries(table, queries, k, params, truth)
+                    rows.append(row(name, params, recall, lat, size))
+            db.drop_table(f"ann_{i}")
+    return rows
+
+
+def benchmark_shards(lancedb_uri: str, queries: np.ndarray, k: int = 10,
+                     shard_counts: Sequence[int] = (1, 2, 4, 8)) -> List[Dict[str, object]]:
+    """
+    Латентність точного пошуку, коли таблиця розкладена на N шардів, які
+    скануються паралельно (як у ArkRAG) з злиттям top-k.
+    """
+    arrow, _ = load_vectors(lancedb_uri)
+    rows = []
+    with tempfile.TemporaryDirectory(prefix="ark_bench_") as tmp:
+        db = lancedb.connect(tmp)
+        for n in shard_counts:
+            tables = [db.create_table(f"s{n}_{name}", data=part)
+                      for name, part in split_by_shard(arrow, n).items() if part.num_rows]
+
+            def search(q):
+                hits = ShardPool().map(
+                    lambda t: t.search(q).metric("cosine").select(["id"]).limit(k).to_arrow(), tables
+                )
+                return merge_top_k(hits, k)
+
+            search(queries[0])  # прогрів
+            latencies = []
+            for q in queries:
+                t0 = time.perf_counter()
+                search(q)
+                latencies.append((time.perf_counter() - t0) * 1000)
+            rows.append({"shards": n, "rows_per_shard": arrow.num_rows // n, **_latency_row(np.asarray(latencies))})
+    return rows
+
+
+def benchmark_quantization(
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    k: int = 10,
+    kinds: Sequence[str] = ("float16", "int8", "binary"),
+    rescore_factors: Sequence[int] = (1, 4, 10),
+) -> List[Dict[str, object]]:
+    """
+    Recall@k та латентність QuantizedVectors відносно точного float32 top-k
+    для кожного способу зберігання; rescore_factor варіюється лише для binary.
+    """
+    ids = np.arange(len(vectors))
+    truth = exact_top_k(vectors, ids, queries, k)
+    full_bytes = vectors.astype(np.float32).nbytes
+
+    rows = []
+    with tempfile.TemporaryDirectory(prefix="ark_bench_") as tmp:
+        for kind in kinds:
+            writer = QuantizedVectorWriter(Path(tmp) / kind, kind)
+            writer.add(vectors)
+            store = QuantizedVectors(writer.finalize()["uri"])
+            for factor in (rescore_factors if kind == "binary" else rescore_factors[:1]):
+                store.search(queries[0], k, factor)  # прогрів
+                latencies, hits = [], 0
+                for q, expected in zip(queries, truth):
+                    t0 = time.perf_counter()
+                    positions, _ = store.search(q, k, factor)
+                    latencies.append((time.perf_counter() - t0) * 1000)
+                    hits += len(expected.intersection(positions.tolist()))
+                rows.append({
+                    "storage": kind,
+                    "rescore_factor": factor if kind == "binary" else "-",
+                    f"recall@{k}": hits / max(1, sum(len(t) for t in truth)),
+                    **_latency_row(np.asarray(latencies)),
+                    "mb": store.nbytes / 1e6,
+                    "vs_float32": full_bytes / max(1, store.nbytes),
+                })
+    return rows
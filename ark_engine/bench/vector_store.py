@@ -0,0 +1,70 @@
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+import numpy as np
+import lancedb
+
+from ark_engine.bench.search import _latency_row
+from ark_engine.core.builder import ArkBuilder
+from ark_engine.core.vector_store import NumpyVectorStore
+
+
+def _time_queries(fn, queries: np.ndarray) -> np.ndarray:
+    fn(queries[0])  # прогрів
+    latencies = []
+    for q in queries:
+        t0 = time.perf_counter()
+        fn(q)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return np.asarray(latencies)
+
+
+def benchmark_backends(
+    sizes: Sequence[int] = (1_000, 5_000, 20_000, 50_000, 100_000),
+    dim: int = 384,
+    n_queries: int = 100,
+    k: int = 10,
+    batch: int = 32,
+) -> List[Dict[str, object]]:
+    """
+    Латентність точного пошуку LanceDB (brute force) проти NumpyVectorStore
+    (mmap .npy) на синтетичних нормованих векторах різної кількості рядків.
+    Для NumPy також міряється пакетний запит (`batch` запитів одним matmul).
+    """
+    rng = np.random.default_rng(0)
+    rows = []
+    for size in sizes:
+        vectors = rng.normal(size=(size, dim)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        queries = vectors[rng.choice(size, size=min(n_queries, size), replace=False)]
+
+        with tempfile.TemporaryDirectory(prefix="ark_bench_") as tmp:
+            ids = list(range(size))
+            table = lancedb.connect(tmp).create_table(
+                "vectors", data=ArkBuilder._frame(vectors, [""] * size, [""] * size, ids)
+            )
+            lance = _time_queries(
+                lambda q: table.search(q).metric("cosine").select(["id"]).limit(k).to_arrow(), queries
+            )
+
+            store = NumpyVectorStore.load(NumpyVectorStore.save(Path(tmp) / "npvec", vectors)["uri"])
+            numpy_single = _time_queries(lambda q: store.search(q, k), queries)
+            t0 = time.perf_counter()
+            for i in range(0, len(queries), batch):
+                store.search_batch(queries[i:i + batch], k)
+            per_query_batched = (time.perf_counter() - t0) * 1000 / len(queries)
+
+        lance_p50 = float(np.percentile(lance, 50))
+        numpy_p50 = float(np.percentile(numpy_single, 50))
+        rows.append({
+            "rows": size,
+            "lancedb_p50_ms": lance_p50,
+            "lancedb_p95_ms": _latency_row(lance)["p95_ms"],
+            "numpy_p50_ms": numpy_p50,
+            "numpy_p95_ms": _latency_row(numpy_single)["p95_ms"],
+            f"numpy_batch{batch}_ms_per_query": per_query_batched,
+            "faster": "numpy" if numpy_p50 < lance_p50 else "lancedb",
+        })
+    return rows
@@ -0,0 +1,258 @@
+import json
+import typer
+from pathlib import Path
+from typing import List, Optional
+from rich.console import Console
+from rich.table import Table
+
+from ark_engine.core.loader import ArkLoader
+
+bench_app = typer.Typer(help="Performance benchmarks")
+console = Console()
+
+def _load_docs(module: Path, limit: int) -> List[str]:
+    docs = ArkLoader.read_raw_data(module).get("content", {}).get("docs", [])
+    if not docs:
+        console.print(f"[red]Module {module} has no docs to benchmark with.[/red]")
+        raise typer.Exit(1)
+    return docs[:limit]
+
+def _print_rows(title: str, rows: List[dict], json_out: Optional[Path]):
+    table = Table(title=title)
+    for column in rows[0]:
+        table.add_column(column)
+    for row in rows:
+        table.add_row(*[f"{v:.4g}" if isinstance(v, float) else str(v) for v in row.values()])
+    console.print(table)
+
+    if json_out:
+        json_out.write_text(json.dumps(rows, ensure_ascii=False, indent=2), encoding="utf-8")
+        console.print(f"[dim]Saved to {json_out}[/dim]")
+
+@bench_app.command("embed")
+def bench_embed(
+    module: Path = typer.Argument(..., help="Built .ark.json whose docs are used as input"),
+    limit: int = typer.Option(2000, "--limit", "-n", help="Number of chunks to embed"),
+    workers: List[int] = typer.Option([1], "--workers", "-w", help="Worker counts to try (repeatable)"),
+    torch_threads: Optional[int] = typer.Option(None, "--torch-threads", help="Torch threads per worker"),
+    json_out: Optional[Path] = typer.Option(None, "--json", help="Write results as JSON"),
+):
+    """Chunks/sec of EmbeddingEngine vs the plain SentenceTransformer.encode path."""
+    from ark_engine.bench.embedding import benchmark_embedding
+
+    texts = _load_docs(module, limit)
+    console.print(f"[yellow]Embedding {len(texts)} chunks...[/yellow]")
+    rows = benchmark_embedding(texts, workers=workers, torch_threads=torch_threads)
+    _print_rows("Embedding throughput", rows, json_out)
+
+@bench_app.command("search")
+def bench_search(
+    module: Path = typer.Argument(..., help="Built .ark.json with a LanceDB vector index"),
+    queries_file: Optional[Path] = typer.Option(None, "--queries", "-q", help="Text file with one query per line (default: sample the module's docs)"),
+    sample: int = typer.Option(200, "--sample", "-n", help="Number of queries"),
+    k: int = typer.Option(10, "--k", "-k", help="Top-k for recall@k"),
+    ann_type: str = typer.Option("IVF_PQ", "--ann-type", help="ANN index type: IVF_PQ or IVF_HNSW_SQ"),
+    partitions: List[int] = typer.Option([0], "--partitions", "-p", help="IVF partitions to try (0 = sqrt(rows), repeatable)"),
+    sub_vectors: List[int] = typer.Option([0], "--sub-vectors", "-s", help="PQ sub-vectors to try (0 = dim / 8, repeatable)"),
+    nprobes: List[int] = typer.Option([10, 20, 50], "--nprobes", help="nprobes values to try (repeatable)"),
+    refine_factor: List[int] = typer.Option([0, 10], "--refine-factor", help="refine_factor values to try (0 = off, repeatable)"),
+    json_out: Optional[Path] = typer.Option(None, "--json", help="Write results as JSON"),
+):
+    """Recall@k and latency percentiles of brute force vs ANN index settings."""
+    import random
+    from ark_engine.bench.search import benchmark_search
+    from ark_engine.core.model_registry import ModelRegistry, DEFAULT_EMBEDDING_MODEL
+    from ark_engine.core.vector_index import AnnIndexConfig
+
+    raw = ArkLoader.read_raw_data(module)
+    uri = raw.get("content", {}).get("vector_index_uri")
+    if not uri or not Path(uri).exists():
+        console.print(f"[red]Vector index of {module} not found ({uri}).[/red]")
+        raise typer.Exit(1)
+
+    if queries_file:
+        texts = [line.strip() for line in queries_file.read_text(encoding="utf-8").splitlines() if line.strip()]
+        texts = texts[:sample]
+    else:
+        docs = _load_docs(module, len(raw["content"]["docs"]))
+        texts = random.Random(0).sample(docs, min(sample, len(docs)))
+
+    model_name = raw.get("metadata", {}).get("embedding_model") or DEFAULT_EMBEDDING_MODEL
+    console.print(f"[yellow]Embedding {len(texts)} queries with {model_name}...[/yellow]")
+    queries = ModelRegistry().get(model_name).encode(texts, convert_to_numpy=True)
+
+    configs = [
+        AnnIndexConfig(index_type=ann_type.upper(), min_rows=0,
+                       num_partitions=p or None, num_sub_vectors=s or None)
+        for p in partitions for s in sub_vectors
+    ]
+    rows = benchmark_search(uri, queries, k=k, index_configs=configs, nprobes=nprobes,
+                            refine_factors=[r or None for r in refine_factor])
+    _print_rows(f"Vector search, {len(texts)} queries", rows, json_out)
+
+@bench_app.command("shards")
+def bench_shards(
+    module: Path = typer.Argument(..., help="Built .ark.json with float32 vectors in LanceDB"),
+    sample: int = typer.Option(200, "--sample", "-n", help="Number of queries (sampled from the module's docs)"),
+    k: int = typer.Option(10, "--k", "-k", help="Top-k"),
+    shards: List[int] = typer.Option([1, 2, 4, 8], "--shards", "-s", help="Shard counts to try (repeatable)"),
+    json_out: Optional[Path] = typer.Option(None, "--json", help="Write results as JSON"),
+):
+    """p50/p95/p99 search latency with the vector table split into N shards searched in parallel."""
+    import random
+    from ark_engine.bench.search import benchmark_shards
+    from ark_engine.core.model_registry import ModelRegistry, DEFAULT_EMBEDDING_MODEL
+
+    raw = ArkLoader.read_raw_data(module)
+    uri = raw.get("content", {}).get("vector_index_uri")
+    if not uri or not Path(uri).exists():
+        console.print(f"[red]Vector index of {module} not found ({uri}).[/red]")
+        raise typer.Exit(1)
+
+    docs = _load_docs(module, len(raw["content"]["docs"]))
+    texts = random.Random(0).sample(docs, min(sample, len(docs)))
+    model_name = raw.get("metadata", {}).get("embedding_model") or DEFAULT_EMBEDDING_MODEL
+    queries = ModelRegistry().get(model_name).encode(texts, convert_to_numpy=True)
+
+    rows = benchmark_shards(uri, queries, k=k, shard_counts=shards)
+    _print_rows(f"Sharded search, {len(texts)} queries", rows, json_out)
+
+@bench_app.command("quantization")
+def bench_quantization(
+    module: Path = typer.Argument(..., help="Built .ark.json with float32 vectors in LanceDB"),
+    sample: int = typer.Option(200, "--sample", "-n", help="Number of queries sampled from the module's vectors"),
+    k: int = typer.Option(10, "--k", "-k", help="Top-k for recall@k"),
+    storage: List[str] = typer.Option(["float16", "int8", "binary"], "--storage", help="Storage kinds to try (repeatable)"),
+    rescore_factor: List[int] = typer.Option([1, 4, 10], "--rescore-factor", help="Binary rescoring factors to try (repeatable)"),
+    json_out: Optional[Path] = typer.Option(None, "--json", help="Write results as JSON"),
+):
+    """Recall loss, latency and size of float16/int8/binary vector storage."""
+    import numpy as np
+    from ark_engine.bench.search import benchmark_quantization, load_vectors
+
+    uri = ArkLoader.read_raw_data(module).get("content", {}).get("vector_index_uri")
+    if not uri or not Path(uri).exists():
+        console.print(f"[red]Vector index of {module} not found ({uri}).[/red]")
+        raise typer.Exit(1)
+
+    _, vectors = load_vectors(uri)
+    rng = np.random.default_rng(0)
+    # Запити — збурені вектори модуля, щоб не збігатися з рядками точно
+    picked = vectors[rng.choice(len(vectors), size=min(sample, len(vectors)), replace=False)]
+    queries = picked + rng.normal(scale=0.05, size=picked.shape).astype(np.float32)
+
+    rows = benchmark_quantization(vectors, queries, k=k, kinds=[s.lower() for s in storage],
+                                  rescore_factors=rescore_factor)
+    _print_rows(f"Vector storage, {len(vectors)} rows, {len(queries)} queries", rows, json_out)
+
+@bench_app.command("arrow")
+def bench_arrow(
+    module: Path = typer.Argument(..., help="Built .ark.json with float32 vectors in LanceDB"),
+    sample: int = typer.Option(200, "--sample", "-n", help="Number of search queries"),
+    k: int = typer.Option(10, "--k", "-k", help="Results per query"),
+    json_out: Optional[Path] = typer.Option(None, "--json", help="Write results as JSON"),
+):
+    """Build memory and search latency: Python lists/pandas vs the Arrow-native path."""
+    import numpy as np
+    from ark_engine.bench.arrow_path import benchmark_build, benchmark_search_path
+    from ark_engine.bench.search import load_vectors
+
+    uri = ArkLoader.read_raw_data(module).get("content", {}).get("vector_index_uri")
+    if not uri or not Path(uri).exists():
+        console.print(f"[red]Vector index of {module} not found ({uri}).[/red]")
+        raise typer.Exit(1)
+
+    _, vectors = load_vectors(uri)
+    queries = vectors[np.random.default_rng(0).choice(len(vectors), size=min(sample, len(vectors)), replace=False)]
+    console.print(f"[yellow]Rewriting {len(vectors)} vectors with each path...[/yellow]")
+    build_rows = benchmark_build(uri)
+    _print_rows("Build: write vectors table", build_rows, None)
+    search_rows = benchmark_search_path(uri, queries, k)
+    _print_rows(f"Search, {len(queries)} queries", search_rows, None)
+
+    if json_out:
+        json_out.write_text(json.dumps(build_rows + search_rows, ensure_ascii=False, indent=2), encoding="utf-8")
+        console.print(f"[dim]Saved to {json_out}[/dim]")
+
+@bench_app.command("numpy")
+def bench_numpy(
+    sizes: List[int] = typer.Option([1000, 5000, 20000, 50000, 100000], "--rows", "-r", help="Row counts to try (repeatable)"),
+    dim: int = typer.Option(384, "--dim", help="Vector dimension"),
+    queries: int = typer.Option(100, "--queries", "-n", help="Queries per size"),
+    json_out: Optional[Path] = typer.Option(None, "--json", help="Write results as JSON"),
+):
+    """Exact search latency: LanceDB vs the in-process NumPy store, to find the crossover (ARK_NUMPY_MAX_ROWS)."""
+    from ark_engine.bench.vector_store import benchmark_backends
+
+    rows = benchmark_backends(sizes=sizes, dim=dim, n_queries=queries)
+    _print_rows("Exact vector search backends", rows, json_out)
+
+@bench_app.command("routing")
+def bench_routing(
+    queries_file: Optional[Path] = typer.Option(None, "--queries", "-q", help="Text file with one query per line (default: sample docs of installed packages)"),
+    sample: int = typer.Option(100, "--sample", "-n", help="Number of queries"),
+    k: int = typer.Option(10, "--k", "-k", help="Top-k for recall@k"),
+    top_m: List[int] = typer.Option([1, 2, 4, 8], "--top-m", "-m", help="Modules kept by the router (repeatable)"),
+    json_out: Optional[Path] = typer.Option(None, "--json", help="Write results as JSON"),
+):
+    """Modules pruned and recall@k of centroid routing vs searching every installed package."""
+    import random
+    from ark_engine.bench.routing import benchmark_routing
+    from ark_engine.store.federated import FederatedSearch
+
+    federated = FederatedSearch(timeout=None)
+    packages = federated.index.list_packages()
+    if not packages:
+        console.print("[red]No installed packages. Use 'ark store install' first.[/red]")
+        raise typer.Exit(1)
+
+    if queries_file:
+        texts = [line.strip() for line in queries_file.read_text(encoding="utf-8").splitlines() if line.strip()]
+        texts = texts[:sample]
+    else:
+        docs = [doc for p in packages for doc in ArkLoader.read_raw_data(Path(p.path)).get("content", {}).get("docs", [])]
+        texts = random.Random(0).sample(docs, min(sample, len(docs)))
+
+    console.print(f"[yellow]Running {len(texts)} queries over {len(packages)} packages...[/yellow]")
+    rows = benchmark_routing(federated, texts, k=k, top_ms=top_m)
+    _print_rows(f"Centroid routing, {len(texts)} queries", rows, json_out)
+
+@bench_app.command("ttft")
+def bench_ttft(
+    module: Path = typer.Argument(..., help="Built .ark.json whose docs are used as request context"),
+    sample: int = typer.Option(10, "--sample", "-n", help="Number of requests per mode"),
+    json_out: Optional[Path] = typer.Option(None, "--json", help="Write results as JSON"),
+):
+    """LLM time-to-first-token with full prefill vs the cached system prompt KV state."""
+    import random
+    from ark_engine.bench.llm import benchmark_ttft
+    from ark_engine.core.llm import LLMEngine
+
+    docs = _load_docs(module, 10_000)
+    rng = random.Random(0)
+    requests = [("Про що йдеться в цих документах?", "\n\n".join(rng.sample(docs, min(3, len(docs)))))
+                for _ in range(sample)]
+    console.print(f"[yellow]Measuring TTFT over {len(requests)} requests...[/yellow]")
+    rows = benchmark_ttft(LLMEngine(), requests)
+    _print_rows("LLM time to first token", rows, json_out)
+
+@bench_app.command("llm-pool")
+def bench_llm_pool(
+    module: Path = typer.Argument(..., help="Built .ark.json whose docs are used as request context"),
+    instances: List[int] = typer.Option([1, 2, 4], "--instances", "-k", help="Pool sizes to compare"),
+    sample: int = typer.Option(16, "--sample", "-n", help="Number of concurrent requests per pool size"),
+    max_tokens: int = typer.Option(128, "--max-tokens", help="Answer length per request"),
+    json_out: Optional[Path] = typer.Option(None, "--json", help="Write results as JSON"),
+):
+    """Aggregate LLM tokens/sec for K model instances splitting the CPU cores (picks ARK_LLM_INSTANCES)."""
+    import random
+    from ark_engine.bench.llm import benchmark_instances
+    from ark_engine.core.llm import LLMEngine, LLM_THREADS
+
+    docs = _load_docs(module, 10_000)
+    rng = random.Random(0)
+    requests = [("Про що йдеться в цих документах?", "\n\n".join(rng.sample(docs, min(3, len(docs)))))
+                for _ in range(sample)]
+    console.print(f"[yellow]Running {len(requests)} requests per pool size on {LLM_THREADS} threads...[/yellow]")
+    rows = benchmark_instances(LLMEngine(), requests, instances, max_tokens=max_tokens)
+    _print_rows("LLM instance pool throughput", rows, json_out)
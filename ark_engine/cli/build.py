@@ -2,6 +2,7 @@ import typer
 from pathlib import Path
 from typing import Optional
 from ark_engine.core.builder import ArkBuilder
+from ark_engine.core.vector_index import AnnIndexConfig, DEFAULT_ANN_MIN_ROWS
 
 app = typer.Typer()
 
@@ -9,7 +10,20 @@ app = typer.Typer()
 def main(
     input_folder: Path = typer.Argument(..., help="Directory containing raw files"),
     output: Optional[Path] = typer.Option(None, help="Output .ark.json file path"),
-    title: Optional[str] = typer.Option(None, help="Title for the Ark module")
+    title: Optional[str] = typer.Option(None, help="Title for the Ark module"),
+    jobs: int = typer.Option(1, "--jobs", "-j", help="Worker processes for extraction, cleaning and chunking"),
+    update: Optional[Path] = typer.Option(None, "--update", "-u", help="Existing .ark.json to update incrementally"),
+    batch_size: Optional[int] = typer.Option(None, "--batch-size", "-b", help="Streaming build: embed and index chunks in batches of this size (bounded memory)"),
+    embed_workers: int = typer.Option(1, "--embed-workers", help="Embedding worker processes, one model copy each"),
+    torch_threads: Optional[int] = typer.Option(None, "--torch-threads", help="Torch threads per embedding worker (default: cores / workers)"),
+    ann_min_rows: int = typer.Option(DEFAULT_ANN_MIN_ROWS, "--ann-min-rows", help="Build an ANN vector index once the module has this many chunks"),
+    ann_type: str = typer.Option("IVF_PQ", "--ann-type", help="ANN index type: IVF_PQ or IVF_HNSW_SQ"),
+    partitions: Optional[int] = typer.Option(None, "--partitions", help="IVF partitions (default: sqrt(rows))"),
+    sub_vectors: Optional[int] = typer.Option(None, "--sub-vectors", help="PQ sub-vectors (default: dim / 8)"),
+    nprobes: int = typer.Option(20, "--nprobes", help="Default partitions probed per query"),
+    refine_factor: Optional[int] = typer.Option(None, "--refine-factor", help="Default re-ranking of refine_factor * k candidates on full vectors"),
+    vector_storage: str = typer.Option("float32", "--vector-storage", help="Vector precision: float32, float16, int8 or binary (quantized, rescored at query time)"),
+    shards: int = typer.Option(1, "--shards", help="Split the LanceDB vector table into N shards searched in parallel (very large modules)")
 ):
     """
     Convert raw documents into a .ark module.
@@ -18,9 +32,26 @@ def main(
         builder = ArkBuilder(
             input_dir=str(input_folder), 
             output_file=str(output) if output else None, 
-            title=title
+            title=title,
+            jobs=jobs,
+            batch_size=batch_size,
+            embed_workers=embed_workers,
+            torch_threads=torch_threads,
+            ann_index=AnnIndexConfig(
+                index_type=ann_type.upper(),
+                min_rows=ann_min_rows,
+                num_partitions=partitions,
+                num_sub_vectors=sub_vectors,
+                nprobes=nprobes,
+                refine_factor=refine_factor
+            ),
+            vector_storage=vector_storage.lower(),
+            shards=shards
         )
-        builder.build()
+        if update:
+            builder.update(str(update))
+        else:
+            builder.build()
     except Exception as e:
         typer.secho(f"Error during build: {e}", fg=typer.colors.RED)
         raise typer.Exit(code=1)
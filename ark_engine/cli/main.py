@@ -1,6 +1,7 @@
 import typer
+from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 import sys
 import os
 import json
@@ -8,14 +9,16 @@ import json
 # Імпорти існуючих команд
 from ark_engine.cli.validate import validate_command
 from ark_engine.cli.info import info_command
-from ark_engine.cli.search import search_command
+from ark_engine.cli.search import search_command, search_file_command, search_all_command
 from ark_engine.cli.ask import ask_command
 from ark_engine.cli.web import web_command
 from ark_engine.core.builder import ArkBuilder
+from ark_engine.core.vector_index import AnnIndexConfig, DEFAULT_ANN_MIN_ROWS
 
 # Імпорти нових підгруп (Week 6 & 7)
 from ark_engine.cli.store import store_app
 from ark_engine.cli.trust import trust_app
+from ark_engine.cli.bench import bench_app
 
 # Імпорти безпеки (Week 7)
 from ark_engine.security.key_manager import KeyManager
@@ -27,6 +30,7 @@ app = typer.Typer(help="Kovcheg Ark Engine CLI")
 # --- Реєстрація підгруп команд ---
 app.add_typer(store_app, name="store", help="Package Store commands")
 app.add_typer(trust_app, name="trust", help="Trust management and key operations")
+app.add_typer(bench_app, name="bench", help="Performance benchmarks")
 
 # ==========================================
 # WEEK 3: Core Commands
@@ -42,10 +46,45 @@ def info(path: Path = typer.Argument(..., help="Path to .ark file")):
 
 @app.command(name="search")
 def search(
-    query: str = typer.Argument(...),
-    module: Path = typer.Option(..., "--module", "-m", help="Path to .ark file")
+    query: Optional[str] = typer.Argument(None),
+    module: Optional[Path] = typer.Option(None, "--module", "-m", help="Path to .ark file"),
+    all_modules: bool = typer.Option(False, "--all", help="Search every installed store package and merge a global top-k"),
+    timeout: Optional[float] = typer.Option(None, "--timeout", help="Per-module timeout in seconds for --all"),
+    route: Optional[int] = typer.Option(None, "--route", help="With --all: search only the N modules closest to the query by centroids"),
+    top_k: int = typer.Option(3, "--top-k", "-k", help="Number of results"),
+    nprobes: Optional[int] = typer.Option(None, "--nprobes", help="ANN partitions to probe (modules with a vector index)"),
+    refine_factor: Optional[int] = typer.Option(None, "--refine-factor", help="Re-rank refine_factor * k ANN candidates on full vectors"),
+    queries_file: Optional[Path] = typer.Option(None, "--queries-file", help="JSONL file of queries to search in batches"),
+    output: Optional[Path] = typer.Option(None, "--output", "-o", help="JSONL results file for --queries-file (default: stdout)"),
+    batch_size: int = typer.Option(256, "--batch-size", help="Queries embedded and searched per batch with --queries-file"),
+    ext: Optional[List[str]] = typer.Option(None, "--ext", help="Only sources with this extension (repeatable), e.g. --ext pdf"),
+    source_dir: Optional[str] = typer.Option(None, "--dir", help="Only sources under this directory (relative to the build input)"),
+    source: Optional[str] = typer.Option(None, "--source", help="Only this source file (relative path)"),
+    page_min: Optional[int] = typer.Option(None, "--page-min", help="First PDF page / spreadsheet sheet (1-based)"),
+    page_max: Optional[int] = typer.Option(None, "--page-max", help="Last PDF page / spreadsheet sheet"),
+    modified_after: Optional[datetime] = typer.Option(None, "--modified-after", help="Only sources modified at or after this date"),
+    modified_before: Optional[datetime] = typer.Option(None, "--modified-before", help="Only sources modified before this date")
 ):
-    search_command(query, module)
+    from ark_engine.core.filters import SearchFilters
+    filters = SearchFilters(ext=ext or None, dir=source_dir, source=source, page_min=page_min, page_max=page_max,
+                            modified_after=modified_after, modified_before=modified_before)
+    filters = None if filters.is_empty() else filters
+
+    if all_modules:
+        if not query:
+            typer.secho("Provide a QUERY for --all.", fg=typer.colors.RED)
+            raise typer.Exit(code=1)
+        search_all_command(query, top_k, timeout, route, filters)
+    elif not module:
+        typer.secho("Provide --module or --all.", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+    elif queries_file:
+        search_file_command(queries_file, module, output, top_k, batch_size, nprobes, refine_factor, filters)
+    elif query:
+        search_command(query, module, top_k, nprobes, refine_factor, filters)
+    else:
+        typer.secho("Provide a QUERY or --queries-file.", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
 
 @app.command(name="ask")
 def ask(
@@ -62,7 +101,20 @@ def ask(
 def build(
     input_folder: Path = typer.Argument(..., help="Directory containing raw files"),
     output: Optional[Path] = typer.Option(None, "--output", "-o", help="Output .ark.json file path"),
-    title: Optional[str] = typer.Option(None, "--title", "-t", help="Title for the Ark module")
+    title: Optional[str] = typer.Option(None, "--title", "-t", help="Title for the Ark module"),
+    jobs: int = typer.Option(1, "--jobs", "-j", help="Worker processes for extraction, cleaning and chunking"),
+    update: Optional[Path] = typer.Option(None, "--update", "-u", help="Existing .ark.json to update incrementally"),
+    batch_size: Optional[int] = typer.Option(None, "--batch-size", "-b", help="Streaming build: embed and index chunks in batches of this size (bounded memory)"),
+    embed_workers: int = typer.Option(1, "--embed-workers", help="Embedding worker processes, one model copy each"),
+    torch_threads: Optional[int] = typer.Option(None, "--torch-threads", help="Torch threads per embedding worker (default: cores / workers)"),
+    ann_min_rows: int = typer.Option(DEFAULT_ANN_MIN_ROWS, "--ann-min-rows", help="Build an ANN vector index once the module has this many chunks"),
+    ann_type: str = typer.Option("IVF_PQ", "--ann-type", help="ANN index type: IVF_PQ or IVF_HNSW_SQ"),
+    partitions: Optional[int] = typer.Option(None, "--partitions", help="IVF partitions (default: sqrt(rows))"),
+    sub_vectors: Optional[int] = typer.Option(None, "--sub-vectors", help="PQ sub-vectors (default: dim / 8)"),
+    nprobes: int = typer.Option(20, "--nprobes", help="Default partitions probed per query"),
+    refine_factor: Optional[int] = typer.Option(None, "--refine-factor", help="Default re-ranking of refine_factor * k candidates on full vectors"),
+    vector_storage: str = typer.Option("float32", "--vector-storage", help="Vector precision: float32, float16, int8 or binary (quantized, rescored at query time)"),
+    shards: int = typer.Option(1, "--shards", help="Split the LanceDB vector table into N shards searched in parallel (very large modules)")
 ):
     """
     Convert raw documents into a .ark module.
@@ -71,13 +123,59 @@ def build(
         builder = ArkBuilder(
             input_dir=str(input_folder), 
             output_file=str(output) if output else None, 
-            title=title
+            title=title,
+            jobs=jobs,
+            batch_size=batch_size,
+            embed_workers=embed_workers,
+            torch_threads=torch_threads,
+            ann_index=AnnIndexConfig(
+                index_type=ann_type.upper(),
+                min_rows=ann_min_rows,
+                num_partitions=partitions,
+                num_sub_vectors=sub_vectors,
+                nprobes=nprobes,
+                refine_factor=refine_factor
+            ),
+            vector_storage=vector_storage.lower(),
+            shards=shards
         )
-        builder.build()
+        if update:
+            builder.update(str(update))
+        else:
+            builder.build()
     except Exception as e:
         typer.secho(f"Error during build: {e}", fg=typer.colors.RED)
         raise typer.Exit(code=1)
 
+@app.command(name="export-onnx")
+def export_onnx(
+    model_name: str = typer.Option("all-MiniLM-L6-v2", "--model", help="Sentence-transformers model to export"),
+    min_cosine: float = typer.Option(0.99, "--min-cosine", help="Minimum cosine similarity to the PyTorch vectors"),
+    module: Optional[Path] = typer.Option(None, "--module", "-m", help="Take parity-check texts from this .ark file")
+):
+    """
+    Exports the embedding model to ONNX (int8) for ARK_EMBEDDING_BACKEND=onnx and checks parity.
+    """
+    from ark_engine.core.onnx_embedder import export_onnx as do_export, check_parity
+    from ark_engine.core.loader import ArkLoader
+
+    try:
+        out_dir = do_export(model_name)
+        typer.secho(f"✅ Exported to {out_dir}", fg=typer.colors.GREEN)
+
+        texts = ["Kovcheg — офлайн база знань.", "How do I install a module?", "Короткий текст"]
+        if module:
+            texts = ArkLoader.read_raw_data(module).get("content", {}).get("docs", [])[:256] or texts
+        worst, mean = check_parity(model_name, texts, out_dir)
+        typer.echo(f"Parity on {len(texts)} texts: min cosine {worst:.4f}, mean {mean:.4f}")
+        if worst < min_cosine:
+            typer.secho(f"❌ Parity below {min_cosine}: keep ARK_EMBEDDING_BACKEND=torch.", fg=typer.colors.RED)
+            raise typer.Exit(code=1)
+        typer.secho("Parity OK: set ARK_EMBEDDING_BACKEND=onnx to use it.", fg=typer.colors.GREEN)
+    except ImportError as e:
+        typer.secho(f"Export failed: {e}", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+
 # ==========================================
 # WEEK 5: Web UI Command
 # ==========================================
@@ -1,20 +1,107 @@
+import json
+import sys
+import time
 import typer
 from pathlib import Path
+from typing import Iterator, List, Optional
+from ark_engine.core.filters import SearchFilters
 from ark_engine.core.loader import ArkLoader
 from ark_engine.core.rag import ArkRAG
 
-def search_command(query: str, module_path: Path):
+def search_command(query: str, module_path: Path, top_k: int = 3,
+                   nprobes: Optional[int] = None, refine_factor: Optional[int] = None,
+                   filters: Optional[SearchFilters] = None):
     """Semantic search inside an .ark module."""
     try:
         module = ArkLoader.load(module_path)
         rag = ArkRAG(module)
-        
-        results = rag.search(query)
-        
+
+        results = rag.search(query, top_k=top_k, nprobes=nprobes, refine_factor=refine_factor, filters=filters)
+
         typer.secho(f"Search results for: '{query}'", fg=typer.colors.YELLOW)
         for i, (doc, score) in enumerate(results, 1):
             typer.echo(f"\n{i}. [Score: {score:.4f}]")
             typer.echo(f"   {doc[:200]}...")
-            
+
+    except Exception as e:
+        typer.secho(f"Error: {e}", fg=typer.colors.RED)
+
+def search_all_command(query: str, top_k: int = 3, timeout: Optional[float] = None,
+                       route: Optional[int] = None, filters: Optional[SearchFilters] = None):
+    """Federated search across all installed store packages."""
+    from ark_engine.store.federated import FederatedSearch
+
+    try:
+        federated = FederatedSearch()
+        module_ids = None
+        if route is not None:
+            module_ids, stats = federated.route(query, route)
+            typer.secho(f"Routed to {stats.searched} of {stats.modules} modules ({stats.pruned} pruned)",
+                        fg=typer.colors.BLUE)
+        hits = federated.search(query, top_k=top_k, module_ids=module_ids, timeout=timeout, filters=filters)
+        if not hits:
+            typer.secho("No results (is anything installed? see 'ark store list').", fg=typer.colors.YELLOW)
+            return
+
+        typer.secho(f"Search results for: '{query}' (all installed modules)", fg=typer.colors.YELLOW)
+        for i, hit in enumerate(hits, 1):
+            typer.echo(f"\n{i}. [Score: {hit.score:.4f}] {hit.module_id}" + (f" · {hit.source}" if hit.source else ""))
+            typer.echo(f"   {hit.text[:200]}...")
+
     except Exception as e:
         typer.secho(f"Error: {e}", fg=typer.colors.RED)
+
+def _read_queries(path: Path) -> Iterator[dict]:
+    """Рядки JSONL: {"query": "...", ...} (інші поля, напр. id, переносяться у вихід) або просто "рядок"."""
+    with open(path, "r", encoding="utf-8") as f:
+        for n, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if isinstance(record, str):
+                record = {"query": record}
+            if not isinstance(record, dict) or not isinstance(record.get("query"), str):
+                raise ValueError(f"{path}:{n}: expected a string or an object with a 'query' field")
+            yield record
+
+def _batches(records: Iterator[dict], size: int) -> Iterator[List[dict]]:
+    batch: List[dict] = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def search_file_command(queries_file: Path, module_path: Path, output: Optional[Path] = None,
+                        top_k: int = 3, batch_size: int = 256,
+                        nprobes: Optional[int] = None, refine_factor: Optional[int] = None,
+                        filters: Optional[SearchFilters] = None):
+    """Batch search: JSONL queries in, one JSONL result line per query out (streamed)."""
+    try:
+        rag = ArkRAG(ArkLoader.load(module_path))
+        out = open(output, "w", encoding="utf-8") if output else sys.stdout
+        total, t0 = 0, time.perf_counter()
+        try:
+            for batch in _batches(_read_queries(queries_file), batch_size):
+                results = rag.search_many([r["query"] for r in batch], top_k=top_k,
+                                          nprobes=nprobes, refine_factor=refine_factor, filters=filters)
+                for record, found in zip(batch, results):
+                    record["results"] = [{"text": text, "score": score} for text, score in found]
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                total += len(batch)
+        finally:
+            if output:
+                out.close()
+
+        elapsed = time.perf_counter() - t0
+        typer.secho(
+            f"Searched {total} queries in {elapsed:.1f}s ({total / elapsed if elapsed > 0 else 0:.0f} queries/s)",
+            fg=typer.colors.GREEN, err=True
+        )
+    except Exception as e:
+        typer.secho(f"Error: {e}", fg=typer.colors.RED, err=True)
+        raise typer.Exit(code=1)
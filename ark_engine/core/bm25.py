@@ -0,0 +1,252 @@
+import json
+import logging
+import re
+import shutil
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger("ark_bm25")
+
+K1 = 1.2
+B = 0.75
+# Довші "слова" (base64, хеші) лише роздувають словник
+MAX_TERM_LEN = 40
+# Скидати постинги на диск після стількох записів, щоб пам'ять не росла з корпусом
+SPILL_POSTINGS = 2_000_000
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if len(t) <= MAX_TERM_LEN]
+
+
+class BM25Builder:
+    """
+    Будує BM25 інвертований індекс у форматі CSR:
+      terms.npy   — відсортований за байтами словник: UTF-8 терміни підряд (uint8)
+      term_offsets.npy — межі кожного терміну в terms.npy
+      indptr.npy  — межі постингів кожного терміну
+      doc_ids.npy — позиції документів у content.docs
+      weights.npy — готові BM25-ваги (idf · tf-нормалізація) для кожного постингу
+      idf.npy     — idf термінів (для нормалізації скору в 0..1)
+    Документи додаються батчами; постинги скидаються на диск, а фінальний CSR
+    збирається counting sort-ом у memmap, тож пам'ять обмежена розміром батчу і словника.
+    """
+    def __init__(self, out_dir: Path):
+        self.out_dir = Path(out_dir)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self._vocab: Dict[str, int] = {}
+        self._doc_lens: List[int] = []
+        self._buffer: List[np.ndarray] = []  # (term_id, doc, tf) трійки поточного батчу
+        self._buffered = 0
+        self._spills: List[Path] = []
+
+    def add(self, docs: List[str]):
+        for doc in docs:
+            doc_pos = len(self._doc_lens)
+            counts: Dict[int, int] = {}
+            tokens = tokenize(doc)
+            for token in tokens:
+                term_id = self._vocab.setdefault(token, len(self._vocab))
+                counts[term_id] = counts.get(term_id, 0) + 1
+            self._doc_lens.append(len(tokens))
+            if counts:
+                rows = np.empty((len(counts), 3), dtype=np.int64)
+                rows[:, 0] = list(counts.keys())
+                rows[:, 1] = doc_pos
+                rows[:, 2] = list(counts.values())
+                self._buffer.append(rows)
+                self._buffered += len(counts)
+        if self._buffered >= SPILL_POSTINGS:
+            self._spill()
+
+    def _spill(self):
+        if not self._buffer:
+            return
+        path = self.out_dir / f"_spill_{len(self._spills)}.npy"
+        np.save(path, np.concatenate(self._buffer).astype(np.int32))
+        self._spills.append(path)
+        self._buffer, self._buffered = [], 0
+
+    def finalize(self) -> Dict[str, object]:
+        """Записує CSR-масиви і повертає дескриптор для content.search_index."""
+        self._spill()
+        n_docs = len(self._doc_lens)
+        n_terms = len(self._vocab)
+
+        # Фіксована ширина <U{MAX_TERM_LEN} — 160 байт на термін; UTF-8 з межами — лише самі байти
+        encoded = [term.encode("utf-8") for term in self._vocab]
+        del self._vocab
+        order = np.array(sorted(range(n_terms), key=encoded.__getitem__), dtype=np.int64)
+        remap = np.empty(n_terms, dtype=np.int64)
+        remap[order] = np.arange(n_terms)
+        encoded = [encoded[i] for i in order]
+        term_offsets = np.zeros(n_terms + 1, dtype=np.int64)
+        term_offsets[1:] = np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64, count=n_terms))
+
+        # Прохід 1: document frequency для кожного терміну
+        df = np.zeros(n_terms, dtype=np.int64)
+        for path in self._spills:
+            df += np.bincount(remap[np.load(path)[:, 0]], minlength=n_terms)
+        indptr = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(df, out=indptr[1:])
+        nnz = int(indptr[-1])
+
+        doc_lens = np.asarray(self._doc_lens, dtype=np.float32)
+        avgdl = float(doc_lens.mean()) if n_docs else 0.0
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+        doc_ids = np.lib.format.open_memmap(self.out_dir / "doc_ids.npy", mode="w+", dtype=np.int32, shape=(nnz,))
+        weights = np.lib.format.open_memmap(self.out_dir / "weights.npy", mode="w+", dtype=np.float32, shape=(nnz,))
+
+        # Прохід 2: розкладаємо постинги по своїх місцях (counting sort за терміном)
+        cursor = indptr[:-1].copy()
+        for path in self._spills:
+            rows = np.load(path)
+            term = remap[rows[:, 0]]
+            batch_order = np.argsort(term, kind="stable")
+            term, docs, tf = term[batch_order], rows[batch_order, 1], rows[batch_order, 2].astype(np.float32)
+
+            group_start = np.searchsorted(term, term, side="left")
+            pos = cursor[term] + (np.arange(len(term)) - group_start)
+            norm = K1 * (1 - B + B * doc_lens[docs] / max(avgdl, 1e-9))
+            doc_ids[pos] = docs
+            weights[pos] = idf[term] * tf * (K1 + 1) / (tf + norm)
+
+            uniq, counts = np.unique(term, return_counts=True)
+            cursor[uniq] += counts
+            path.unlink()
+
+        doc_ids.flush()
+        weights.flush()
+        del doc_ids, weights
+        np.save(self.out_dir / "terms.npy", np.frombuffer(b"".join(encoded), dtype=np.uint8))
+        np.save(self.out_dir / "term_offsets.npy", term_offsets)
+        np.save(self.out_dir / "indptr.npy", indptr)
+        np.save(self.out_dir / "idf.npy", idf)
+
+        meta = {"type": "bm25", "uri": str(self.out_dir.absolute()), "docs": n_docs,
+                "terms": n_terms, "k1": K1, "b": B}
+        with open(self.out_dir / "meta.json", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        logger.info(f"BM25 index: {n_docs} docs, {n_terms} terms, {nnz} postings")
+        return meta
+
+
+class _TermTable:
+    """Словник з terms.npy + term_offsets.npy як послідовність bytes — для bisect по mmap."""
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> bytes:
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes()
+
+
+class BM25Index:
+    """Read-only BM25 індекс; масиви відкриваються через mmap, без токенізації корпусу."""
+
+    def __init__(self, uri: str):
+        root = Path(uri)
+        terms = np.load(root / "terms.npy", mmap_mode="r")
+        if terms.dtype.kind == "U":
+            # Індекси, зібрані до переходу на UTF-8: масив <U{MAX_TERM_LEN}
+            self.terms = terms
+        else:
+            self.terms = _TermTable(terms, np.load(root / "term_offsets.npy", mmap_mode="r"))
+        self.indptr = np.load(root / "indptr.npy", mmap_mode="r")
+        self.doc_ids = np.load(root / "doc_ids.npy", mmap_mode="r")
+        self.weights = np.load(root / "weights.npy", mmap_mode="r")
+        self.idf = np.load(root / "idf.npy", mmap_mode="r")
+        with open(root / "meta.json", "r", encoding="utf-8") as f:
+            self.n_docs = json.load(f)["docs"]
+
+    @classmethod
+    def from_search_index(cls, search_index: List[Dict]) -> Optional["BM25Index"]:
+        for entry in search_index or []:
+            if entry.get("type") == "bm25":
+                try:
+                    return cls(entry["uri"])
+                except (OSError, KeyError, ValueError) as e:
+                    logger.error(f"Failed to open BM25 index at {entry.get('uri')}: {e}")
+        return None
+
+    def _term_ids(self, query: str) -> np.ndarray:
+        tokens = sorted(set(tokenize(query)))
+        if not tokens or not len(self.terms):
+            return np.zeros(0, dtype=np.int64)
+        if isinstance(self.terms, np.ndarray):
+            tokens = np.array(tokens, dtype=f"<U{MAX_TERM_LEN}")
+            idx = np.searchsorted(self.terms, tokens)
+            idx = np.minimum(idx, len(self.terms) - 1)
+            return idx[self.terms[idx] == tokens]
+
+        # Словник відсортований за UTF-8 байтами — шукаємо так само закодовані токени
+        ids = []
+        for token in tokens:
+            key = token.encode("utf-8")
+            i = bisect_left(self.terms, key)
+            if i < len(self.terms) and self.terms[i] == key:
+                ids.append(i)
+        return np.array(ids, dtype=np.int64)
+
+    def score(self, query: str) -> np.ndarray:
+        """
+        Вектор BM25-скорів для всіх документів, нормалізований у 0..1
+        (ділимо на максимально можливий скор запиту).
+        """
+        term_ids = self._term_ids(query)
+        if not len(term_ids):
+            return np.zeros(self.n_docs, dtype=np.float32)
+
+        starts, ends = self.indptr[term_ids], self.indptr[term_ids + 1]
+        docs = np.concatenate([self.doc_ids[s:e] for s, e in zip(starts, ends)])
+        weights = np.concatenate([self.weights[s:e] for s, e in zip(starts, ends)])
+        scores = np.bincount(docs, weights=weights, minlength=self.n_docs)
+
+        upper = float(np.sum(self.idf[term_ids]) * (K1 + 1))
+        return (scores / upper).astype(np.float32) if upper > 0 else scores.astype(np.float32)
+
+    def score_many(self, queries: List[str]) -> np.ndarray:
+        """
+        Пакетний `score`: матриця (запити × документи). Постинги спільних термінів
+        читаються з mmap один раз, усі запити рахуються одним bincount по плоскому
+        індексу (рядок запиту × n_docs + документ).
+        """
+        per_query = [self._term_ids(q) for q in queries]
+        lens = np.array([len(t) for t in per_query], dtype=np.int64)
+        if not lens.sum():
+            return np.zeros((len(queries), self.n_docs), dtype=np.float32)
+
+        rows = np.repeat(np.arange(len(queries)), lens)
+        term_ids = np.concatenate(per_query)
+        uniq, inverse = np.unique(term_ids, return_inverse=True)
+        starts, ends = self.indptr[uniq], self.indptr[uniq + 1]
+        docs = np.concatenate([self.doc_ids[s:e] for s, e in zip(starts, ends)])
+        weights = np.concatenate([self.weights[s:e] for s, e in zip(starts, ends)])
+        offsets = np.concatenate([[0], np.cumsum(ends - starts)])
+
+        # Постинги кожної пари (запит, термін): зсув терміна в docs/weights + 0..len-1
+        pair_len = (ends - starts)[inverse]
+        before = np.concatenate([[0], np.cumsum(pair_len)[:-1]])
+        pos = np.repeat(offsets[inverse] - before, pair_len) + np.arange(pair_len.sum())
+        flat = np.repeat(rows, pair_len) * self.n_docs + docs[pos]
+        scores = np.bincount(flat, weights=weights[pos], minlength=len(queries) * self.n_docs)
+        scores = scores.reshape(len(queries), self.n_docs)
+
+        upper = np.bincount(rows, weights=self.idf[term_ids], minlength=len(queries)) * (K1 + 1)
+        scores = np.divide(scores, upper[:, None], out=scores, where=upper[:, None] > 0)
+        return scores.astype(np.float32)
+
+
+def remove_index(out_dir: Path):
+    if Path(out_dir).exists():
+        shutil.rmtree(out_dir)
@@ -1,67 +1,91 @@
 import os
 import json
+import time
 import logging
 import shutil
 from pathlib import Path
-from typing import Optional, List
+from typing import Optional, List, Dict, Any, Tuple, Iterator
 
-import pandas as pd
+import numpy as np
+import pyarrow as pa
 import lancedb
 from rich.console import Console
-from rich.progress import track
+from rich.progress import Progress, BarColumn, MofNCompleteColumn, TextColumn, TimeRemainingColumn
 
-from ark_engine.core.text_loader import MonsterLoader
-from ark_engine.core.cleaners import TextCleaner
-from ark_engine.core.chunker import TextChunker
+from ark_engine.core.bm25 import BM25Builder
+from ark_engine.core.extraction import DocumentExtractor, StageStats, iter_extracted
+from ark_engine.core.filters import FILTER_COLUMNS, source_dir, source_ext
 from ark_engine.core.embedder import Embedder
 from ark_engine.core.indexer import Indexer
-from ark_engine.core.utils import generate_uuid, get_current_timestamp, calculate_checksum
+from ark_engine.core.loader import ArkLoader
+from ark_engine.core.manifest import BuildManifest
+from ark_engine.core.model_registry import DEFAULT_EMBEDDING_MODEL
+from ark_engine.core.quantization import VECTOR_STORAGE, QuantizedVectorWriter, QuantizedVectors
+from ark_engine.core.routing import ROUTING_SAMPLE_ROWS, VectorSample, routing_summary
+from ark_engine.core.shards import shards_entry, shards_from_search_index, split_by_shard, table_names
+from ark_engine.core.spool import ChunkSpool, write_spooled_module
+from ark_engine.core.vector_store import NUMPY_MAX_ROWS, NumpyVectorStore
+from ark_engine.core.vector_index import AnnIndexConfig, create_ann_index, create_scalar_indexes
+from ark_engine.core.utils import generate_uuid, get_current_timestamp, calculate_checksum, current_rss_mb
 
 console = Console()
 logger = logging.getLogger("ark_builder")
 
 class ArkBuilder:
-    def __init__(self, input_dir: str, output_file: Optional[str] = None, title: Optional[str] = None):
+    def __init__(self, input_dir: str, output_file: Optional[str] = None, title: Optional[str] = None,
+                 jobs: int = 1, batch_size: Optional[int] = None,
+                 embed_workers: int = 1, torch_threads: Optional[int] = None,
+                 embedding_model: str = DEFAULT_EMBEDDING_MODEL, ann_index: Optional[AnnIndexConfig] = None,
+                 vector_storage: str = "float32", shards: int = 1):
         self.input_dir = Path(input_dir)
         self.output_file = Path(output_file) if output_file else None
         self.title = title or self.input_dir.name
-        
+        self.embedding_model = embedding_model
+        # Кількість процесів для витягу/очищення/чанкінгу (1 = послідовно)
+        self.jobs = max(1, jobs)
+        # Потоковий режим: чанки йдуть через ембеддер і в LanceDB батчами цього розміру
+        self.batch_size = batch_size
+        # Пул процесів ембеддінгу (по копії моделі на процес) та потоки torch на процес
+        self.embed_workers = max(1, embed_workers)
+        self.torch_threads = torch_threads
+        # ANN індекс (IVF-PQ / HNSW) для великих модулів; дрібні лишаються на brute force
+        self.ann_index = ann_index or AnnIndexConfig()
+        self.vector_index: Optional[Dict[str, Any]] = None
+        # float32 — вектори в LanceDB; float16/int8/binary — компактні коди в {id}.qvec/
+        if vector_storage not in VECTOR_STORAGE:
+            raise ValueError(f"Unknown vector storage: {vector_storage}. Use one of {VECTOR_STORAGE}.")
+        self.vector_storage = vector_storage
+        self.quantized = vector_storage != "float32"
+        # Кілька таблиць LanceDB (id % shards), які ArkRAG сканує паралельно
+        self.shards = max(1, shards)
+        if self.shards > 1 and self.quantized:
+            raise ValueError("Sharding applies to float32 vectors in LanceDB; quantized modules are scanned in-process.")
+
         # Компоненти пайплайну
-        self.loader = MonsterLoader(ocr_enabled=True)
-        self.cleaner = TextCleaner()
-        self.chunker = TextChunker(max_chars=1000)
+        self.extractor = DocumentExtractor(ocr_enabled=True, max_chars=1000)
+        self.loader = self.extractor.loader
+        self.cleaner = self.extractor.cleaner
+        self.chunker = self.extractor.chunker
         self.embedder = None
 
     def build(self):
         """
         Основний метод збірки .ark модуля з використанням LanceDB для векторів.
         """
-        if not self.input_dir.exists() or not self.input_dir.is_dir():
-            raise FileNotFoundError(f"Input directory not found: {self.input_dir}")
+        self._check_input_dir()
 
-        # 1. Сканування файлів
-        files = [f for f in self.input_dir.glob("**/*") if f.is_file()]
+        # 1. Сканування файлів (сортуємо, щоб порядок чанків і checksum були відтворюваними)
+        files = self._scan_files()
         console.print(f"[bold green]Found {len(files)} files in {self.input_dir}[/bold green]")
 
-        all_chunks: List[str] = []
-        chunk_sources: List[str] = []
+        module_id = generate_uuid()
+        manifest = BuildManifest(module_id=module_id)
 
-        # 2. Обробка тексту (ETL)
-        for file_path in track(files, description="Processing documents..."):
-            raw_text = self.loader.load(file_path)
-            if not raw_text:
-                continue
-            
-            clean_text = self.cleaner.normalize(raw_text)
-            file_chunks = self.chunker.chunk(clean_text)
-            
-            if not file_chunks:
-                continue
+        if self.batch_size:
+            return self._build_streaming(files, manifest)
 
-            all_chunks.extend(file_chunks)
-            # Зберігаємо відносний шлях як джерело
-            relative_source = str(file_path.relative_to(self.input_dir))
-            chunk_sources.extend([relative_source] * len(file_chunks))
+        # 2. Обробка тексту (ETL), послідовно або в пулі процесів
+        all_chunks, chunk_sources, chunk_ids, chunk_pages = self._extract(files, manifest)
 
         console.print(f"[bold blue]Generated {len(all_chunks)} text chunks.[/bold blue]")
 
@@ -70,46 +94,616 @@ class ArkBuilder:
             return
 
         # 3. Генерація Ембеддінгів
-        self.embedder = Embedder() 
-        console.print("[yellow]Generating embeddings (this may take a while)...[/yellow]")
-        embeddings = self.embedder.embed(all_chunks)
+        embeddings = self._embed(all_chunks)
+        self.embedder.close()
 
-        # 4. Підготовка ідентифікаторів та шляхів
-        module_id = generate_uuid()
-        
+        # 4. Підготовка шляхів
         # Визначаємо вихідний шлях
         if not self.output_file:
             self.output_file = Path(f"{self.title}.ark.json")
-        
+
         # Шлях до LanceDB (папка поруч з .ark файлом)
-        lancedb_dir = self.output_file.parent / f"{module_id}.lancedb"
-        
-        if lancedb_dir.exists():
-            shutil.rmtree(lancedb_dir)
-        lancedb_dir.mkdir(parents=True, exist_ok=True)
+        lancedb_dir = self._reset_lancedb_dir(module_id)
 
         # 5. Запис у LanceDB (Vector Index)
         console.print(f"[yellow]Creating LanceDB index at: {lancedb_dir}[/yellow]")
-        
+
         try:
-            df = pd.DataFrame({
-                "vector": embeddings,
-                "text": all_chunks,
-                "source": chunk_sources,
-                "id": range(len(all_chunks))
-            })
-            
             db = lancedb.connect(str(lancedb_dir))
-            db.create_table("vectors", data=df)
-            
+            vectors = None if self.quantized else embeddings
+            frame = self._frame(vectors, all_chunks, chunk_sources, chunk_ids,
+                                pages=chunk_pages, mtimes=self._mtimes(manifest, chunk_sources))
+            tables = self._add_rows(db, {}, frame)
+
             console.print("[green]Vectors successfully indexed in LanceDB.[/green]")
+            if not self.quantized:
+                self._index_vectors(tables)
+            self._index_columns(tables)
         except Exception as e:
             console.print(f"[bold red]Failed to create LanceDB index: {e}[/bold red]")
             raise e
 
-        # 6. Формування Payload (Content)
-        search_index = Indexer.build_index(chunk_sources)
-        
+        # 6. Інвертований BM25 індекс для ключового пошуку та компактні вектори
+        index_entries = [self._build_keyword_index(module_id, all_chunks)] + shards_entry(self.shards, tables)
+        if self.quantized:
+            qvec = QuantizedVectorWriter(self._reset_index_dir(module_id, "qvec"), self.vector_storage)
+            qvec.add(embeddings)
+            index_entries.append(self._finalize_quantized(qvec))
+        else:
+            index_entries.extend(self._numpy_vectors(module_id, embeddings))
+        index_entries.extend(self._routing_entry(embeddings))
+
+        # 7-9. Payload, заголовок, запис .ark.json та маніфесту
+        header = self._new_header(module_id)
+        checksum = self._write_module(header, all_chunks, chunk_sources, chunk_ids, lancedb_dir, index_entries)
+        manifest.save(BuildManifest.path_for(self.output_file, module_id))
+
+        console.print(f"[bold green]✓ Build complete: {self.output_file}[/bold green]")
+        console.print(f"  ID: {module_id}")
+        console.print(f"  Vector DB: {lancedb_dir.name}")
+        console.print(f"  Checksum: {checksum}")
+
+    def update(self, module_file: str):
+        """
+        Інкрементальне оновлення існуючого модуля за маніфестом збірки.
+        Витягуються та ембеддяться лише нові/змінені файли; рядки видалених
+        і змінених файлів видаляються з таблиці LanceDB 'vectors'. ID модуля зберігається.
+        """
+        self._check_input_dir()
+        module_file = Path(module_file)
+        raw = ArkLoader.read_raw_data(module_file)
+        header = raw["header"]
+        content = raw.get("content", {})
+        module_id = header["id"]
+
+        manifest_path = BuildManifest.path_for(module_file, module_id)
+        manifest = BuildManifest.load(manifest_path)
+
+        if not self.output_file:
+            self.output_file = module_file
+        if self.title == self.input_dir.name:
+            self.title = header.get("title", self.title)
+        # Нові чанки мають бути в тому ж векторному просторі, що й існуючі
+        self.embedding_model = raw.get("metadata", {}).get("embedding_model", self.embedding_model)
+
+        lancedb_dir = Path(content.get("vector_index_uri") or module_file.parent / f"{module_id}.lancedb")
+        if not lancedb_dir.exists():
+            raise FileNotFoundError(f"Vector index not found: {lancedb_dir}. Run a full build instead.")
+
+        # 1. Що змінилося з попередньої збірки
+        files = self._scan_files()
+        changed, removed, touched = manifest.diff(files, self.input_dir)
+        console.print(
+            f"[bold green]{len(files)} files: {len(changed)} added/changed, "
+            f"{len(removed)} removed, {len(touched)} touched[/bold green]"
+        )
+
+        stale_ids: List[int] = []
+        for rel in removed:
+            stale_ids.extend(manifest.files.pop(rel).chunk_ids)
+        for file_path in changed:
+            record = manifest.files.pop(str(file_path.relative_to(self.input_dir)), None)
+            if record:
+                stale_ids.extend(record.chunk_ids)
+
+        # 2. ETL та ембеддінги лише для нових/змінених файлів
+        new_chunks, new_sources, new_ids, new_pages = self._extract(changed, manifest)
+        console.print(f"[bold blue]Generated {len(new_chunks)} new text chunks.[/bold blue]")
+
+        # Ембеддінги — до будь-яких змін у таблиці: якщо модель впаде,
+        # модуль і маніфест на диску лишаються узгодженими
+        embeddings = None
+        if new_chunks:
+            embeddings = self._embed(new_chunks)
+            self.embedder.close()
+
+        # 3. Оновлення таблиці LanceDB на місці (шардований модуль лишається з тими ж шардами)
+        db = lancedb.connect(str(lancedb_dir))
+        shards = shards_from_search_index(content.get("search_index", []))
+        self.shards = shards["shards"] if shards else 1
+        tables = {name: db.open_table(name) for name in table_names(content.get("search_index", []))}
+        if stale_ids:
+            # Видаляємо пакетами, щоб предикат не ставав надто довгим
+            for i in range(0, len(stale_ids), 1000):
+                batch = ", ".join(str(x) for x in stale_ids[i:i + 1000])
+                for table in tables.values():
+                    table.delete(f"id IN ({batch})")
+            console.print(f"[yellow]Deleted {len(stale_ids)} stale vectors.[/yellow]")
+        # Квантований модуль лишається квантованим тим самим способом
+        old_qvec = QuantizedVectors.from_search_index(content.get("search_index", []))
+        self.quantized = old_qvec is not None
+        new_vectors: Dict[int, Any] = {}
+        if new_chunks:
+            tables = self._add_rows(db, tables, self._frame(
+                None if self.quantized else embeddings, new_chunks, new_sources, new_ids,
+                pages=new_pages, mtimes=self._mtimes(manifest, new_sources)
+            ))
+            new_vectors = dict(zip(new_ids, embeddings))
+            console.print(f"[green]Appended {len(new_chunks)} vectors.[/green]")
+        if touched:
+            self._update_mtimes(tables, manifest, touched)
+        metadata = dict(raw.get("metadata") or self._default_metadata())
+        if not self.quantized and (stale_ids or new_chunks or not metadata.get("vector_index")):
+            # Нові рядки не покриті старим індексом — перебудовуємо
+            metadata["vector_index"] = self._index_vectors(tables)
+        if stale_ids or new_chunks or touched:
+            self._index_columns(tables)
+
+        # 4. Збираємо docs у порядку маніфесту: тексти незмінених файлів беремо з модуля
+        # (search_index, крім рядків чанків, може містити дескриптори індексів)
+        chunk_entries = [entry for entry in content.get("search_index", []) if "id" in entry]
+        old_texts: Dict[int, str] = {
+            entry["id"]: doc for entry, doc in zip(chunk_entries, content.get("docs", []))
+        }
+        new_texts = dict(zip(new_ids, new_chunks))
+
+        all_chunks: List[str] = []
+        chunk_sources: List[str] = []
+        chunk_ids: List[int] = []
+        for rel in sorted(manifest.files):
+            for chunk_id in manifest.files[rel].chunk_ids:
+                text = new_texts.get(chunk_id, old_texts.get(chunk_id))
+                if text is None:
+                    raise ValueError(f"Chunk {chunk_id} of {rel} is missing from {module_file}. Run a full build.")
+                all_chunks.append(text)
+                chunk_sources.append(rel)
+                chunk_ids.append(chunk_id)
+
+        # Позиції docs змінилися — BM25 перебудовується повністю (без ембеддінгів це дешево)
+        index_entries = [self._build_keyword_index(module_id, all_chunks)] + shards_entry(self.shards, tables)
+        if self.quantized:
+            old_positions = {entry["id"]: pos for pos, entry in enumerate(chunk_entries)}
+            qvec_entry = self._update_quantized(module_id, old_qvec, chunk_ids, old_positions, new_vectors)
+            index_entries.append(qvec_entry)
+        elif len(chunk_ids) <= NUMPY_MAX_ROWS:
+            index_entries.extend(self._numpy_vectors(module_id, self._table_vectors(tables, chunk_ids)))
+        else:
+            index_entries.extend(self._numpy_vectors(module_id, None))
+        index_entries.extend(self._routing_entry(
+            self._sample_quantized(qvec_entry) if self.quantized else self._sample_table_vectors(tables)
+        ))
+
+        header = dict(header, title=self.title, signature=None)
+        update_manifest = {
+            "updated_at": get_current_timestamp(),
+            "files_changed": len(changed),
+            "files_removed": len(removed),
+            "files_touched": len(touched),
+            "chunks_added": len(new_chunks),
+            "chunks_deleted": len(stale_ids),
+        }
+        checksum = self._write_module(
+            header, all_chunks, chunk_sources, chunk_ids, lancedb_dir, index_entries,
+            metadata=metadata, update_manifest=update_manifest
+        )
+        manifest.save(BuildManifest.path_for(self.output_file, module_id))
+
+        console.print(f"[bold green]✓ Update complete: {self.output_file}[/bold green]")
+        console.print(f"  ID: {module_id}")
+        console.print(f"  Checksum: {checksum}")
+
+    # --- Кроки пайплайну ---
+
+    def _check_input_dir(self):
+        if not self.input_dir.exists() or not self.input_dir.is_dir():
+            raise FileNotFoundError(f"Input directory not found: {self.input_dir}")
+
+    def _scan_files(self) -> List[Path]:
+        return sorted(f for f in self.input_dir.glob("**/*") if f.is_file())
+
+    def _iter_files(self, files: List[Path], manifest: BuildManifest
+                    ) -> Iterator[Tuple[str, List[str], List[int], List[Optional[int]]]]:
+        """
+        ETL для `files` з прогресом; кожен файл записується в маніфест разом з
+        виданими chunk ids. Повертає (відносне джерело, чанки, ids, сторінки) по одному файлу.
+        """
+        stats = StageStats(workers=self.jobs)
+        with self._progress() as progress:
+            task = progress.add_task(
+                f"Processing documents (jobs={self.jobs})...", total=len(files), stats=""
+            )
+            for file_path, file_chunks, file_pages, timings, record in iter_extracted(
+                files, jobs=self.jobs, extractor=self.extractor
+            ):
+                stats.add(file_chunks, timings)
+                progress.update(task, advance=1, stats=stats.summary())
+
+                # Зберігаємо відносний шлях як джерело
+                relative_source = str(file_path.relative_to(self.input_dir))
+                record.chunk_ids = manifest.allocate_ids(len(file_chunks))
+                manifest.files[relative_source] = record
+
+                if file_chunks:
+                    yield relative_source, file_chunks, record.chunk_ids, file_pages
+
+        console.print(f"[dim]Throughput: {stats.summary()}[/dim]")
+
+    def _extract(self, files: List[Path], manifest: BuildManifest
+                 ) -> Tuple[List[str], List[str], List[int], List[Optional[int]]]:
+        all_chunks: List[str] = []
+        chunk_sources: List[str] = []
+        chunk_ids: List[int] = []
+        chunk_pages: List[Optional[int]] = []
+
+        for relative_source, file_chunks, file_ids, file_pages in self._iter_files(files, manifest):
+            all_chunks.extend(file_chunks)
+            chunk_sources.extend([relative_source] * len(file_chunks))
+            chunk_ids.extend(file_ids)
+            chunk_pages.extend(file_pages)
+
+        return all_chunks, chunk_sources, chunk_ids, chunk_pages
+
+    def _build_streaming(self, files: List[Path], manifest: BuildManifest):
+        """
+        Потокова збірка з обмеженою пам'яттю: чанки проходять loader → cleaner →
+        chunker → embedder батчами по `batch_size` і одразу дописуються в таблицю
+        LanceDB. Тексти для .ark.json накопичуються у спулі на диску, тож піковий
+        RSS залежить від розміру батчу, а не корпусу.
+        """
+        module_id = manifest.module_id
+        if not self.output_file:
+            self.output_file = Path(f"{self.title}.ark.json")
+        lancedb_dir = self._reset_lancedb_dir(module_id)
+        console.print(f"[yellow]Streaming into LanceDB at: {lancedb_dir} (batch size {self.batch_size})[/yellow]")
+
+        db = lancedb.connect(str(lancedb_dir))
+        tables: Dict[str, Any] = {}
+        spool = ChunkSpool(self.output_file.parent / f"{module_id}.spool.jsonl")
+        self._bm25 = BM25Builder(self._reset_index_dir(module_id, "bm25"))
+        self._qvec = (
+            QuantizedVectorWriter(self._reset_index_dir(module_id, "qvec"), self.vector_storage)
+            if self.quantized else None
+        )
+        self._routing_sample = VectorSample()
+        batch_chunks: List[str] = []
+        batch_sources: List[str] = []
+        batch_ids: List[int] = []
+        batch_pages: List[Optional[int]] = []
+        batch_no = 0
+        self._peak_rss_mb = 0.0
+
+        try:
+            for relative_source, file_chunks, file_ids, file_pages in self._iter_files(files, manifest):
+                batch_chunks.extend(file_chunks)
+                batch_sources.extend([relative_source] * len(file_chunks))
+                batch_ids.extend(file_ids)
+                batch_pages.extend(file_pages)
+
+                while len(batch_chunks) >= self.batch_size:
+                    n = self.batch_size
+                    batch_no += 1
+                    tables = self._flush_batch(
+                        db, tables, spool, batch_no, manifest,
+                        batch_chunks[:n], batch_sources[:n], batch_ids[:n], batch_pages[:n]
+                    )
+                    del batch_chunks[:n], batch_sources[:n], batch_ids[:n], batch_pages[:n]
+
+            if batch_chunks:
+                batch_no += 1
+                tables = self._flush_batch(db, tables, spool, batch_no, manifest,
+                                           batch_chunks, batch_sources, batch_ids, batch_pages)
+
+            if spool.count == 0:
+                console.print("[red]No valid text extracted. Aborting build.[/red]")
+                shutil.rmtree(lancedb_dir)
+                shutil.rmtree(self._bm25.out_dir)
+                return
+
+            console.print(f"[bold blue]Indexed {spool.count} text chunks in {batch_no} batches.[/bold blue]")
+            numpy_entries = []
+            if not self.quantized:
+                self._index_vectors(tables)
+            self._index_columns(tables)
+            if not self.quantized:
+                # Ids потокової збірки зростають у порядку спулу, тобто docs
+                if spool.count <= NUMPY_MAX_ROWS:
+                    numpy_entries = self._numpy_vectors(module_id, self._table_vectors(tables))
+            self._report_cache()
+            if self.embedder:
+                self.embedder.close()
+
+            small_content = {
+                "vector_index_uri": str(lancedb_dir.absolute()),
+                # Дописується після рядків чанків зі спулу
+                "search_index": [self._bm25.finalize()] + shards_entry(self.shards, tables) + (
+                    [self._finalize_quantized(self._qvec)] if self._qvec else numpy_entries
+                ) + self._routing_entry(self._routing_sample.array()),
+                "media": []
+            }
+            checksum = write_spooled_module(
+                self.output_file, self._new_header(module_id), self._default_metadata(), spool, small_content
+            )
+        finally:
+            spool.remove()
+
+        manifest.save(BuildManifest.path_for(self.output_file, module_id))
+
+        console.print(f"[bold green]✓ Build complete: {self.output_file}[/bold green]")
+        console.print(f"  ID: {module_id}")
+        console.print(f"  Vector DB: {lancedb_dir.name}")
+        console.print(f"  Checksum: {checksum}")
+        console.print(f"  Peak batch RSS: {self._peak_rss_mb:.0f} MB")
+
+    def _flush_batch(self, db, tables: Dict[str, Any], spool: ChunkSpool, batch_no: int, manifest: BuildManifest,
+                     chunks: List[str], sources: List[str], ids: List[int], pages: List[Optional[int]]):
+        """Ембеддить один батч, дописує його в LanceDB і спул, звітує про пам'ять та швидкість."""
+        self._get_embedder()
+
+        t0 = time.perf_counter()
+        embeddings = self.embedder.embed_array(chunks, show_progress=False)
+        if self._qvec:
+            self._qvec.add(embeddings)
+        self._routing_sample.add(embeddings)
+        frame = self._frame(None if self._qvec else embeddings, chunks, sources, ids,
+                            pages=pages, mtimes=self._mtimes(manifest, sources))
+        tables = self._add_rows(db, tables, frame)
+        spool.append(ids, sources, chunks)
+        self._bm25.add(chunks)
+        elapsed = time.perf_counter() - t0
+
+        rss = current_rss_mb()
+        self._peak_rss_mb = max(self._peak_rss_mb, rss)
+        console.print(
+            f"[dim]Batch {batch_no}: {len(chunks)} chunks, "
+            f"{len(chunks) / elapsed if elapsed > 0 else 0:.0f} chunks/s, "
+            f"RSS {rss:.0f} MB[/dim]"
+        )
+        return tables
+
+    def _add_rows(self, db, tables: Dict[str, Any], frame: pa.Table) -> Dict[str, Any]:
+        """Дописує рядки в таблицю 'vectors' або в шарди (створюючи їх за першої появи рядків)."""
+        for name, part in split_by_shard(frame, self.shards).items():
+            if not part.num_rows:
+                continue
+            if name in tables:
+                # Таблиці модулів, зібраних до колонок фільтрів, оновлюються без них
+                present = set(tables[name].schema.names)
+                tables[name].add(part.select([c for c in part.column_names if c in present]))
+            else:
+                tables[name] = db.create_table(name, data=part)
+        return dict(sorted(tables.items()))
+
+    def _index_vectors(self, tables: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """ANN індекс кожної таблиці векторів (шарду), якщо вона достатньо велика."""
+        self.vector_index = None
+        for name, table in tables.items():
+            rows = table.count_rows()
+            if rows >= self.ann_index.min_rows:
+                console.print(f"[yellow]Building {self.ann_index.index_type} index over {rows} vectors of '{name}'...[/yellow]")
+            index = create_ann_index(table, self.ann_index)
+            # Параметри пошуку в метаданих — з першого шарду: шарди однакового розміру
+            self.vector_index = self.vector_index or index
+        if self.vector_index:
+            console.print(
+                f"[green]Vector index: {self.vector_index['num_partitions']} partitions, "
+                f"{self.vector_index['num_sub_vectors']} sub-vectors, nprobes={self.vector_index['nprobes']}[/green]"
+            )
+        return self.vector_index
+
+    def _numpy_vectors(self, module_id: str, vectors: Optional[np.ndarray]) -> List[Dict[str, Any]]:
+        """
+        Копія векторів у .npy для точного in-process пошуку (NumpyVectorStore),
+        якщо модуль не більший за NUMPY_MAX_ROWS; інакше пошук лишається в LanceDB.
+        """
+        npvec_dir = self.output_file.parent / f"{module_id}.npvec"
+        if vectors is None or len(vectors) > NUMPY_MAX_ROWS:
+            if npvec_dir.exists():
+                shutil.rmtree(npvec_dir)
+            return []
+        return [NumpyVectorStore.save(self._reset_index_dir(module_id, "npvec"), vectors)]
+
+    @staticmethod
+    def _table_vectors(tables: Dict[str, Any], chunk_ids: Optional[List[int]] = None) -> np.ndarray:
+        """Вектори таблиці LanceDB (усіх шардів) у порядку `chunk_ids` (за замовчуванням — за зростанням id)."""
+        data = pa.concat_tables([t.to_arrow().select(["id", "vector"]) for t in tables.values()])
+        ids = data.column("id").to_numpy()
+        vectors = data.column("vector").combine_chunks().flatten().to_numpy().reshape(len(ids), -1)
+        order = np.argsort(ids)
+        if chunk_ids is None:
+            return vectors[order]
+        return vectors[order[np.searchsorted(ids, chunk_ids, sorter=order)]]
+
+    def _routing_entry(self, vectors: np.ndarray) -> List[Dict[str, Any]]:
+        """K-means центроїди векторів модуля: за ними ModuleRouter відсікає нерелевантні модулі."""
+        if len(vectors) > ROUTING_SAMPLE_ROWS:
+            vectors = vectors[np.random.default_rng(0).choice(len(vectors), ROUTING_SAMPLE_ROWS, replace=False)]
+        entry = routing_summary(vectors, self.embedding_model)
+        return [entry] if entry else []
+
+    @staticmethod
+    def _sample_table_vectors(tables: Dict[str, Any], rows: int = ROUTING_SAMPLE_ROWS) -> np.ndarray:
+        """Випадкова вибірка векторів таблиць LanceDB (пропорційно шардам) без читання всієї колонки."""
+        counts = {name: t.count_rows() for name, t in tables.items()}
+        total = sum(counts.values())
+        rng = np.random.default_rng(0)
+        parts = []
+        for name, table in tables.items():
+            n = min(counts[name], -(-rows * counts[name] // total)) if total else 0
+            if not n:
+                continue
+            positions = np.sort(rng.choice(counts[name], n, replace=False))
+            data = table.to_lance().take(positions.tolist(), columns=["vector"])
+            parts.append(data.column("vector").combine_chunks().flatten().to_numpy().reshape(n, -1))
+        return np.vstack(parts) if parts else np.zeros((0, 0), dtype=np.float32)
+
+    @staticmethod
+    def _sample_quantized(entry: Dict[str, Any], rows: int = ROUTING_SAMPLE_ROWS) -> np.ndarray:
+        qvec = QuantizedVectors(entry["uri"])
+        if not qvec.count:
+            return np.zeros((0, 0), dtype=np.float32)
+        return qvec.decode(np.sort(np.random.default_rng(0).choice(qvec.count, min(rows, qvec.count), replace=False)))
+
+    def _finalize_quantized(self, writer: QuantizedVectorWriter) -> Dict[str, Any]:
+        entry = writer.finalize()
+        size = QuantizedVectors(entry["uri"]).nbytes
+        full = entry["count"] * (entry["dim"] or 0) * 4
+        console.print(
+            f"[green]Quantized vectors ({entry['kind']}): {size / 1e6:.1f} MB "
+            f"vs {full / 1e6:.1f} MB float32[/green]"
+        )
+        return entry
+
+    def _update_quantized(self, module_id: str, old: QuantizedVectors, chunk_ids: List[int],
+                          old_positions: Dict[int, int], new_vectors: Dict[int, Any]) -> Dict[str, Any]:
+        """
+        Переписує компактні вектори в новому порядку docs: коди незмінених чанків
+        копіюються, нові квантуються з тими ж діапазонами вимірів.
+        """
+        tmp_dir = self._reset_index_dir(module_id, "qvec.tmp")
+        ranges = old.quantizer.ranges if old.quantizer is not None else None
+        writer = QuantizedVectorWriter(tmp_dir, old.kind, ranges=ranges)
+
+        # Послідовні відрізки одного походження пишемо одним викликом
+        run: List[int] = []
+        run_is_new = None
+        for chunk_id in chunk_ids + [None]:
+            is_new = chunk_id in new_vectors if chunk_id is not None else None
+            if run and (chunk_id is None or is_new != run_is_new):
+                if run_is_new:
+                    writer.add([new_vectors[i] for i in run])
+                else:
+                    writer.add_codes(old.take(np.array([old_positions[i] for i in run])))
+                run = []
+            if chunk_id is not None:
+                run.append(chunk_id)
+                run_is_new = is_new
+        writer.finalize()
+
+        qvec_dir = self.output_file.parent / f"{module_id}.qvec"
+        del old
+        if qvec_dir.exists():
+            shutil.rmtree(qvec_dir)
+        tmp_dir.rename(qvec_dir)
+        writer.out_dir = qvec_dir
+        return self._finalize_quantized(writer)
+
+    def _get_embedder(self) -> Embedder:
+        if self.embedder is None:
+            self.embedder = Embedder(self.embedding_model, workers=self.embed_workers, torch_threads=self.torch_threads)
+        return self.embedder
+
+    def _embed(self, chunks: List[str]) -> np.ndarray:
+        self._get_embedder()
+        console.print("[yellow]Generating embeddings (this may take a while)...[/yellow]")
+        embeddings = self.embedder.embed_array(chunks)
+        self._report_cache()
+        return embeddings
+
+    def _report_cache(self):
+        cache = self.embedder.cache if self.embedder else None
+        if cache is None:
+            return
+        stats = cache.stats()
+        console.print(
+            f"[dim]Embedding cache: {stats['hits']} hits, {stats['misses']} misses "
+            f"({stats['hit_rate']:.0%}), {stats['evictions']} evicted, "
+            f"{stats['size_bytes'] / 1e6:.0f}/{stats['max_bytes'] / 1e6:.0f} MB[/dim]"
+        )
+
+    @staticmethod
+    def _frame(embeddings: Optional[np.ndarray], chunks: List[str], sources: List[str], ids: List[int],
+               pages: Optional[List[Optional[int]]] = None, mtimes: Optional[List[float]] = None) -> pa.Table:
+        """
+        Arrow-таблиця для LanceDB. Вектори йдуть як FixedSizeList<float32>
+        поверх буфера NumPy-матриці, без проміжних списків Python.
+        embeddings=None: вектори зберігаються квантованими поза LanceDB.
+        Скалярні колонки ext/dir/page/mtime — для фільтрів пошуку (SearchFilters).
+        """
+        columns = {}
+        if embeddings is not None:
+            matrix = np.ascontiguousarray(embeddings, dtype=np.float32)
+            columns["vector"] = pa.FixedSizeListArray.from_arrays(pa.array(matrix.reshape(-1)), matrix.shape[1])
+        columns["text"] = pa.array(chunks, type=pa.string())
+        columns["source"] = pa.array(sources, type=pa.string())
+        columns["id"] = pa.array(ids, type=pa.int64())
+        columns["ext"] = pa.array([source_ext(s) for s in sources], type=pa.string())
+        columns["dir"] = pa.array([source_dir(s) for s in sources], type=pa.string())
+        columns["page"] = pa.array(pages if pages is not None else [None] * len(ids), type=pa.int32())
+        columns["mtime"] = pa.array(mtimes if mtimes is not None else [None] * len(ids), type=pa.float64())
+        return pa.table(columns)
+
+    @staticmethod
+    def _mtimes(manifest: BuildManifest, sources: List[str]) -> List[float]:
+        return [manifest.files[s].mtime for s in sources]
+
+    @staticmethod
+    def _update_mtimes(tables: Dict[str, Any], manifest: BuildManifest, touched: List[str]):
+        """Файли, у яких змінився лише mtime: колонка mtime їхніх рядків має збігатися з маніфестом."""
+        for table in tables.values():
+            if "mtime" not in table.schema.names:
+                continue  # модуль зібрано до колонок фільтрів
+            for rel in touched:
+                record = manifest.files[rel]
+                for i in range(0, len(record.chunk_ids), 1000):
+                    batch = ", ".join(str(x) for x in record.chunk_ids[i:i + 1000])
+                    table.update(where=f"id IN ({batch})", values={"mtime": record.mtime})
+        console.print(f"[yellow]Updated mtime of {len(touched)} touched files.[/yellow]")
+
+    def _index_columns(self, tables: Dict[str, Any]):
+        """Скалярні індекси колонок фільтрів, щоб prefilter не сканував усю таблицю."""
+        for table in tables.values():
+            create_scalar_indexes(table, FILTER_COLUMNS)
+
+    def _reset_lancedb_dir(self, module_id: str) -> Path:
+        return self._reset_index_dir(module_id, "lancedb")
+
+    def _reset_index_dir(self, module_id: str, kind: str) -> Path:
+        index_dir = self.output_file.parent / f"{module_id}.{kind}"
+        if index_dir.exists():
+            shutil.rmtree(index_dir)
+        index_dir.mkdir(parents=True, exist_ok=True)
+        return index_dir
+
+    def _build_keyword_index(self, module_id: str, chunks: List[str]) -> Dict[str, Any]:
+        bm25 = BM25Builder(self._reset_index_dir(module_id, "bm25"))
+        bm25.add(chunks)
+        return bm25.finalize()
+
+    def _new_header(self, module_id: str) -> Dict[str, Any]:
+        return {
+            "id": module_id,
+            "title": self.title,
+            "author": os.getenv("USER", "unknown"), # Це поле тепер є в моделі!
+            "created_at": get_current_timestamp(),
+            "version": "1.0",
+            "signature": None, # <--- ТУТ ЗМІНЕНО: None (null) замість ""
+            "license": "unknown"
+        }
+
+    def _default_metadata(self) -> Dict[str, Any]:
+        return {
+            "language": "detected",
+            "categories": ["auto-generated"],
+            "tags": [],
+            "locale": "en",
+            "intended_use": "general",
+            "risk_level": "low",
+            # ArkRAG бере модель запитів звідси, тож вектори запиту й індексу сумісні
+            "embedding_model": self.embedding_model,
+            "vector_index": self.vector_index,
+            "vector_storage": self.vector_storage,
+            "data_provenance": {
+                "author": os.getenv("USER", "local_user"),
+                "acquisition_method": "manual"
+            }
+        }
+
+    def _write_module(
+        self,
+        header: Dict[str, Any],
+        all_chunks: List[str],
+        chunk_sources: List[str],
+        chunk_ids: List[int],
+        lancedb_dir: Path,
+        index_entries: Optional[List[Dict[str, Any]]] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        update_manifest: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        # Формування Payload (Content)
+        search_index = Indexer.build_index(chunk_sources, chunk_ids)
+        # Дескриптори індексів (BM25, квантовані вектори) йдуть після рядків чанків
+        search_index.extend(index_entries or [])
+
         content = {
             "docs": all_chunks,
             "vector_index_uri": str(lancedb_dir.absolute()),
@@ -121,38 +715,26 @@ class ArkBuilder:
         checksum = calculate_checksum(content)
 
         ark_data = {
-            "header": {
-                "id": module_id,
-                "title": self.title,
-                "author": os.getenv("USER", "unknown"), # Це поле тепер є в моделі!
-                "created_at": get_current_timestamp(),
-                "version": "1.0",
-                "checksum": checksum,
-                "signature": None, # <--- ТУТ ЗМІНЕНО: None (null) замість ""
-                "license": "unknown"
-            },
-            "metadata": {
-                "language": "detected",
-                "categories": ["auto-generated"],
-                "tags": [],
-                "locale": "en",
-                "intended_use": "general",
-                "risk_level": "low",
-                "data_provenance": {
-                    "author": os.getenv("USER", "local_user"),
-                    "acquisition_method": "manual"
-                }
-            },
+            "header": dict(header, checksum=checksum),
+            "metadata": metadata or self._default_metadata(),
             "content": content,
             "signature_block": {},
-            "update_manifest": {}
+            "update_manifest": update_manifest or {}
         }
 
-        # 8. Запис фінального файлу .ark.json
+        # Запис фінального файлу .ark.json
         with open(self.output_file, "w", encoding="utf-8") as f:
             json.dump(ark_data, f, ensure_ascii=False, indent=2)
 
-        console.print(f"[bold green]✓ Build complete: {self.output_file}[/bold green]")
-        console.print(f"  ID: {module_id}")
-        console.print(f"  Vector DB: {lancedb_dir.name}")
-        console.print(f"  Checksum: {checksum}")
+        return checksum
+
+    @staticmethod
+    def _progress() -> Progress:
+        return Progress(
+            TextColumn("[progress.description]{task.description}"),
+            BarColumn(),
+            MofNCompleteColumn(),
+            TimeRemainingColumn(),
+            TextColumn("[dim]{task.fields[stats]}[/dim]"),
+            console=console,
+        )
@@ -0,0 +1,141 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ark_engine.core import query_cache
+from ark_engine.core.metrics import Histogram
+from ark_engine.core.model_registry import ModelRegistry
+
+logger = logging.getLogger("ark_embed_batcher")
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+QUEUE_WAIT_MS_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250, 1000)
+
+
+def _registry_encode(model_name: str, texts: List[str]) -> np.ndarray:
+    return ModelRegistry().get(model_name).encode(texts, convert_to_numpy=True)
+
+
+class EmbeddingBatcher:
+    """
+    Мікро-батчинг ембеддінгів запитів: запити, що прийшли протягом `window_ms`
+    (або до `max_batch` штук), кодуються одним викликом моделі у фоновому потоці,
+    а кожен викликач отримує свій вектор через Future.
+    """
+    def __init__(self, encode_fn: Optional[Callable[[str, List[str]], np.ndarray]] = None,
+                 window_ms: float = 5.0, max_batch: int = 32):
+        self.encode_fn = encode_fn or _registry_encode
+        self.window = max(0.0, window_ms) / 1000
+        self.max_batch = max(1, max_batch)
+        self.batch_size = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait_ms = Histogram(QUEUE_WAIT_MS_BUCKETS)
+        self._queue: "queue.Queue[Optional[Tuple[str, str, Future, float]]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="ark-embed-batcher", daemon=True)
+                self._thread.start()
+
+    def submit(self, model_name: str, text: str) -> Future:
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((model_name, text, future, time.perf_counter()))
+        return future
+
+    def encode(self, model_name: str, texts: List[str]) -> np.ndarray:
+        """Блокуючий виклик (len(texts) × dim) — сумісний з query_cache.set_query_encoder."""
+        futures = [self.submit(model_name, text) for text in texts]
+        return np.stack([f.result() for f in futures]) if futures else np.zeros((0, 0), dtype=np.float32)
+
+    def close(self):
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "window_ms": self.window * 1000,
+            "max_batch": self.max_batch,
+            "pending": self._queue.qsize(),
+            "batch_size": self.batch_size.snapshot(),
+            "queue_wait_ms": self.queue_wait_ms.snapshot(),
+        }
+
+    def _collect(self, first) -> Tuple[list, bool]:
+        """Добирає запити до max_batch або до кінця вікна від першого запиту."""
+        batch, deadline = [first], first[3] + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch, stop = self._collect(first)
+            started = time.perf_counter()
+            self.batch_size.observe(len(batch))
+            for item in batch:
+                self.queue_wait_ms.observe((started - item[3]) * 1000)
+
+            by_model: Dict[str, List[Tuple[str, Future]]] = {}
+            for model_name, text, future, _ in batch:
+                by_model.setdefault(model_name, []).append((text, future))
+            for model_name, items in by_model.items():
+                self._encode_group(model_name, items)
+            if stop:
+                return
+
+    def _encode_group(self, model_name: str, items: List[Tuple[str, Future]]):
+        unique = list(dict.fromkeys(text for text, _ in items))
+        try:
+            vectors = np.asarray(self.encode_fn(model_name, unique), dtype=np.float32)
+        except Exception as e:
+            logger.error(f"Batched embedding failed ({len(unique)} queries): {e}")
+            for _, future in items:
+                future.set_exception(e)
+            return
+        rows = dict(zip(unique, vectors))
+        for text, future in items:
+            future.set_result(rows[text])
+
+
+_ACTIVE: Optional[EmbeddingBatcher] = None
+
+
+def install_batcher(window_ms: float = 5.0, max_batch: int = 32) -> EmbeddingBatcher:
+    """Вмикає батчер для всіх промахів кешу запитів у процесі (embed_query/embed_queries)."""
+    global _ACTIVE
+    uninstall_batcher()
+    _ACTIVE = EmbeddingBatcher(window_ms=window_ms, max_batch=max_batch)
+    query_cache.set_query_encoder(_ACTIVE.encode)
+    logger.info(f"Query embedding batcher enabled (window {window_ms} ms, max batch {max_batch})")
+    return _ACTIVE
+
+
+def uninstall_batcher():
+    global _ACTIVE
+    if _ACTIVE is not None:
+        query_cache.set_query_encoder(None)
+        _ACTIVE.close()
+        _ACTIVE = None
+
+
+def active_batcher() -> Optional[EmbeddingBatcher]:
+    return _ACTIVE
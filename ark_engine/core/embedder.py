@@ -1,17 +1,66 @@
-from typing import List
-from sentence_transformers import SentenceTransformer
+from typing import List, Optional
+
+import numpy as np
+from rich.progress import Progress
+
+from ark_engine.core.embedding_cache import EmbeddingCache, get_default_cache, text_key
+from ark_engine.core.embedding_engine import EmbeddingEngine, embedding_model_key
+
+_USE_DEFAULT_CACHE = object()
 
 class Embedder:
     """
     Обгортка для локальної моделі Sentence Transformers.
+    Вектори проходять через дисковий EmbeddingCache: модель рахує лише
+    тексти, яких ще немає в кеші, і завантажується лише за потреби.
+    Обчислення виконує EmbeddingEngine (бакети за довжиною, пул процесів).
     """
-    def __init__(self, model_name: str = 'all-MiniLM-L6-v2'):
-        print(f"Loading embedding model: {model_name}...")
-        self.model = SentenceTransformer(model_name)
+    def __init__(self, model_name: str = 'all-MiniLM-L6-v2', cache=_USE_DEFAULT_CACHE,
+                 workers: int = 1, torch_threads: Optional[int] = None):
+        self.model_name = model_name
+        # Ключ кешу враховує бекенд (torch / onnx-int8)
+        self.model_key = embedding_model_key(model_name)
+        self.cache: Optional[EmbeddingCache] = get_default_cache() if cache is _USE_DEFAULT_CACHE else cache
+        self.engine = EmbeddingEngine(model_name, workers=workers, torch_threads=torch_threads)
+
+    @property
+    def model(self):
+        return self.engine.model
+
+    def close(self):
+        self.engine.close()
+
+    def _encode(self, texts: List[str], show_progress: bool) -> np.ndarray:
+        if not show_progress:
+            return self.engine.encode(texts)
+        with Progress() as progress:
+            task = progress.add_task("Embedding...", total=len(texts))
+            return self.engine.encode(texts, on_batch=lambda n: progress.advance(task, n))
 
-    def embed(self, texts: List[str]) -> List[List[float]]:
+    def embed(self, texts: List[str], show_progress: bool = True) -> List[List[float]]:
+        """Вектори як списки Python (для JSON та старих викликів)."""
+        return self.embed_array(texts, show_progress).tolist()
+
+    def embed_array(self, texts: List[str], show_progress: bool = True) -> np.ndarray:
+        """Вектори як одна матриця float32 (len(texts) × dim) — без поелементних копій."""
         if not texts:
-            return []
-        
-        embeddings = self.model.encode(texts, show_progress_bar=True)
-        return embeddings.tolist()
+            return np.zeros((0, 0), dtype=np.float32)
+
+        if self.cache is None:
+            return self._encode(texts, show_progress)
+
+        keys = [text_key(t) for t in texts]
+        found = self.cache.get_many(self.model_key, keys)
+
+        # Рахуємо тільки унікальні тексти, яких немає в кеші
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+
+        if missing:
+            computed = self._encode(list(missing.values()), show_progress)
+            self.cache.put_many(self.model_key, list(missing), computed)
+            found.update(zip(missing, computed))
+
+        return np.stack([found[key] for key in keys]).astype(np.float32, copy=False)
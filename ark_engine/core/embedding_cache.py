@@ -0,0 +1,166 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger("ark_embedding_cache")
+
+DEFAULT_CACHE_PATH = Path.home() / ".kovcheg" / "embedding_cache.sqlite"
+DEFAULT_MAX_MB = 2048
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Дисковий content-addressed кеш ембеддінгів у SQLite.
+    Ключ — (назва моделі, sha256 тексту чанка), значення — float32 вектор.
+    При перевищенні `max_bytes` видаляються найдавніше використані записи.
+    """
+    def __init__(self, path: Optional[Path] = None, max_bytes: Optional[int] = None):
+        self.path = Path(path or os.getenv("ARK_EMBEDDING_CACHE", DEFAULT_CACHE_PATH))
+        if max_bytes is None:
+            max_bytes = int(os.getenv("ARK_EMBEDDING_CACHE_MB", DEFAULT_MAX_MB)) * 1024 * 1024
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS embeddings
+               (model TEXT, key TEXT, vector BLOB, nbytes INTEGER, last_used REAL,
+                PRIMARY KEY (model, key))"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings(last_used)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(nbytes), 0) FROM embeddings"
+        ).fetchone()[0]
+
+    def get_many(self, model: str, keys: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Повертає знайдені вектори {key: vector}; решта рахується як промахи."""
+        found: Dict[str, np.ndarray] = {}
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            # SQLite обмежує кількість параметрів запиту
+            for i in range(0, len(unique), 500):
+                batch = unique[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE model=? AND key IN ({placeholders})",
+                    [model, *batch],
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used=? WHERE model=? AND key=?",
+                    [(now, model, key) for key in found],
+                )
+                self._conn.commit()
+
+            self.hits += len(found)
+            self.misses += len(unique) - len(found)
+        return found
+
+    def put_many(self, model: str, keys: Sequence[str], vectors: np.ndarray):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        now = time.time()
+        # Повтор ключа в пакеті замінює попередній — рахуємо лише останній
+        rows = {key: (model, key, vec.tobytes(), vec.nbytes, now) for key, vec in zip(keys, vectors)}
+        with self._lock:
+            # REPLACE звільняє місце старого запису: віднімаємо його розмір
+            replaced = self._stored_bytes(model, list(rows))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?, ?)", list(rows.values())
+            )
+            self._conn.commit()
+            self._total_bytes += sum(r[3] for r in rows.values()) - replaced
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _stored_bytes(self, model: str, keys: List[str]) -> int:
+        total = 0
+        for i in range(0, len(keys), 500):
+            batch = keys[i:i + 500]
+            placeholders = ",".join("?" * len(batch))
+            total += self._conn.execute(
+                f"SELECT COALESCE(SUM(nbytes), 0) FROM embeddings WHERE model=? AND key IN ({placeholders})",
+                [model, *batch],
+            ).fetchone()[0]
+        return total
+
+    def _evict(self):
+        """Видаляє LRU-записи, доки кеш не займе ~90% ліміту."""
+        # Інші процеси могли писати в той самий файл — перераховуємо точний розмір
+        self._total_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(nbytes), 0) FROM embeddings"
+        ).fetchone()[0]
+        target = int(self.max_bytes * 0.9)
+        while self._total_bytes > target:
+            rows = self._conn.execute(
+                "SELECT rowid, nbytes FROM embeddings ORDER BY last_used ASC LIMIT 1000"
+            ).fetchall()
+            if not rows:
+                break
+            freed, ids = 0, []
+            for rowid, nbytes in rows:
+                ids.append(rowid)
+                freed += nbytes
+                if self._total_bytes - freed <= target:
+                    break
+            self._conn.execute(
+                f"DELETE FROM embeddings WHERE rowid IN ({','.join('?' * len(ids))})", ids
+            )
+            self._conn.commit()
+            self._total_bytes -= freed
+            self.evictions += len(ids)
+        logger.info(f"Embedding cache evicted down to {self._total_bytes / 1e6:.1f} MB")
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size_bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+_default_cache: Optional[EmbeddingCache] = None
+_default_lock = threading.Lock()
+
+
+def get_default_cache() -> Optional[EmbeddingCache]:
+    """
+    Спільний кеш процесу. ARK_EMBEDDING_CACHE=off вимикає кешування.
+    """
+    global _default_cache
+    if os.getenv("ARK_EMBEDDING_CACHE", "").lower() in ("off", "0", "false"):
+        return None
+    with _default_lock:
+        if _default_cache is None:
+            try:
+                _default_cache = EmbeddingCache()
+            except sqlite3.Error as e:
+                logger.error(f"Embedding cache unavailable: {e}")
+                return None
+        return _default_cache
@@ -0,0 +1,186 @@
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger("ark_embedding_engine")
+
+# Бюджет токенів на один forward pass: короткі чанки йдуть великими батчами,
+# довгі — малими, тож на padding витрачається мінімум обчислень.
+DEFAULT_TOKENS_PER_BATCH = 8192
+DEFAULT_MAX_BATCH = 256
+
+
+def embedding_backend() -> str:
+    """Бекенд ембеддінгів з конфігурації: 'torch' (за замовчуванням) або 'onnx'."""
+    return os.getenv("ARK_EMBEDDING_BACKEND", "torch").lower()
+
+
+def embedding_model_key(model_name: str) -> str:
+    """Ключ моделі для кешів: вектори різних бекендів не змішуються."""
+    return model_name if embedding_backend() == "torch" else f"{model_name}@onnx-int8"
+
+
+def load_embedding_model(model_name: str, torch_threads: Optional[int] = None):
+    """
+    Завантажує модель обраного бекенду. ONNX-модель має бути заздалегідь
+    експортована (`ark export-onnx`); torch тоді взагалі не імпортується.
+    """
+    if embedding_backend() == "onnx":
+        from ark_engine.core.onnx_embedder import OnnxEmbeddingModel, onnx_model_dir
+        return OnnxEmbeddingModel(onnx_model_dir(model_name), threads=torch_threads)
+
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    if torch_threads:
+        torch.set_num_threads(torch_threads)
+    return SentenceTransformer(model_name, device="cpu")
+
+
+def _token_lengths(model, texts: List[str]) -> List[int]:
+    if hasattr(model, "token_lengths"):
+        return model.token_lengths(texts)
+    tokenizer = getattr(model, "tokenizer", None)
+    if tokenizer is None:
+        # Груба оцінка, якщо модель не має HF-токенізатора
+        return [len(t) // 4 + 2 for t in texts]
+    max_len = getattr(model, "max_seq_length", 512) or 512
+    encoded = tokenizer(texts, add_special_tokens=True, truncation=True, max_length=max_len)
+    return [len(ids) for ids in encoded["input_ids"]]
+
+
+def _encode(model, texts: List[str]) -> np.ndarray:
+    vectors = model.encode(texts, batch_size=len(texts), show_progress_bar=False, convert_to_numpy=True)
+    return np.asarray(vectors, dtype=np.float32)
+
+
+# --- Воркери пулу: кожен процес тримає одну копію моделі ---
+_worker_model = None
+
+
+def _init_worker(model_name: str, torch_threads: Optional[int]):
+    global _worker_model
+    _worker_model = load_embedding_model(model_name, torch_threads)
+
+
+def _worker_lengths(texts: List[str]) -> List[int]:
+    return _token_lengths(_worker_model, texts)
+
+
+def _worker_encode(texts: List[str]) -> np.ndarray:
+    return _encode(_worker_model, texts)
+
+
+def plan_batches(lengths: List[int], tokens_per_batch: int = DEFAULT_TOKENS_PER_BATCH,
+                 max_batch: int = DEFAULT_MAX_BATCH) -> List[List[int]]:
+    """
+    Сортує індекси за довжиною в токенах і ріже їх на батчі, розмір яких
+    підбирається так, щоб (кількість × найдовший вхід) не перевищувала бюджет.
+    """
+    order = np.argsort(np.asarray(lengths), kind="stable")
+    batches: List[List[int]] = []
+    current: List[int] = []
+    for idx in order:
+        longest = max(lengths[idx], 1)
+        if current and ((len(current) + 1) * longest > tokens_per_batch or len(current) >= max_batch):
+            batches.append(current)
+            current = []
+        current.append(int(idx))
+    if current:
+        batches.append(current)
+    return batches
+
+
+class EmbeddingEngine:
+    """
+    CPU-рушій ембеддінгів: сортує входи за довжиною в токенах, підбирає розмір
+    батчу під бюджет токенів і за потреби розподіляє батчі між пулом процесів
+    (по одній копії моделі на процес, з `torch_threads` потоками кожен).
+    Результат повертається в початковому порядку.
+    """
+    def __init__(
+        self,
+        model_name: str = 'all-MiniLM-L6-v2',
+        workers: int = 1,
+        torch_threads: Optional[int] = None,
+        tokens_per_batch: int = DEFAULT_TOKENS_PER_BATCH,
+        max_batch: int = DEFAULT_MAX_BATCH,
+    ):
+        self.model_name = model_name
+        self.workers = max(1, workers)
+        if torch_threads is None and self.workers > 1:
+            # Ділимо ядра між воркерами, щоб вони не конкурували за потоки
+            torch_threads = max(1, (os.cpu_count() or 1) // self.workers)
+        self.torch_threads = torch_threads
+        self.tokens_per_batch = tokens_per_batch
+        self.max_batch = max_batch
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def model(self):
+        # В одному процесі модель спільна для всього процесу (ModelRegistry);
+        # `torch_threads` стосується воркерів пулу.
+        from ark_engine.core.model_registry import ModelRegistry
+        return ModelRegistry().get(self.model_name)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            logger.info(f"Starting {self.workers} embedding workers ({self.torch_threads} torch threads each)")
+            # spawn: fork після ініціалізації torch/OpenMP може зависнути
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.model_name, self.torch_threads),
+            )
+        return self._pool
+
+    def encode(self, texts: List[str], on_batch: Optional[Callable[[int], None]] = None) -> np.ndarray:
+        """
+        Повертає матрицю float32 (len(texts) × dim) у порядку `texts`.
+        `on_batch(n)` викликається після кожного обробленого батчу з його розміром.
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        if self.workers == 1:
+            batches = plan_batches(_token_lengths(self.model, texts), self.tokens_per_batch, self.max_batch)
+            parts = []
+            for batch in batches:
+                parts.append(_encode(self.model, [texts[i] for i in batch]))
+                if on_batch:
+                    on_batch(len(batch))
+        else:
+            pool = self._get_pool()
+            # Токенізація теж паралельна — головному процесу модель не потрібна
+            step = max(1, len(texts) // self.workers + 1)
+            lengths: List[int] = []
+            for part in pool.map(_worker_lengths, [texts[i:i + step] for i in range(0, len(texts), step)]):
+                lengths.extend(part)
+
+            batches = plan_batches(lengths, self.tokens_per_batch, self.max_batch)
+            # Довгі батчі першими: краще балансування хвоста між воркерами
+            futures = [
+                (batch, pool.submit(_worker_encode, [texts[i] for i in batch]))
+                for batch in reversed(batches)
+            ]
+            parts, batches = [], []
+            for batch, future in futures:
+                parts.append(future.result())
+                batches.append(batch)
+                if on_batch:
+                    on_batch(len(batch))
+
+        result = np.empty((len(texts), parts[0].shape[1]), dtype=np.float32)
+        for batch, vectors in zip(batches, parts):
+            result[batch] = vectors
+        return result
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
@@ -0,0 +1,164 @@
+import logging
+import time
+from bisect import bisect_right
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from ark_engine.core.manifest import BuildManifest, FileRecord
+from ark_engine.core.text_loader import MonsterLoader
+from ark_engine.core.cleaners import TextCleaner
+from ark_engine.core.chunker import TextChunker
+
+logger = logging.getLogger("ark_extraction")
+
+# Етапи ETL у порядку виконання
+STAGES = ("load", "clean", "chunk")
+
+# (шлях, чанки, номер сторінки/аркуша кожного чанка або None, {етап: секунди, "chars": кількість символів},
+#  розмір/mtime/sha256 файлу для маніфесту)
+ExtractionResult = Tuple[Path, List[str], List[Optional[int]], Dict[str, float], FileRecord]
+
+
+def locate_pages(text: str, pages: List[str], chunks: List[str]) -> List[Optional[int]]:
+    """
+    Номер сторінки (з 1) для кожного чанка: позиція початку чанка в очищеному
+    тексті порівнюється з позиціями початків очищених сторінок.
+    """
+    starts, cursor = [], 0
+    for page in pages:
+        pos = text.find(page[:64], cursor) if page else -1
+        cursor = pos if pos >= 0 else cursor
+        starts.append(cursor)
+
+    result, cursor = [], 0
+    for chunk in chunks:
+        pos = text.find(chunk[:64], cursor)
+        cursor = pos if pos >= 0 else cursor
+        result.append(max(1, bisect_right(starts, cursor)))
+    return result
+
+
+class DocumentExtractor:
+    """
+    Етапи loader → cleaner → chunker для одного файлу.
+    Кожен процес пулу тримає власний екземпляр (і власний MonsterLoader).
+    """
+    def __init__(self, ocr_enabled: bool = True, max_chars: int = 1000):
+        self.loader = MonsterLoader(ocr_enabled=ocr_enabled)
+        self.cleaner = TextCleaner()
+        self.chunker = TextChunker(max_chars=max_chars)
+
+    def process(self, file_path: Path) -> ExtractionResult:
+        timings = {stage: 0.0 for stage in STAGES}
+        timings["chars"] = 0
+
+        t0 = time.perf_counter()
+        # Хеш рахується тут, у воркері: паралельно з іншими файлами і перед
+        # завантаженням, тож лоадер читає файл уже з page cache
+        record = BuildManifest.snapshot(file_path)
+        pages = self.loader.load_pages(file_path)
+        raw_text = "\n\n".join(pages) if pages is not None else self.loader.load(file_path)
+        timings["load"] = time.perf_counter() - t0
+        if not raw_text:
+            return file_path, [], [], timings, record
+
+        t0 = time.perf_counter()
+        clean_text = self.cleaner.normalize(raw_text)
+        timings["clean"] = time.perf_counter() - t0
+        timings["chars"] = len(clean_text)
+
+        t0 = time.perf_counter()
+        chunks = self.chunker.chunk(clean_text)
+        if pages is not None:
+            chunk_pages = locate_pages(clean_text, [self.cleaner.normalize(p) for p in pages], chunks)
+        else:
+            chunk_pages = [None] * len(chunks)
+        timings["chunk"] = time.perf_counter() - t0
+
+        return file_path, chunks, chunk_pages, timings, record
+
+
+# --- Воркери пулу процесів ---
+# Глобальний екземпляр живе окремо в кожному процесі-воркері.
+_worker_extractor: Optional[DocumentExtractor] = None
+
+
+def _init_worker(ocr_enabled: bool, max_chars: int):
+    global _worker_extractor
+    _worker_extractor = DocumentExtractor(ocr_enabled=ocr_enabled, max_chars=max_chars)
+
+
+def _process_in_worker(file_path: Path) -> ExtractionResult:
+    return _worker_extractor.process(file_path)
+
+
+def iter_extracted(
+    files: List[Path],
+    jobs: int = 1,
+    extractor: Optional[DocumentExtractor] = None,
+) -> Iterator[ExtractionResult]:
+    """
+    Повертає результати в тому ж порядку, що й `files`, незалежно від кількості
+    воркерів — це гарантує відтворювану контрольну суму модуля.
+    Воркери пулу створюють власні екстрактори з налаштуваннями `extractor`.
+    """
+    extractor = extractor or DocumentExtractor()
+    if jobs <= 1:
+        for file_path in files:
+            yield extractor.process(file_path)
+        return
+
+    # Обмежене вікно задач: воркери не випереджають споживача більше ніж на
+    # `window` файлів, тож пам'ять не росте, навіть якщо ембеддінг повільніший за ETL.
+    window = jobs * 4
+    logger.info(f"Extracting {len(files)} files with {jobs} worker processes (window={window})")
+
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_worker,
+        initargs=(extractor.loader.ocr_enabled, extractor.chunker.max_chars),
+    ) as executor:
+        pending = deque()
+        remaining = iter(files)
+        for file_path in islice(remaining, window):
+            pending.append(executor.submit(_process_in_worker, file_path))
+
+        # Віддаємо результати строго в порядку `files`
+        while pending:
+            result = pending.popleft().result()
+            for file_path in islice(remaining, 1):
+                pending.append(executor.submit(_process_in_worker, file_path))
+            yield result
+
+
+class StageStats:
+    """Накопичує час етапів і рахує сумарну пропускну здатність пулу."""
+
+    def __init__(self, workers: int = 1):
+        self.workers = max(1, workers)
+        self.seconds = {stage: 0.0 for stage in STAGES}
+        self.files = 0
+        self.chars = 0
+        self.chunks = 0
+
+    def add(self, chunks: List[str], timings: Dict[str, float]):
+        for stage in STAGES:
+            self.seconds[stage] += timings.get(stage, 0.0)
+        self.files += 1
+        self.chars += int(timings.get("chars", 0))
+        self.chunks += len(chunks)
+
+    def _rate(self, units: float, stage: str) -> float:
+        # Етапи виконуються паралельно у `workers` процесах
+        wall = self.seconds[stage] / self.workers
+        return units / wall if wall > 0 else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"load {self._rate(self.files, 'load'):.1f} files/s · "
+            f"clean {self._rate(self.chars, 'clean') / 1e6:.1f}M chars/s · "
+            f"chunk {self._rate(self.chunks, 'chunk'):.0f} chunks/s"
+        )
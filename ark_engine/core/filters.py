@@ -0,0 +1,75 @@
+from datetime import datetime
+from pathlib import PurePosixPath
+from typing import List, Optional, Union
+
+from pydantic import BaseModel, Field, field_validator
+
+# Скалярні колонки таблиці 'vectors' (ArkBuilder), за якими можна фільтрувати
+FILTER_COLUMNS = ("source", "ext", "dir", "page", "mtime")
+
+
+def source_ext(source: str) -> str:
+    return PurePosixPath(source).suffix.lower()
+
+
+def source_dir(source: str) -> str:
+    parent = str(PurePosixPath(source).parent)
+    return "" if parent == "." else parent
+
+
+def _quote(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _like_prefix(value: str) -> str:
+    """LIKE-шаблон «починається з `value`»: % і _ в імені папки — звичайні символи."""
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"{_quote(escaped + '%')} ESCAPE '\\'"
+
+
+class SearchFilters(BaseModel):
+    """
+    Обмеження пошуку підмножиною чанків модуля. Перетворюється на SQL-предикат,
+    який LanceDB застосовує як prefilter (зі скалярними індексами колонок).
+    """
+    ext: Optional[List[str]] = Field(None, description="File extensions, e.g. ['.pdf', '.docx'].")
+    dir: Optional[str] = Field(None, description="Source directory (relative to the build input), subfolders included.")
+    source: Optional[str] = Field(None, description="Exact relative source file.")
+    page_min: Optional[int] = Field(None, description="First page/sheet (1-based, PDF and spreadsheets).")
+    page_max: Optional[int] = Field(None, description="Last page/sheet.")
+    modified_after: Optional[datetime] = Field(None, description="Source file modified at or after.")
+    modified_before: Optional[datetime] = Field(None, description="Source file modified before.")
+
+    @field_validator("ext", mode="before")
+    @classmethod
+    def _normalize_ext(cls, value: Union[None, str, List[str]]):
+        if value is None:
+            return None
+        values = [value] if isinstance(value, str) else value
+        return [("" if v.startswith(".") else ".") + v.lower() for v in values if v]
+
+    @field_validator("dir", mode="before")
+    @classmethod
+    def _normalize_dir(cls, value: Optional[str]):
+        return value.strip("/") if isinstance(value, str) else value
+
+    def is_empty(self) -> bool:
+        return self.to_sql() is None
+
+    def to_sql(self) -> Optional[str]:
+        clauses = []
+        if self.ext:
+            clauses.append(f"ext IN ({', '.join(_quote(e) for e in self.ext)})")
+        if self.dir:
+            clauses.append(f"(dir = {_quote(self.dir)} OR dir LIKE {_like_prefix(self.dir + '/')})")
+        if self.source:
+            clauses.append(f"source = {_quote(self.source)}")
+        if self.page_min is not None:
+            clauses.append(f"page >= {int(self.page_min)}")
+        if self.page_max is not None:
+            clauses.append(f"page <= {int(self.page_max)}")
+        if self.modified_after is not None:
+            clauses.append(f"mtime >= {self.modified_after.timestamp()}")
+        if self.modified_before is not None:
+            clauses.append(f"mtime < {self.modified_before.timestamp()}")
+        return " AND ".join(clauses) if clauses else None
@@ -1,11 +1,13 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 class Indexer:
     
     @staticmethod
-    def build_index(doc_sources: List[str]) -> List[Dict[str, str]]:
+    def build_index(doc_sources: List[str], doc_ids: Optional[List[int]] = None) -> List[Dict[str, str]]:
+        if doc_ids is None:
+            doc_ids = range(len(doc_sources))
         index = []
-        for i, source in enumerate(doc_sources):
+        for i, source in zip(doc_ids, doc_sources):
             index.append({
                 "id": i,
                 "source": str(source)
@@ -0,0 +1,178 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("ark_kv_slots")
+
+# Скільки розмов тримати в пам'яті (стан KV однієї розмови — десятки МБ)
+CHAT_SLOTS = int(os.getenv("ARK_LLM_CHAT_SLOTS", 4))
+# Куди вивантажувати витіснені слоти ('off' — просто відкидати)
+SLOT_DIR = os.getenv("ARK_LLM_SLOT_DIR", str(Path.home() / ".kovcheg" / "kv_slots"))
+SLOT_SUFFIX = ".kvslot"
+META_SUFFIX = ".json"
+
+
+def _llama_state(**fields):
+    from llama_cpp import LlamaState
+    return LlamaState(**fields)
+
+
+def write_state(path: Path, state, meta: dict):
+    """
+    Стан llama.cpp на диск без pickle: масиви й сирі байти стану — у .npz,
+    решта (`meta`, n_tokens, розмір стану) — у JSON поруч. JSON пишеться
+    останнім, тож недописаний стан читач просто не побачить.
+    """
+    meta = dict(meta, n_tokens=int(state.n_tokens), llama_state_size=int(state.llama_state_size))
+    meta_path = path.with_name(path.name + META_SUFFIX)
+    meta_path.unlink(missing_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        np.savez(f, input_ids=np.asarray(state.input_ids), scores=np.asarray(state.scores),
+                 llama_state=np.frombuffer(bytes(state.llama_state), dtype=np.uint8))
+    os.replace(tmp, path)
+    tmp = meta_path.with_name(meta_path.name + ".tmp")
+    tmp.write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, meta_path)
+
+
+def read_meta(path: Path) -> Optional[dict]:
+    meta_path = path.with_name(path.name + META_SUFFIX)
+    if not (path.exists() and meta_path.exists()):
+        return None
+    return json.loads(meta_path.read_text(encoding="utf-8"))
+
+
+def read_state(path: Path, meta: dict, state_factory: Callable = _llama_state):
+    """Зворотне до write_state; файли лише парсяться (allow_pickle=False), код з них не виконується."""
+    with np.load(path, allow_pickle=False) as data:
+        return state_factory(
+            input_ids=data["input_ids"],
+            scores=data["scores"],
+            n_tokens=meta["n_tokens"],
+            llama_state=data["llama_state"].tobytes(),
+            llama_state_size=meta["llama_state_size"],
+        )
+
+
+def remove_state(path: Path):
+    path.unlink(missing_ok=True)
+    path.with_name(path.name + META_SUFFIX).unlink(missing_ok=True)
+
+
+class ChatSlot:
+    """
+    Розмова в KV-кеші: повідомлення, якими він заповнений, і стан llama.cpp після
+    останньої відповіді. `compact` — ті самі ходи без документів (лише питання):
+    ними промпт замінює історію, коли дослівна вже не вміщується в контекст.
+    """
+    def __init__(self, model_key: str, messages: List[dict], state, compact: Optional[List[dict]] = None):
+        self.model_key = model_key
+        self.messages = messages
+        self.state = state
+        self.compact = compact if compact is not None else messages
+
+
+class KVSlotPool:
+    """
+    LRU-пул станів KV-кешу за id чату. Витіснений слот пишеться на диск,
+    тож чат, до якого повернулися пізніше, теж не префілиться з нуля.
+    """
+    def __init__(self, max_slots: int = CHAT_SLOTS, spill_dir: Optional[str] = SLOT_DIR,
+                 state_factory: Callable = _llama_state):
+        """`state_factory` збирає стан, прочитаний з диска (за замовчуванням LlamaState)."""
+        self.max_slots = max(0, max_slots)
+        self.spill_dir = Path(spill_dir) if spill_dir and spill_dir != "off" else None
+        self.state_factory = state_factory
+        self._slots: "OrderedDict[str, ChatSlot]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _path(self, chat_id: str) -> Path:
+        return self.spill_dir / (hashlib.sha256(chat_id.encode("utf-8")).hexdigest()[:32] + SLOT_SUFFIX)
+
+    def get(self, chat_id: str, model_key: str) -> Optional[ChatSlot]:
+        with self._lock:
+            slot = self._slots.get(chat_id)
+            if slot is not None and slot.model_key == model_key:
+                self._slots.move_to_end(chat_id)
+                self.hits += 1
+                return slot
+            if slot is not None:
+                # Стан іншої моделі/промпту не відновлюється
+                del self._slots[chat_id]
+                self.misses += 1
+                return None
+
+        slot = self._read(chat_id)
+        if slot is None or slot.model_key != model_key:
+            self.misses += 1
+            return None
+        self.disk_hits += 1
+        self.put(chat_id, slot)
+        return slot
+
+    def put(self, chat_id: str, slot: ChatSlot):
+        with self._lock:
+            self._slots[chat_id] = slot
+            self._slots.move_to_end(chat_id)
+            evicted = []
+            while len(self._slots) > self.max_slots:
+                evicted.append(self._slots.popitem(last=False))
+                self.evictions += 1
+        for evicted_id, evicted_slot in evicted:
+            self._write(evicted_id, evicted_slot)
+
+    def drop(self, chat_id: str):
+        with self._lock:
+            self._slots.pop(chat_id, None)
+        if self.spill_dir is not None:
+            remove_state(self._path(chat_id))
+
+    def _read(self, chat_id: str) -> Optional[ChatSlot]:
+        if self.spill_dir is None:
+            return None
+        path = self._path(chat_id)
+        try:
+            meta = read_meta(path)
+            if meta is None:
+                return None
+            slot = ChatSlot(meta["model_key"], meta["messages"], read_state(path, meta, self.state_factory),
+                            compact=meta["compact"])
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable KV slot {path}: {e}")
+            slot = None
+        # Слот повертається в пам'ять (або зіпсований) — файли більше не актуальні
+        remove_state(path)
+        return slot
+
+    def _write(self, chat_id: str, slot: ChatSlot):
+        if self.spill_dir is None:
+            return
+        try:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+            write_state(self._path(chat_id), slot.state,
+                        {"model_key": slot.model_key, "messages": slot.messages, "compact": slot.compact})
+        except OSError as e:
+            logger.warning(f"Could not spill KV slot of chat {chat_id}: {e}")
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "slots": len(self._slots),
+                "max_slots": self.max_slots,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -1,10 +1,31 @@
+import hashlib
 import logging
 import os
+import threading
 from pathlib import Path
-from llama_cpp import Llama
+from typing import List, Optional, Tuple
+
+import llama_cpp
+from llama_cpp import Llama, LlamaState
+
+from ark_engine.core.kv_slots import ChatSlot, KVSlotPool, read_meta, read_state, write_state
+from ark_engine.core.llm_scheduler import INTERACTIVE, LLMScheduler, Ticket
 
 logger = logging.getLogger("ark_llm")
 
+MODELS_DIR = Path("/app/models_cache")
+# Багатокрокові чати тримають у контексті історію: більший n_ctx — довші розмови без обрізання
+N_CTX = int(os.getenv("ARK_LLM_CTX", 4096))
+MAX_TOKENS = 1024
+# Екземпляри моделі (= одночасні генерації) і скільки потоків CPU ділять між собою порівну
+LLM_INSTANCES = int(os.getenv("ARK_LLM_INSTANCES", 1))
+LLM_THREADS = int(os.getenv("ARK_LLM_THREADS", max(1, (os.cpu_count() or 4) - 1)))
+# Приблизна ціна службових токенів шаблону чату на одне повідомлення
+MESSAGE_OVERHEAD_TOKENS = 8
+# Стан KV-кешу системного промпту: рахується один раз і зберігається поруч з GGUF
+PREFIX_CACHE = os.getenv("ARK_LLM_PREFIX_CACHE", "1") != "0"
+PREFIX_SUFFIX = ".kvprefix"
+
 # --- СИСТЕМНИЙ ПРОМПТ (V5: FLEXIBLE ANALYST) ---
 SYSTEM_PROMPT_TEXT = """ТИ — ІНТЕЛЕКТУАЛЬНИЙ АНАЛІТИК СИСТЕМИ "КОВЧЕГ".
 ТВОЯ ЦІЛЬ: Допомогти користувачеві розібратися в наданих документах.
@@ -17,61 +38,258 @@ SYSTEM_PROMPT_TEXT = """ТИ — ІНТЕЛЕКТУАЛЬНИЙ АНАЛІТИК
 5. МОВА: Відповідай мовою запиту (українською).
 """
 
+
+def _compact(state: LlamaState) -> LlamaState:
+    """
+    Логіти рядків стану не потрібні: після відновлення нові токени завжди
+    дооцінюються. Лишаємо один рядок (load_state розмножує його broadcast'ом)
+    замість n_tokens × vocab float32 — сотні МБ для великих словників.
+    """
+    state.scores = state.scores[-1:].copy()
+    return state
+
+
+def _shared_messages(a: List[dict], b: List[dict]) -> int:
+    """Скільки перших повідомлень двох промптів збігаються."""
+    n = 0
+    while n < min(len(a), len(b)) and a[n] == b[n]:
+        n += 1
+    return n
+
+
+def load_instances(model_path: Path, instances: int, threads: int = LLM_THREADS) -> List[Llama]:
+    """
+    K екземплярів llama.cpp, кожен зі своєю часткою ядер (і для генерації, і для
+    префілу). Ваги mmap-ляться з того самого GGUF, тож у пам'яті вони одні
+    (спільний page cache); окремі в кожного лише KV-кеш і робочі буфери.
+    """
+    per_instance = max(1, threads // max(1, instances))
+    return [
+        Llama(
+            model_path=str(model_path),
+            n_ctx=N_CTX,
+            n_threads=per_instance,
+            n_threads_batch=per_instance,
+            n_batch=512,
+            use_mmap=True,
+            use_mlock=False,
+            verbose=False
+        )
+        for _ in range(max(1, instances))
+    ]
+
+
 class LLMEngine:
     _instance = None
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(LLMEngine, cls).__new__(cls)
-            cls._instance._model = None
+            cls._instance._models: List[Llama] = []
+            cls._instance._load_lock = threading.RLock()
+            cls._instance._model_path = None
+            cls._instance._model_key = None
+            cls._instance.prefix_cache = PREFIX_CACHE
+            cls._instance._prefix_tokens: Optional[List[int]] = None
+            cls._instance._prefix_state: Optional[LlamaState] = None
+            cls._instance.slots = KVSlotPool()
+            # Слот генерації = екземпляр llama.cpp: один екземпляр не можна викликати з кількох потоків
+            cls._instance.scheduler = LLMScheduler(slots=max(1, LLM_INSTANCES))
         return cls._instance
 
+    @staticmethod
+    def _find_model() -> Path:
+        default_path = MODELS_DIR / "qwen2.5-3b-instruct.gguf"
+        if default_path.exists():
+            return default_path
+        found = list(MODELS_DIR.glob("*.gguf"))
+        if found:
+            return found[0]
+        raise FileNotFoundError("Model not found!")
+
     def load_model(self):
-        if self._model is not None: return
+        if self._models: return
 
-        default_path = Path("/app/models_cache/qwen2.5-3b-instruct.gguf")
-        if default_path.exists():
-            model_path = default_path
-        else:
-            found = list(Path("/app/models_cache").glob("*.gguf"))
-            if found: model_path = found[0]
-            else: raise FileNotFoundError("Model not found!")
-
-        logger.info(f"🚀 Loading LLM: {model_path}")
-        
-        total_threads = os.cpu_count() or 4
-        safe_threads = max(1, total_threads - 1)
-
-        self._model = Llama(
-            model_path=str(model_path),
-            n_ctx=4096,           
-            n_threads=safe_threads, 
-            n_batch=512,
-            use_mmap=True,        
-            use_mlock=False,      
-            verbose=False
-        )
+        with self._load_lock:
+            if self._models: return
+            model_path = self._find_model()
+            logger.info(f"🚀 Loading LLM: {model_path} ({self.scheduler.slots} instance(s), {LLM_THREADS} threads)")
 
-    def generate_stream(self, query: str, context: str):
-        self.load_model()
-        
-        limit = 10000 
+            models = load_instances(model_path, self.scheduler.slots)
+            self._model_path = model_path
+            self._model_key = self._state_key()
+            if self.prefix_cache:
+                self._load_prefix(models[0])
+            self._models = models
+
+    @staticmethod
+    def _messages(query: str, context: str) -> List[dict]:
+        limit = 10000
         if len(context) > limit:
             context = context[:limit] + "... [контекст обрізано]"
 
-        messages = [
+        return [
             {"role": "system", "content": SYSTEM_PROMPT_TEXT},
             {"role": "user", "content": f"ДОКУМЕНТИ:\n{context}\n\nЗАПИТАННЯ КОРИСТУВАЧА:\n{query}"}
         ]
 
-        stream = self._model.create_chat_completion(
-            messages=messages,
-            max_tokens=1024,
-            temperature=0.3, 
+    @staticmethod
+    def _question(query: str) -> dict:
+        """Хід у компактній історії чату: документи, підставлені тоді, не повторюються."""
+        return {"role": "user", "content": f"ЗАПИТАННЯ КОРИСТУВАЧА:\n{query}"}
+
+    # --- KV-кеш системного промпту ---
+
+    def _state_key(self) -> str:
+        """Стан KV придатний лише для того самого промпту, моделі, n_ctx і версії llama.cpp."""
+        stat = self._model_path.stat()
+        return hashlib.sha256(
+            f"{SYSTEM_PROMPT_TEXT}|{self._model_path.name}|{stat.st_size}|{stat.st_mtime}|{N_CTX}|{llama_cpp.__version__}"
+            .encode("utf-8")
+        ).hexdigest()[:16]
+
+    def _prefix_path(self) -> Path:
+        """Файл стану поруч з GGUF."""
+        return self._model_path.with_name(f"{self._model_path.name}.{self._model_key}{PREFIX_SUFFIX}")
+
+    @staticmethod
+    def _prompt_tokens(model: Llama, messages: List[dict]) -> List[int]:
+        """Токени промпту за шаблоном чату моделі (оцінка одного токена відповіді)."""
+        for _ in model.create_chat_completion(messages=messages, max_tokens=1, stream=True):
+            pass
+        return model.input_ids[:model.n_tokens].tolist()
+
+    def _load_prefix(self, model: Llama):
+        """Стан однаково підходить усім екземплярам: та сама модель і n_ctx."""
+        path = self._prefix_path()
+        try:
+            meta = read_meta(path)
+            if meta is not None and meta.get("key") == self._model_key:
+                self._prefix_state = read_state(path, meta, LlamaState)
+                self._prefix_tokens = meta["tokens"]
+                logger.info(f"Loaded system prompt KV state ({len(self._prefix_tokens)} tokens) from {path.name}")
+                return
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable KV state {path}: {e}")
+
+        # Спільний префікс двох промптів з різними документами — системна частина шаблону
+        a = self._prompt_tokens(model, self._messages("?", "А"))
+        b = self._prompt_tokens(model, self._messages("?", "Б"))
+        n = 0
+        while n < min(len(a), len(b)) - 1 and a[n] == b[n]:
+            n += 1
+        # Після другого промпту KV вже містить префікс: обрізаємо стан до нього
+        model.n_tokens = n
+        self._prefix_tokens = a[:n]
+        self._prefix_state = _compact(model.save_state())
+        logger.info(f"Evaluated system prompt prefix: {n} tokens")
+
+        try:
+            write_state(path, self._prefix_state, {"key": self._model_key, "tokens": self._prefix_tokens})
+        except OSError as e:
+            logger.warning(f"Could not save KV state next to the model ({e}); it will be recomputed on restart")
+
+    @staticmethod
+    def _restore(model: Llama, state: LlamaState):
+        """
+        Відновлює стан, якщо в контексті зараз щось інше: llama.cpp далі сам
+        знаходить спільний префікс з новим промптом і префілить лише решту.
+        """
+        n = state.n_tokens
+        if model.n_tokens >= n and (model.input_ids[:n] == state.input_ids[:n]).all():
+            return
+        model.load_state(state)
+
+    def _restore_prefix(self, model: Llama):
+        if self._prefix_state is None:
+            with self._load_lock:
+                if self._prefix_state is None:
+                    self._load_prefix(model)
+        self._restore(model, self._prefix_state)
+
+    # --- Слоти розмов ---
+
+    @staticmethod
+    def _count_tokens(model: Llama, message: dict) -> int:
+        return len(model.tokenize(message["content"].encode("utf-8"), add_bos=False)) + MESSAGE_OVERHEAD_TOKENS
+
+    def _fit_history(self, model: Llama, slot: ChatSlot, message: dict) -> Tuple[List[dict], List[dict]]:
+        """
+        Історія, що вміщується в n_ctx разом з новим повідомленням і відповіддю, і її
+        компактна форма. Дослівна історія слоту (весь його KV-кеш придатний) — якщо
+        вміщується; інакше ходи без документів, а за потреби ще й без найстаріших
+        пар (питання, відповідь). Системний промпт лишається завжди.
+        """
+        budget = N_CTX - MAX_TOKENS - self._count_tokens(model, message)
+        if sum(self._count_tokens(model, m) for m in slot.messages) <= budget:
+            return slot.messages, slot.compact
+
+        history = slot.compact
+        counts = [self._count_tokens(model, m) for m in history]
+        start, total = 1, sum(counts)
+        while start < len(history) and total > budget:
+            total -= sum(counts[start:start + 2])
+            start += 2
+        history = history[:1] + history[start:]
+        return history, history
+
+    def drop_chat(self, chat_id: str):
+        """Забуває стан KV розмови (чат видалено)."""
+        self.slots.drop(chat_id)
+
+    def clear_context(self):
+        """Скидає KV-контекст: наступний запит префілиться повністю (холодний старт, бенчмарк)."""
+        self.load_model()
+        for model in self._models:
+            model.reset()
+
+    def generate_stream(self, query: str, context: str, chat_id: Optional[str] = None,
+                        ticket: Optional[Ticket] = None):
+        """
+        Потокова відповідь. З `chat_id` попередні питання й відповіді чату
+        лишаються в промпті, а KV-кеш розмови береться зі слоту — наступний
+        крок префілить лише нове повідомлення.
+        `ticket` — місце в черзі планувальника (веб-бекенд бере його до початку
+        відповіді, щоб віддати 429); без нього запит стає в чергу як інтерактивний.
+        """
+        with ticket or self.scheduler.submit(INTERACTIVE) as ticket:
+            yield from self._generate(query, context, chat_id, ticket)
+
+    def _generate(self, query: str, context: str, chat_id: Optional[str], ticket: Ticket):
+        self.load_model()
+        # Слот планувальника — індекс екземпляра, яким зараз ніхто інший не користується
+        model = self._models[ticket.slot]
+        system, message = self._messages(query, context)
+
+        slot = self.slots.get(chat_id, self._model_key) if chat_id else None
+        history, compact = self._fit_history(model, slot, message) if slot else ([system], [system])
+        # Стан слоту корисний, якщо промпт ділить з ним більше, ніж системний промпт:
+        # llama.cpp сам знаходить спільний префікс токенів і префілить лише решту
+        if slot is not None and _shared_messages(history, slot.messages) > 1:
+            self._restore(model, slot.state)
+        elif self.prefix_cache:
+            self._restore_prefix(model)
+
+        stream = model.create_chat_completion(
+            messages=history + [message],
+            max_tokens=MAX_TOKENS,
+            temperature=0.3,
             stream=True
         )
 
+        answer = []
         for chunk in stream:
+            if ticket.cancelled:
+                # Клієнт пішов: далі не генеруємо; слот чату лишається на попередньому кроці
+                stream.close()
+                logger.info(f"Generation cancelled after {len(answer)} tokens")
+                return
             delta = chunk["choices"][0]["delta"]
             if "content" in delta:
+                answer.append(delta["content"])
                 yield delta["content"]
+
+        if chat_id:
+            reply = {"role": "assistant", "content": "".join(answer)}
+            self.slots.put(chat_id, ChatSlot(self._model_key, history + [message, reply], _compact(model.save_state()),
+                                             compact=compact + [self._question(query), reply]))
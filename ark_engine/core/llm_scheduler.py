@@ -0,0 +1,192 @@
+import itertools
+import logging
+import math
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from ark_engine.core.metrics import Histogram
+
+logger = logging.getLogger("ark_llm_scheduler")
+
+# Класи пріоритету: менше число обслуговується раніше
+INTERACTIVE = 0
+BATCH = 1
+PRIORITIES = {"interactive": INTERACTIVE, "batch": BATCH}
+
+# Довжина черги запитів до LLM і скільки запит може чекати на слот генерації (с)
+LLM_QUEUE = int(os.getenv("ARK_LLM_QUEUE", 16))
+LLM_DEADLINE = float(os.getenv("ARK_LLM_DEADLINE", 60))
+
+QUEUE_WAIT_MS_BUCKETS = (10, 50, 100, 500, 1000, 5000, 10000, 30000, 60000)
+
+
+class SchedulerBusy(Exception):
+    """Черга LLM заповнена: клієнту варто повторити запит через `retry_after` секунд."""
+    def __init__(self, retry_after: int):
+        super().__init__(f"LLM queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(Exception):
+    """Запит не дочекався вільного слота генерації до свого дедлайну."""
+
+
+class RequestCancelled(Exception):
+    """Клієнт пішов, поки запит чекав у черзі."""
+
+
+class Ticket:
+    """
+    Місце запиту в черзі. `with ticket:` чекає на слот генерації і звільняє його;
+    `release()` ідемпотентний і також прибирає з черги запит, який так і не почався.
+    `cancel()` — відповідь більше нікому не потрібна: генерація зупиняється на
+    наступному токені, запит у черзі знімається.
+    """
+    def __init__(self, scheduler: "LLMScheduler", priority: int, deadline: float, seq: int):
+        self.scheduler = scheduler
+        self.priority = priority
+        self.seq = seq
+        self.deadline = deadline
+        self.enqueued = time.monotonic()
+        self.slot: Optional[int] = None
+        self.started: Optional[float] = None
+        # Потік запиту вже дійшов до генерації й чекає на слот
+        self.waiting = False
+        self.done = False
+        self.cancelled = False
+
+    def __enter__(self) -> "Ticket":
+        self.scheduler._wait(self)
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def release(self):
+        self.scheduler._release(self)
+
+    def cancel(self):
+        self.scheduler._cancel(self)
+
+
+class LLMScheduler:
+    """
+    Планувальник перед LLMEngine: обмежена черга, фіксована кількість слотів
+    генерації, класи пріоритету (інтерактивний чат раніше за пакетні задачі),
+    дедлайн очікування для кожного запиту і відмова (429) при повній черзі.
+    """
+    def __init__(self, slots: int = 1, max_queue: int = LLM_QUEUE, deadline: float = LLM_DEADLINE):
+        """`slots` — скільки генерацій іде одночасно: по одній на екземпляр моделі."""
+        self.slots = max(1, slots)
+        self.max_queue = max(0, max_queue)
+        self.deadline = deadline
+        self._cond = threading.Condition()
+        self._queue: List[Ticket] = []
+        self._seq = itertools.count()
+        self._free = list(range(self.slots))
+        self.admitted = 0
+        self.rejected = 0
+        self.expired = 0
+        self.completed = 0
+        self.cancelled = 0
+        # Середня тривалість генерації (EWMA) — для оцінки Retry-After
+        self._service_s = 10.0
+        self.queue_wait_ms = Histogram(QUEUE_WAIT_MS_BUCKETS)
+
+    def submit(self, priority: int = INTERACTIVE, deadline: Optional[float] = None) -> Ticket:
+        """Ставить запит у чергу без очікування; `deadline` — секунд від зараз. Повна черга → SchedulerBusy."""
+        deadline = time.monotonic() + (self.deadline if deadline is None else deadline)
+        ticket = Ticket(self, priority, deadline, next(self._seq))
+        with self._cond:
+            self._drop_abandoned()
+            if len(self._queue) >= self.max_queue and not self._free:
+                self.rejected += 1
+                raise SchedulerBusy(self._retry_after())
+            self._queue.append(ticket)
+            self.admitted += 1
+        return ticket
+
+    def _drop_abandoned(self):
+        """Запити, що так і не дійшли до генерації (клієнт пішов раніше) і прострочені, звільняють чергу."""
+        now = time.monotonic()
+        for ticket in [t for t in self._queue if not t.waiting and t.deadline < now]:
+            self._queue.remove(ticket)
+            ticket.done = True
+            self.expired += 1
+
+    def _next(self) -> Optional[Ticket]:
+        """Найпріоритетніший з запитів, що вже чекають на слот (FIFO всередині класу)."""
+        waiting = [t for t in self._queue if t.waiting]
+        return min(waiting, key=lambda t: (t.priority, t.seq)) if waiting else None
+
+    def _retry_after(self) -> int:
+        return max(1, math.ceil(self._service_s * (len(self._queue) + 1) / self.slots))
+
+    def _wait(self, ticket: Ticket):
+        with self._cond:
+            if ticket.done:
+                if ticket.cancelled:
+                    raise RequestCancelled("Request was cancelled before it started")
+                raise DeadlineExceeded("Request expired before it started")
+            ticket.waiting = True
+            while not (self._free and self._next() is ticket):
+                if ticket.done:
+                    raise RequestCancelled("Request was cancelled while queued")
+                remaining = ticket.deadline - time.monotonic()
+                if remaining <= 0:
+                    self._dequeue(ticket)
+                    ticket.done = True
+                    self.expired += 1
+                    raise DeadlineExceeded("No free LLM slot within the request deadline")
+                self._cond.wait(timeout=remaining)
+            self._queue.remove(ticket)
+            ticket.slot = self._free.pop()
+            ticket.started = time.monotonic()
+        self.queue_wait_ms.observe((ticket.started - ticket.enqueued) * 1000)
+
+    def _dequeue(self, ticket: Ticket):
+        if ticket in self._queue:
+            self._queue.remove(ticket)
+        self._cond.notify_all()
+
+    def _release(self, ticket: Ticket):
+        with self._cond:
+            if ticket.done:
+                return
+            ticket.done = True
+            if ticket.slot is None:
+                self._dequeue(ticket)
+                return
+            self._free.append(ticket.slot)
+            self.completed += 1
+            self._service_s = 0.8 * self._service_s + 0.2 * (time.monotonic() - ticket.started)
+            self._cond.notify_all()
+
+    def _cancel(self, ticket: Ticket):
+        with self._cond:
+            if ticket.done or ticket.cancelled:
+                return
+            ticket.cancelled = True
+            self.cancelled += 1
+            if ticket.slot is None:
+                ticket.done = True
+                self._dequeue(ticket)
+
+    def stats(self) -> Dict[str, object]:
+        with self._cond:
+            queued = {name: sum(1 for t in self._queue if t.priority == priority) for name, priority in PRIORITIES.items()}
+            return {
+                "slots": self.slots,
+                "running": self.slots - len(self._free),
+                "queued": queued,
+                "max_queue": self.max_queue,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "expired": self.expired,
+                "completed": self.completed,
+                "cancelled": self.cancelled,
+                "mean_generation_s": round(self._service_s, 3),
+                "queue_wait_ms": self.queue_wait_ms.snapshot(),
+            }
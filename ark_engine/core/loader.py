@@ -64,4 +64,28 @@ class ArkLoader:
             # In strict mode, this should raise error, but for MVP we warn
             # raise ValueError("Integrity Check Failed: Checksum mismatch")
 
+        # Після перевірки checksum: шляхи змінюються лише в пам'яті, файл (і підпис) — ні
+        cls._resolve_uris(module, path.parent)
         return module
+
+    @staticmethod
+    def _resolve_uris(module: ArkModule, base_dir: Path):
+        """
+        Індекси модуля ({id}.lancedb, .bm25, .qvec, .npvec) лежать поруч з .ark файлом,
+        а дескриптори зберігають шляхи часу збірки. Каталог з тим самим ім'ям поруч
+        з модулем має пріоритет — встановлений пакет читає свої копії, навіть коли
+        папки збірки вже немає. Відносні URI рахуються від каталогу модуля.
+        """
+        def resolve(uri: str) -> str:
+            path = Path(uri)
+            local = base_dir / path.name
+            if local.exists():
+                return str(local.absolute())
+            return str(path if path.is_absolute() else (base_dir / path).absolute())
+
+        content = module.content
+        if content.vector_index_uri:
+            content.vector_index_uri = resolve(content.vector_index_uri)
+        for entry in content.search_index:
+            if entry.get("uri"):
+                entry["uri"] = resolve(entry["uri"])
@@ -0,0 +1,95 @@
+import json
+import logging
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from pydantic import BaseModel, Field
+
+from ark_engine.core.utils import calculate_file_sha256
+
+logger = logging.getLogger("ark_manifest")
+
+
+class FileRecord(BaseModel):
+    """Стан одного вихідного файлу на момент збірки."""
+    size: int
+    mtime: float
+    sha256: str
+    chunk_ids: List[int] = Field(default_factory=list, description="IDs рядків у таблиці LanceDB 'vectors'.")
+
+
+class BuildManifest(BaseModel):
+    """
+    Маніфест збірки: відносний шлях файлу → розмір, mtime, sha256 та його chunk ids.
+    Зберігається поруч з модулем як `{module_id}.manifest.json` і дозволяє
+    інкрементальне оновлення (`ark build --update`).
+    """
+    version: str = "1"
+    module_id: str
+    next_chunk_id: int = 0
+    files: Dict[str, FileRecord] = Field(default_factory=dict)
+
+    @staticmethod
+    def path_for(module_file: Path, module_id: str) -> Path:
+        return Path(module_file).parent / f"{module_id}.manifest.json"
+
+    @classmethod
+    def load(cls, path: Path) -> "BuildManifest":
+        if not path.exists():
+            raise FileNotFoundError(f"Build manifest not found: {path}. Run a full build first.")
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(**json.load(f))
+
+    def save(self, path: Path):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.model_dump_json(indent=2))
+
+    def allocate_ids(self, count: int) -> List[int]:
+        """Видає нові унікальні chunk ids (старі ніколи не перевикористовуються)."""
+        ids = list(range(self.next_chunk_id, self.next_chunk_id + count))
+        self.next_chunk_id += count
+        return ids
+
+    @staticmethod
+    def snapshot(file_path: Path) -> FileRecord:
+        stat = file_path.stat()
+        return FileRecord(
+            size=stat.st_size,
+            mtime=stat.st_mtime,
+            sha256=calculate_file_sha256(file_path),
+        )
+
+    def diff(self, files: List[Path], input_dir: Path) -> Tuple[List[Path], List[str], List[str]]:
+        """
+        Порівнює поточний вміст `input_dir` з маніфестом.
+        Повертає (нові або змінені файли, відносні шляхи видалених файлів,
+        відносні шляхи файлів, у яких змінився лише mtime).
+        Файли з тим самим розміром і mtime вважаються незмінними без читання;
+        якщо змінився лише mtime, а sha256 той самий — оновлюється тільки mtime
+        (і в маніфесті, і в колонці mtime їхніх рядків — див. ArkBuilder.update).
+        """
+        changed: List[Path] = []
+        touched: List[str] = []
+        seen = set()
+
+        for file_path in files:
+            rel = str(file_path.relative_to(input_dir))
+            seen.add(rel)
+            record = self.files.get(rel)
+            if record is None:
+                changed.append(file_path)
+                continue
+
+            stat = file_path.stat()
+            if stat.st_size == record.size and stat.st_mtime == record.mtime:
+                continue
+
+            if stat.st_size == record.size and calculate_file_sha256(file_path) == record.sha256:
+                record.mtime = stat.st_mtime
+                touched.append(rel)
+                continue
+
+            changed.append(file_path)
+
+        removed = [rel for rel in self.files if rel not in seen]
+        return changed, removed, touched
@@ -0,0 +1,28 @@
+import threading
+from bisect import bisect_left
+from typing import Dict, Sequence
+
+
+class Histogram:
+    """Кумулятивна гістограма з фіксованими межами (як Prometheus `le`-бакети)."""
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self.counts[bisect_left(self.bounds, value)] += 1
+            self.count += 1
+            self.sum += value
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            buckets, total = {}, 0
+            for bound, n in zip(self.bounds + ["+Inf"], self.counts):
+                total += n
+                buckets[f"le_{bound}"] = total
+            return {"count": self.count, "sum": self.sum,
+                    "mean": self.sum / self.count if self.count else 0.0, "buckets": buckets}
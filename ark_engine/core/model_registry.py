@@ -0,0 +1,69 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict
+
+from ark_engine.core.embedding_engine import load_embedding_model, embedding_model_key
+
+logger = logging.getLogger("ark_model_registry")
+
+DEFAULT_EMBEDDING_MODEL = 'all-MiniLM-L6-v2'
+
+
+class ModelRegistry:
+    """
+    Процесний реєстр моделей ембеддінгів: кожна модель завантажується один раз
+    і далі віддається всім потокам. Кількість одночасно резидентних моделей
+    обмежена `max_models`; найдавніше використана вивантажується першою.
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __new__(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                instance = super(ModelRegistry, cls).__new__(cls)
+                instance._models = OrderedDict()
+                instance._load_locks: Dict[str, threading.Lock] = {}
+                instance._lock = threading.Lock()
+                instance.max_models = max(1, int(os.getenv("ARK_MAX_EMBEDDING_MODELS", 2)))
+                cls._instance = instance
+        return cls._instance
+
+    def get(self, model_name: str = DEFAULT_EMBEDDING_MODEL, warmup: bool = False) -> Any:
+        # Ключ враховує бекенд: torch- та onnx-копії однієї моделі — різні записи
+        key = embedding_model_key(model_name)
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._models.move_to_end(key)
+                return model
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Завантаження під окремим локом: інші моделі тим часом доступні
+        with load_lock:
+            with self._lock:
+                model = self._models.get(key)
+            if model is None:
+                logger.info(f"Loading embedding model: {key}")
+                model = load_embedding_model(model_name)
+                if warmup:
+                    model.encode(["warmup"])
+                with self._lock:
+                    self._models[key] = model
+                    while len(self._models) > self.max_models:
+                        evicted, _ = self._models.popitem(last=False)
+                        logger.info(f"Evicted embedding model: {evicted}")
+        return model
+
+    def warmup(self, model_name: str = DEFAULT_EMBEDDING_MODEL):
+        self.get(model_name, warmup=True)
+
+    def loaded(self):
+        with self._lock:
+            return list(self._models)
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
@@ -19,6 +19,9 @@ class ArkMetadata(BaseModel):
     risk_level: str = Field("safe", description="Content safety marker.")
     tags: List[str] = Field(default_factory=list, description="Keywords for quick search.")
     data_provenance: Dict[str, Any] = Field(default_factory=dict, description="Lineage information.")
+    embedding_model: str = Field("all-MiniLM-L6-v2", description="Sentence-embedding model used to build the vector index.")
+    vector_storage: str = Field("float32", description="Vector precision: float32 (LanceDB) or float16/int8/binary codes.")
+    vector_index: Optional[Dict[str, Any]] = Field(None, description="ANN index of the vector table and its default search parameters.")
 
 class ArkContent(BaseModel):
     docs: List[str] = Field(..., description="List of normalized textual chunks.")
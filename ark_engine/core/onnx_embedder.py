@@ -0,0 +1,147 @@
+import json
+import logging
+import os
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger("ark_onnx_embedder")
+
+DEFAULT_ONNX_DIR = Path.home() / ".kovcheg" / "onnx"
+FP32_FILE = "model.onnx"
+INT8_FILE = "model_int8.onnx"
+CONFIG_FILE = "ark_onnx.json"
+
+
+def onnx_model_dir(model_name: str) -> Path:
+    root = Path(os.getenv("ARK_ONNX_DIR", DEFAULT_ONNX_DIR))
+    return root / model_name.replace("/", "__")
+
+
+class OnnxEmbeddingModel:
+    """
+    Sentence-embedding модель на ONNX Runtime (int8, динамічна квантизація).
+    Повторює пайплайн all-MiniLM-L6-v2: transformer → mean pooling → L2 нормалізація.
+    Інтерфейс `encode` сумісний з SentenceTransformer.encode для наших викликів.
+    """
+    def __init__(self, model_dir: Path, threads: Optional[int] = None):
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise ImportError("ONNX backend requires 'onnxruntime' and 'tokenizers' (pip install onnxruntime)") from e
+
+        model_dir = Path(model_dir)
+        model_path = model_dir / INT8_FILE
+        if not model_path.exists():
+            raise FileNotFoundError(f"ONNX model not found at {model_path}. Run 'ark export-onnx' first.")
+
+        with open(model_dir / CONFIG_FILE, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        self.max_seq_length = config.get("max_seq_length", 256)
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(str(model_path), options, providers=["CPUExecutionProvider"])
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(str(model_dir / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=self.max_seq_length)
+
+    def token_lengths(self, texts: List[str]) -> List[int]:
+        return [len(enc.ids) for enc in self.tokenizer.encode_batch(texts)]
+
+    @staticmethod
+    def _pad(rows: List[List[int]], width: int) -> np.ndarray:
+        # Паддимо вручну: стан padding у Tokenizer спільний між потоками
+        out = np.zeros((len(rows), width), dtype=np.int64)
+        for i, row in enumerate(rows):
+            out[i, :len(row)] = row
+        return out
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32, **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+
+        parts = []
+        for i in range(0, len(texts), max(1, batch_size)):
+            encodings = self.tokenizer.encode_batch(texts[i:i + batch_size])
+            width = max(len(e.ids) for e in encodings)
+            mask = self._pad([e.attention_mask for e in encodings], width)
+            feeds = {
+                "input_ids": self._pad([e.ids for e in encodings], width),
+                "attention_mask": mask,
+                "token_type_ids": self._pad([e.type_ids for e in encodings], width),
+            }
+            feeds = {k: v for k, v in feeds.items() if k in self._input_names}
+            token_embeddings = self.session.run(None, feeds)[0]
+
+            # Mean pooling з урахуванням маски, потім L2 нормалізація
+            weights = mask[..., None].astype(np.float32)
+            pooled = (token_embeddings * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            parts.append(pooled.astype(np.float32))
+
+        if not parts:
+            return np.zeros((0, 0), dtype=np.float32)
+        result = np.vstack(parts)
+        return result[0] if single else result
+
+
+def export_onnx(model_name: str, out_dir: Optional[Path] = None) -> Path:
+    """
+    Експортує transformer-частину SentenceTransformer у ONNX і квантує ваги до int8.
+    Потребує torch/sentence-transformers лише на етапі експорту.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    out_dir = Path(out_dir or onnx_model_dir(model_name))
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    st_model = SentenceTransformer(model_name, device="cpu")
+    hf_model = st_model[0].auto_model.eval()
+    tokenizer = st_model.tokenizer
+
+    dummy = dict(tokenizer(["Kovcheg ONNX export"], return_tensors="pt"))
+    input_names = list(dummy)
+    dynamic_axes = {name: {0: "batch", 1: "seq"} for name in input_names + ["last_hidden_state"]}
+
+    fp32_path = out_dir / FP32_FILE
+    with torch.no_grad():
+        torch.onnx.export(
+            hf_model,
+            (dummy,),
+            str(fp32_path),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+        )
+
+    quantize_dynamic(str(fp32_path), str(out_dir / INT8_FILE), weight_type=QuantType.QInt8)
+    tokenizer.save_pretrained(str(out_dir))
+    with open(out_dir / CONFIG_FILE, "w", encoding="utf-8") as f:
+        json.dump({"model_name": model_name, "max_seq_length": st_model.max_seq_length}, f, indent=2)
+
+    logger.info(f"Exported {model_name} to {out_dir}")
+    return out_dir
+
+
+def check_parity(model_name: str, texts: List[str], model_dir: Optional[Path] = None) -> Tuple[float, float]:
+    """
+    Порівнює int8 ONNX-вектори з PyTorch-векторами тієї ж моделі.
+    Повертає (мінімальна, середня) косинусна подібність; при високій мінімальній
+    подібності існуючі .lancedb індекси лишаються валідними для ONNX-запитів.
+    """
+    from sentence_transformers import SentenceTransformer
+
+    reference = SentenceTransformer(model_name, device="cpu").encode(texts, convert_to_numpy=True)
+    reference = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    candidate = OnnxEmbeddingModel(model_dir or onnx_model_dir(model_name)).encode(texts)
+
+    cosine = np.sum(reference * candidate, axis=1)
+    return float(cosine.min()), float(cosine.mean())
@@ -0,0 +1,196 @@
+import json
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("ark_quantization")
+
+VECTOR_STORAGE = ("float32", "float16", "int8", "binary")
+# Скільки кандидатів (× top_k) грубого проходу перераховувати точніше
+DEFAULT_RESCORE_FACTOR = 4
+# Рядків на блок під час скану: обмежує тимчасову пам'ять float32-копії
+SCAN_BLOCK = 65536
+
+_CODE_FILES = {"float16": ("f16", np.float16), "int8": ("u8", np.uint8), "bits": ("bits", np.uint8)}
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.clip(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12, None)
+
+
+class ScalarQuantizer:
+    """
+    int8 scalar quantization з діапазоном кожного виміру, відкаліброваним на
+    першому батчі (значення поза діапазоном обрізаються). Скалярний добуток з
+    float32 запитом рахується асиметрично: q·lo + codes @ (q·scale).
+    """
+    def __init__(self, lo: np.ndarray, hi: np.ndarray):
+        self.lo = np.asarray(lo, dtype=np.float32)
+        self.scale = np.maximum(np.asarray(hi, dtype=np.float32) - self.lo, 1e-9) / 255.0
+
+    @classmethod
+    def fit(cls, vectors: np.ndarray) -> "ScalarQuantizer":
+        return cls(vectors.min(axis=0), vectors.max(axis=0))
+
+    @property
+    def ranges(self) -> np.ndarray:
+        return np.stack([self.lo, self.lo + self.scale * 255.0])
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        return np.clip(np.rint((vectors - self.lo) / self.scale), 0, 255).astype(np.uint8)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return self.lo + codes.astype(np.float32) * self.scale
+
+    def dot(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        return codes.astype(np.float32) @ (query * self.scale) + float(query @ self.lo)
+
+
+def _bits(vectors: np.ndarray) -> np.ndarray:
+    return np.packbits(vectors > 0, axis=-1)
+
+
+class QuantizedVectorWriter:
+    """
+    Записує компактні вектори модуля у `{module_id}.qvec/` у порядку content.docs:
+      float16 — f16 (2× менше за float32);
+      int8    — u8 коди + діапазони вимірів (4×);
+      binary  — bits для грубого проходу (32× менше I/O) + u8 коди для рескорингу.
+    Батчі дописуються у сирі файли, тож пам'ять не росте з корпусом.
+    """
+    def __init__(self, out_dir: Path, kind: str, ranges: Optional[np.ndarray] = None):
+        if kind not in VECTOR_STORAGE or kind == "float32":
+            raise ValueError(f"Unsupported vector storage: {kind}. Use one of {VECTOR_STORAGE[1:]}.")
+        self.out_dir = Path(out_dir)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.kind = kind
+        self.count = 0
+        self.dim: Optional[int] = None
+        self.quantizer = ScalarQuantizer(*ranges) if ranges is not None else None
+        parts = ["float16"] if kind == "float16" else (["int8", "bits"] if kind == "binary" else ["int8"])
+        self._files = {p: open(self.out_dir / _CODE_FILES[p][0], "wb") for p in parts}
+
+    def add(self, vectors: np.ndarray):
+        vectors = _normalize(vectors)
+        if not len(vectors):
+            return
+        self.dim = vectors.shape[1]
+        if "int8" in self._files:
+            if self.quantizer is None:
+                self.quantizer = ScalarQuantizer.fit(vectors)
+            self.quantizer.encode(vectors).tofile(self._files["int8"])
+        if "bits" in self._files:
+            _bits(vectors).tofile(self._files["bits"])
+        if "float16" in self._files:
+            vectors.astype(np.float16).tofile(self._files["float16"])
+        self.count += len(vectors)
+
+    def add_codes(self, codes: Dict[str, np.ndarray]):
+        """Дописує вже квантовані рядки (update: незмінені чанки без повторного ембеддінгу)."""
+        for part, f in self._files.items():
+            np.ascontiguousarray(codes[part]).tofile(f)
+        self.count += len(next(iter(codes.values())))
+
+    def finalize(self) -> Dict[str, object]:
+        for f in self._files.values():
+            f.close()
+        if self.quantizer is not None:
+            np.save(self.out_dir / "ranges.npy", self.quantizer.ranges)
+        meta = {"type": "quantized", "uri": str(self.out_dir.absolute()), "kind": self.kind,
+                "dim": self.dim, "count": self.count}
+        with open(self.out_dir / "meta.json", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        logger.info(f"Quantized vectors ({self.kind}): {self.count} x {self.dim}")
+        return meta
+
+
+class QuantizedVectors:
+    """Read-only компактні вектори (memmap); рядок i відповідає content.docs[i]."""
+
+    def __init__(self, uri: str):
+        root = Path(uri)
+        with open(root / "meta.json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.kind = meta["kind"]
+        self.dim = meta["dim"]
+        self.count = meta["count"]
+        self.codes: Dict[str, np.ndarray] = {}
+        for part, (name, dtype) in _CODE_FILES.items():
+            path = root / name
+            if path.exists() and self.count:
+                width = (self.dim + 7) // 8 if part == "bits" else self.dim
+                self.codes[part] = np.memmap(path, dtype=dtype, mode="r", shape=(self.count, width))
+        ranges_path = root / "ranges.npy"
+        self.quantizer = ScalarQuantizer(*np.load(ranges_path)) if ranges_path.exists() else None
+
+    @classmethod
+    def from_search_index(cls, search_index: List[Dict]) -> Optional["QuantizedVectors"]:
+        for entry in search_index or []:
+            if entry.get("type") == "quantized":
+                try:
+                    return cls(entry["uri"])
+                except (OSError, KeyError, ValueError) as e:
+                    logger.error(f"Failed to open quantized vectors at {entry.get('uri')}: {e}")
+        return None
+
+    @property
+    def nbytes(self) -> int:
+        return sum(c.nbytes for c in self.codes.values())
+
+    def _scan(self, query: np.ndarray) -> np.ndarray:
+        """Грубий прохід по всіх рядках найкомпактнішим представленням."""
+        scores = np.empty(self.count, dtype=np.float32)
+        for start in range(0, self.count, SCAN_BLOCK):
+            end = min(start + SCAN_BLOCK, self.count)
+            if self.kind == "binary":
+                # Хеммінгова відстань між знаковими бітами: менше — ближче
+                diff = np.bitwise_xor(self.codes["bits"][start:end], _bits(query))
+                scores[start:end] = -_POPCOUNT[diff].sum(axis=1, dtype=np.int32)
+            elif self.kind == "int8":
+                scores[start:end] = self.quantizer.dot(self.codes["int8"][start:end], query)
+            else:
+                scores[start:end] = self.codes["float16"][start:end].astype(np.float32) @ query
+        return scores
+
+    def search(self, query: np.ndarray, top_k: int, rescore_factor: int = DEFAULT_RESCORE_FACTOR,
+               mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Повертає (позиції в docs, косинусні скори) top_k найближчих рядків.
+        Для binary кандидати грубого проходу (top_k × rescore_factor) перераховуються
+        float32 запитом по int8 кодах; int8 і float16 скануються одразу асиметрично.
+        `mask` (bool по docs) — кандидатами є лише дозволені фільтрами рядки.
+        """
+        allowed = self.count if mask is None else int(np.count_nonzero(mask))
+        if not allowed:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        query = _normalize(query)
+        scores = self._scan(query)
+        if mask is not None:
+            scores[~mask] = -np.inf
+
+        if self.kind == "binary":
+            n = min(allowed, top_k * max(1, rescore_factor))
+            candidates = np.argpartition(-scores, n - 1)[:n]
+            candidates.sort()  # послідовне читання memmap
+            scores = self.quantizer.dot(self.codes["int8"][candidates], query)
+        else:
+            candidates = np.arange(self.count)
+
+        k = min(top_k, len(candidates), allowed)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return candidates[top], scores[top]
+
+    def decode(self, positions: np.ndarray) -> np.ndarray:
+        """Наближені float32 вектори вибраних рядків (float16 як є, int8/binary — з int8 кодів)."""
+        if self.kind == "float16":
+            return np.asarray(self.codes["float16"][positions], dtype=np.float32)
+        return self.quantizer.decode(self.codes["int8"][positions])
+
+    def take(self, positions: np.ndarray) -> Dict[str, np.ndarray]:
+        """Коди вибраних рядків — для перенесення в оновлений модуль."""
+        return {part: np.asarray(codes[positions]) for part, codes in self.codes.items()}
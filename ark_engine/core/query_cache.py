@@ -0,0 +1,129 @@
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ark_engine.core.embedding_engine import embedding_model_key
+from ark_engine.core.model_registry import ModelRegistry
+
+
+def normalize_query(query: str) -> str:
+    """NFKC + згортання пробілів: 'Як  встановити?' і ' Як встановити? ' — один ключ."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", query)).strip()
+
+
+class QueryCache:
+    """
+    In-process LRU кеш векторів запитів, обмежений кількістю записів і байтами.
+    Ключ — (модель з бекендом, нормалізований текст запиту).
+    """
+    def __init__(self, max_entries: int = 4096, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._bytes = 0
+        self._data: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, model: str, query: str) -> Optional[np.ndarray]:
+        key = (model, normalize_query(query))
+        with self._lock:
+            vector = self._data.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, model: str, query: str, vector: np.ndarray) -> np.ndarray:
+        vector = np.array(vector, dtype=np.float32)
+        vector.setflags(write=False)  # спільний між запитами — лише для читання
+        key = (model, normalize_query(query))
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._data[key] = vector
+            self._bytes += vector.nbytes
+            while self._data and (len(self._data) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._data.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self.evictions += 1
+        return vector
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+QUERY_CACHE = QueryCache(
+    max_entries=int(os.getenv("ARK_QUERY_CACHE_ENTRIES", 4096)),
+    max_bytes=int(os.getenv("ARK_QUERY_CACHE_MB", 64)) * 1024 * 1024,
+)
+
+
+# Необов'язковий кодувальник промахів кешу (напр. EmbeddingBatcher.encode у веб-бекенді);
+# None — прямий виклик моделі з ModelRegistry
+_query_encoder: Optional[Callable[[str, List[str]], np.ndarray]] = None
+
+
+def set_query_encoder(encoder: Optional[Callable[[str, List[str]], np.ndarray]]):
+    global _query_encoder
+    _query_encoder = encoder
+
+
+def _encode(model_name: str, texts: List[str]) -> np.ndarray:
+    if _query_encoder is not None:
+        return _query_encoder(model_name, texts)
+    return ModelRegistry().get(model_name).encode(texts, convert_to_numpy=True)
+
+
+def embed_query(model_name: str, query: str) -> np.ndarray:
+    """Вектор запиту: з кешу, або через модель з ModelRegistry (з записом у кеш)."""
+    key = embedding_model_key(model_name)
+    vector = QUERY_CACHE.get(key, query)
+    if vector is None:
+        vector = QUERY_CACHE.put(key, query, _encode(model_name, [normalize_query(query)])[0])
+    return vector
+
+
+def embed_queries(model_name: str, queries: List[str]) -> np.ndarray:
+    """
+    Вектори пакета запитів (len(queries) × dim): закешовані беруться з LRU,
+    решта (унікальні) рахуються одним викликом encode.
+    """
+    key = embedding_model_key(model_name)
+    vectors: List[Optional[np.ndarray]] = [QUERY_CACHE.get(key, q) for q in queries]
+
+    missing: Dict[str, str] = {}
+    for query, vector in zip(queries, vectors):
+        if vector is None:
+            missing.setdefault(normalize_query(query), query)
+    if missing:
+        encoded = _encode(model_name, list(missing))
+        computed = {norm: QUERY_CACHE.put(key, query, vec) for (norm, query), vec in zip(missing.items(), encoded)}
+        vectors = [v if v is not None else computed[normalize_query(q)] for q, v in zip(queries, vectors)]
+
+    if not vectors:
+        return np.zeros((0, 0), dtype=np.float32)
+    return np.stack(vectors)
@@ -1,53 +1,163 @@
 import logging
+import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import lancedb
-from typing import List, Tuple, Generator, Optional, Set
-from sentence_transformers import SentenceTransformer
+import pyarrow as pa
+from typing import Dict, List, Tuple, Generator, Optional, Set
 
+from ark_engine.core.bm25 import BM25Index
+from ark_engine.core.filters import SearchFilters
 from ark_engine.core.models import ArkModule
 from ark_engine.core.llm import LLMEngine
+from ark_engine.core.model_registry import DEFAULT_EMBEDDING_MODEL
+from ark_engine.core.quantization import DEFAULT_RESCORE_FACTOR, QuantizedVectors
+from ark_engine.core.query_cache import embed_queries
+from ark_engine.core.shards import ShardPool, merge_top_k, table_names
+from ark_engine.core.vector_index import apply_search_params, search_params
+from ark_engine.core.vector_store import NumpyVectorStore
 
 logger = logging.getLogger("ark_rag")
 
+# Колонки таблиці 'vectors', які потрібні результатам пошуку
+RESULT_COLUMNS = ["text", "source", "id"]
+# Паралельні запити до LanceDB у search_many
+SEARCH_THREADS = int(os.getenv("ARK_SEARCH_THREADS", min(8, os.cpu_count() or 1)))
+# Скільки масок фільтрів (для NumPy, квантованого та keyword пошуку) тримати в пам'яті
+FILTER_MASK_CACHE = 32
+# Розмір матриці скорів (запити × docs) за один крок пакетного keyword-пошуку
+KEYWORD_BATCH_CELLS = 1 << 24
+
 class ArkRAG:
-    def __init__(self, module: ArkModule):
+    def __init__(self, module: ArkModule, vectors: Optional[np.ndarray] = None):
+        """
+        `vectors` — вектори docs у пам'яті (напр. файли, завантажені в чат):
+        такий модуль шукається NumpyVectorStore без LanceDB.
+        """
         self.module = module
         self.docs = module.content.docs
         self.llm = LLMEngine()
+        # Модель запитів має збігатися з моделлю, якою будувався індекс
+        metadata = getattr(module, "metadata", None)
+        self.embedding_model = getattr(metadata, "embedding_model", None) or DEFAULT_EMBEDDING_MODEL
+        # ANN індекс (якщо модуль його має) і параметри пошуку за замовчуванням
+        self.vector_index = getattr(metadata, "vector_index", None)
 
         # --- LanceDB Setup ---
         # Зчитуємо URI індексу з модуля. Якщо це старий модуль, поле може бути None.
         self.vector_index_uri = getattr(module.content, "vector_index_uri", None)
-        self.vector_table = self._connect_lancedb()
+        # Малі модулі (до NUMPY_MAX_ROWS) шукаються точним matrix @ query у процесі
+        if vectors is not None:
+            self.numpy_store = NumpyVectorStore.from_array(vectors)
+        else:
+            self.numpy_store = NumpyVectorStore.from_search_index(module.content.search_index)
+        if self.numpy_store is not None and self.numpy_store.count != len(self.docs):
+            logger.warning("NumPy vectors do not match module docs. Ignoring them.")
+            self.numpy_store = None
+        # Таблиця 'vectors' або шарди великого модуля (шукаються паралельно)
+        self.vector_tables = [] if self.numpy_store is not None else self._connect_lancedb(
+            table_names(module.content.search_index)
+        )
+        # Модулі з --vector-storage float16/int8/binary шукаються по компактних кодах
+        self.quantized = QuantizedVectors.from_search_index(module.content.search_index)
+        if self.quantized is not None and self.quantized.count != len(self.docs):
+            logger.warning("Quantized vectors do not match module docs. Ignoring them.")
+            self.quantized = None
 
         # --- Fallback: Keyword Index ---
-        # Ми залишаємо простий індекс слів у пам'яті як резервний варіант
-        self.doc_tokens: List[Set[str]] = [
-            set(re.findall(r'\w+', doc.lower())) for doc in self.docs
-        ]
+        # BM25 індекс будується під час збірки і відкривається через mmap;
+        # для старих модулів без нього токени документів рахуються ліниво
+        self.keyword_index = BM25Index.from_search_index(module.content.search_index)
+        if self.keyword_index is not None and self.keyword_index.n_docs != len(self.docs):
+            logger.warning("BM25 index does not match module docs. Using legacy keyword scan.")
+            self.keyword_index = None
+        self._doc_tokens: Optional[List[Set[str]]] = None
+        self._filter_masks: Dict[str, Optional[np.ndarray]] = {}
+        # Таблиці LanceDB для фільтрів і чи мають вони колонки фільтрів (ліниво, один раз)
+        self._filter_tables: Optional[List[lancedb.table.Table]] = None
+        self._filterable: Optional[bool] = None
 
-    def _connect_lancedb(self) -> Optional[lancedb.table.Table]:
+    def _connect_lancedb(self, names: List[str]) -> List[lancedb.table.Table]:
         """
-        Встановлює з'єднання з дисковою таблицею векторів.
+        Встановлює з'єднання з дисковими таблицями векторів.
         """
         if not self.vector_index_uri:
             logger.warning("Vector index URI missing. RAG will default to keyword search.")
-            return None
+            return []
 
         try:
             # Підключаємося до локальної папки як до бази даних
             db = lancedb.connect(self.vector_index_uri)
-            # Відкриваємо таблицю 'vectors', створену в ArkBuilder
-            return db.open_table("vectors")
+            # Відкриваємо таблицю 'vectors' (або її шарди), створену в ArkBuilder
+            return [db.open_table(name) for name in names]
         except Exception as e:
             logger.error(f"Failed to open LanceDB index at {self.vector_index_uri}: {e}")
+            return []
+
+    @property
+    def doc_tokens(self) -> List[Set[str]]:
+        if self._doc_tokens is None:
+            self._doc_tokens = [set(re.findall(r'\w+', doc.lower())) for doc in self.docs]
+        return self._doc_tokens
+
+    def _filter_sql(self, filters: Optional[SearchFilters]) -> Optional[str]:
+        """SQL-предикат фільтрів або None, якщо фільтрів немає чи модуль їх не підтримує."""
+        sql = filters.to_sql() if filters is not None else None
+        if sql is None:
+            return None
+        if self._filterable is None:
+            tables = self._tables_for_filters()
+            self._filterable = bool(tables) and "ext" in tables[0].schema.names
+        if not self._filterable:
+            logger.warning("Module was built without filter columns. Ignoring search filters.")
             return None
+        return sql
+
+    def _tables_for_filters(self) -> List[lancedb.table.Table]:
+        """
+        Таблиці, по яких рахуються фільтри. NumPy- і квантовані модулі шукають без
+        LanceDB, тож для них таблиці відкриваються лише при першому фільтрі і кешуються.
+        """
+        if self._filter_tables is None:
+            self._filter_tables = self.vector_tables or self._connect_lancedb(
+                table_names(self.module.content.search_index)
+            )
+        return self._filter_tables
+
+    def _filter_mask(self, sql: str) -> np.ndarray:
+        """
+        Маска docs, дозволених фільтром, для пошуку в процесі (NumPy, квантовані коди, BM25):
+        предикат виконується LanceDB по скалярних колонках, без читання векторів.
+        """
+        if sql in self._filter_masks:
+            return self._filter_masks[sql]
+        tables = self._tables_for_filters()
+        ids = np.concatenate([
+            table.to_lance().to_table(columns=["id"], filter=sql).column("id").to_numpy()
+            for table in tables
+        ])
+        doc_ids = np.array([e["id"] for e in self.module.content.search_index if "id" in e], dtype=np.int64)
+        mask = np.isin(doc_ids, ids)
+        if len(self._filter_masks) >= FILTER_MASK_CACHE:
+            self._filter_masks.pop(next(iter(self._filter_masks)))
+        self._filter_masks[sql] = mask
+        return mask
+
+    def _keyword_score(self, query: str) -> np.ndarray:
+        if self.keyword_index is not None:
+            return self.keyword_index.score(query)
+        return self._simple_keyword_score(query)
+
+    def _keyword_score_many(self, queries: List[str]) -> np.ndarray:
+        if self.keyword_index is not None:
+            return self.keyword_index.score_many(queries)
+        return np.stack([self._simple_keyword_score(q) for q in queries])
 
     def _simple_keyword_score(self, query: str) -> np.ndarray:
         """
         Швидкий алгоритм (Jaccard-like) для підрахунку співпадіння слів.
-        Використовується, коли векторний пошук недоступний.
+        Використовується для модулів, зібраних без BM25 індексу.
         """
         query_tokens = set(re.findall(r'\w+', query.lower()))
         if not query_tokens:
@@ -65,64 +175,151 @@ class ArkRAG:
             
         return np.array(scores)
 
-    def search(self, query: str, top_k: int = 3) -> List[Tuple[str, float]]:
+    def _vector_search(self, query_vec: np.ndarray, top_k: int, nprobes: Optional[int] = None,
+                       refine_factor: Optional[int] = None, where: Optional[str] = None) -> pa.Table:
+        """
+        Косинусний пошук у LanceDB з проекцією лише потрібних колонок
+        (text, source, id + _distance) — вектори рядків не читаються з диска.
+        Шарди шукаються паралельно, їхні top-k зливаються в глобальний.
+        `where` застосовується як prefilter: top-k рахується лише серед відфільтрованих рядків.
+        """
+        params = search_params(self.vector_index, nprobes, refine_factor)
+
+        def search_shard(table) -> pa.Table:
+            q = table.search(query_vec).metric("cosine").select(RESULT_COLUMNS).limit(top_k)
+            if where:
+                q = q.where(where, prefilter=True)
+            return apply_search_params(q, params).to_arrow()
+
+        return merge_top_k(ShardPool().map(search_shard, self.vector_tables), top_k)
+
+    def _vector_search_many(self, queries: List[str], top_k: int, nprobes: Optional[int],
+                            refine_factor: Optional[int], where: Optional[str] = None) -> List[List[Tuple[str, float]]]:
+        """
+        Векторний пошук пакета запитів: усі запити ембеддяться одним forward pass
+        (повторні — з LRU-кешу), NumPy-бекенд рахує їх одним matmul, а запити до
+        LanceDB йдуть паралельно в пулі потоків.
+        """
+        if self.numpy_store is None and self.quantized is None and not self.vector_tables:
+            return [[] for _ in queries]
+
+        query_vecs = embed_queries(self.embedding_model, queries)
+
+        # --- In-process Vector Search (малі модулі, файли чату) ---
+        if self.numpy_store is not None:
+            mask = self._filter_mask(where) if where else None
+            positions, scores = self.numpy_store.search_batch(query_vecs, top_k, mask)
+            return [
+                [(self.docs[p], max(0.0, float(sc))) for p, sc in zip(row_pos, row_scores)]
+                for row_pos, row_scores in zip(positions, scores)
+            ]
+
+        # --- Quantized Vector Search ---
+        if self.quantized is not None:
+            mask = self._filter_mask(where) if where else None
+            results = []
+            for query_vec in query_vecs:
+                positions, scores = self.quantized.search(query_vec, top_k, refine_factor or DEFAULT_RESCORE_FACTOR, mask)
+                results.append([(self.docs[p], max(0.0, float(sc))) for p, sc in zip(positions, scores)])
+            return results
+
+        # --- LanceDB Vector Search ---
+        def lance_search(query_vec: np.ndarray) -> List[Tuple[str, float]]:
+            hits = self._vector_search(query_vec, top_k, nprobes, refine_factor, where)
+            # При metric="cosine", _distance = 1 - cosine_similarity,
+            # тож score = 1 - dist (0.8 → 80%). Читаємо прямо з Arrow-буферів.
+            scores = np.maximum(0.0, 1.0 - hits.column("_distance").to_numpy())
+            found = list(zip(hits.column("text").to_pylist(), scores.tolist()))
+            found.sort(key=lambda x: x[1], reverse=True)
+            return found
+
+        if len(query_vecs) == 1:
+            return [lance_search(query_vecs[0])]
+        with ThreadPoolExecutor(max_workers=min(SEARCH_THREADS, len(query_vecs))) as pool:
+            return list(pool.map(lance_search, query_vecs))
+
+    def _keyword_search(self, query: str, top_k: int, where: Optional[str] = None) -> List[Tuple[str, float]]:
+        return self._keyword_search_many([query], top_k, where)[0]
+
+    def _keyword_search_many(self, queries: List[str], top_k: int,
+                             where: Optional[str] = None) -> List[List[Tuple[str, float]]]:
+        """
+        Keyword-пошук пакета запитів: скори рахуються матрицею (запити × docs)
+        порціями до KEYWORD_BATCH_CELLS, top-k — одним argpartition по рядках.
+        """
+        k = min(top_k, len(self.docs))
+        if k <= 0:
+            return [[] for _ in queries]
+        mask = self._filter_mask(where) if where else None
+
+        results = []
+        step = max(1, KEYWORD_BATCH_CELLS // len(self.docs))
+        for start in range(0, len(queries), step):
+            scores = self._keyword_score_many(queries[start:start + step])
+            if mask is not None:
+                scores = np.where(mask, scores, 0.0)
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1, kind="stable")
+            for row, row_scores in zip(np.take_along_axis(top, order, axis=1),
+                                       np.take_along_axis(top_scores, order, axis=1)):
+                results.append([(self.docs[i], float(sc)) for i, sc in zip(row, row_scores) if sc > 0.0])
+        return results
+
+    def search(self, query: str, top_k: int = 3, nprobes: Optional[int] = None,
+               refine_factor: Optional[int] = None,
+               filters: Optional[SearchFilters] = None) -> List[Tuple[str, float]]:
         """
         Виконує пошук:
-        1. Спроба векторного пошуку через LanceDB (Disk-based).
-        2. Fallback до ключових слів, якщо LanceDB недоступний.
+        1. Векторний пошук: NumPy у процесі (малі модулі), квантовані коди
+           або LanceDB (Disk-based).
+        2. Fallback до ключових слів, якщо векторний пошук недоступний.
+        `nprobes` / `refine_factor` діють лише для модулів з ANN індексом:
+        більше — вищий recall ціною латентності. Для квантованих модулів
+        `refine_factor` — скільки кандидатів (× top_k) перераховувати точніше.
+        `filters` обмежують пошук джерелами/сторінками/датами (SearchFilters).
         """
-        if not self.docs:
-            return []
+        return self.search_many([query], top_k, nprobes, refine_factor, filters)[0]
 
-        results: List[Tuple[str, float]] = []
-        used_vector_search = False
-
-        # --- 1. LanceDB Vector Search ---
-        if self.vector_table:
-            try:
-                embedder = SentenceTransformer('all-MiniLM-L6-v2')
-                query_vec = embedder.encode(query).tolist()
-
-                # --- ВИПРАВЛЕННЯ ТУТ: metric="cosine" ---
-                # Це змушує LanceDB рахувати косинусну відстань, що поверне звичні нам скори.
-                df = self.vector_table.search(query_vec).metric("cosine").limit(top_k).to_pandas()
-
-                for _, row in df.iterrows():
-                    # При metric="cosine", _distance = 1 - cosine_similarity
-                    # Тобто якщо similarity 0.8, то _distance 0.2
-                    # Формула score = 1.0 - dist поверне 0.8 (80%), що нам і треба.
-                    dist = float(row.get('_distance', 0.0))
-                    score = max(0.0, 1.0 - dist) 
-                    
-                    text_content = row.get('text', "")
-                    results.append((text_content, score))
-
-                if results:
-                    used_vector_search = True
-                    results.sort(key=lambda x: x[1], reverse=True)
-
-            except Exception as e:
-                logger.error(f"LanceDB search error: {e}. Switching to fallback.")
-
-        # --- 2. Fallback: Keyword Search ---
-        if not used_vector_search:
-            logger.info("Using Keyword Fallback Search")
-            scores = self._simple_keyword_score(query)
-            
-            top_indices = np.argsort(scores)[-top_k:][::-1]
-            
-            for idx in top_indices:
-                score = float(scores[idx])
-                if score > 0.0:
-                    results.append((self.docs[idx], score))
+    def search_many(self, queries: List[str], top_k: int = 3, nprobes: Optional[int] = None,
+                    refine_factor: Optional[int] = None,
+                    filters: Optional[SearchFilters] = None) -> List[List[Tuple[str, float]]]:
+        """
+        Пакетний варіант `search`: результат i відповідає queries[i].
+        Для офлайн-оцінки, прогріву кешів і масової розмітки.
+        """
+        if not self.docs or not queries:
+            return [[] for _ in queries]
+
+        try:
+            where = self._filter_sql(filters)
+        except Exception as e:
+            logger.error(f"Search filters could not be applied: {e}")
+            where = None
+
+        try:
+            results = self._vector_search_many(queries, top_k, nprobes, refine_factor, where)
+        except Exception as e:
+            logger.error(f"Vector search error: {e}. Switching to fallback.")
+            results = [[] for _ in queries]
+
+        # --- Fallback: Keyword Search (для запитів без векторних результатів) ---
+        fallback = [i for i, found in enumerate(results) if not found]
+        if fallback:
+            logger.info(f"Using Keyword Fallback Search for {len(fallback)} of {len(queries)} queries")
+            found = self._keyword_search_many([queries[i] for i in fallback], top_k, where)
+            for i, hits in zip(fallback, found):
+                results[i] = hits
 
         return results
 
-    def ask_stream(self, query: str) -> Generator[str, None, None]:
+    def ask_stream(self, query: str, filters: Optional[SearchFilters] = None,
+                   ticket=None) -> Generator[str, None, None]:
         """
         Генерує відповідь LLM на основі знайдених джерел.
+        `ticket` — місце в черзі LLMScheduler, взяте викликачем заздалегідь.
         """
-        results = self.search(query, top_k=3)
+        results = self.search(query, top_k=3, filters=filters)
         
         if not results:
             yield "Інформація відсутня в базі знань (не знайдено релевантних документів)."
@@ -133,4 +330,4 @@ class ArkRAG:
             for i, (txt, _) in enumerate(results)
         ])
         
-        yield from self.llm.generate_stream(query, context_text)
+        yield from self.llm.generate_stream(query, context_text, ticket=ticket)
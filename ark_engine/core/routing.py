@@ -0,0 +1,135 @@
+import logging
+import os
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("ark_routing")
+
+# Скільки центроїдів описують модуль і з якої вибірки векторів вони рахуються
+ROUTING_CENTROIDS = int(os.getenv("ARK_ROUTING_CENTROIDS", 16))
+ROUTING_SAMPLE_ROWS = 20_000
+KMEANS_ITERATIONS = 20
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.clip(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12, None)
+
+
+class VectorSample:
+    """Рівномірна вибірка (reservoir sampling) векторів, що надходять батчами."""
+    def __init__(self, max_rows: int = ROUTING_SAMPLE_ROWS, seed: int = 0):
+        self.max_rows = max_rows
+        self.seen = 0
+        self._rng = np.random.default_rng(seed)
+        self._rows: Optional[np.ndarray] = None
+        self._filled = 0
+
+    def add(self, vectors: np.ndarray):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if not len(vectors):
+            return
+        if self._rows is None:
+            self._rows = np.empty((self.max_rows, vectors.shape[1]), dtype=np.float32)
+
+        head = min(len(vectors), self.max_rows - self._filled)
+        self._rows[self._filled:self._filled + head] = vectors[:head]
+        self._filled += head
+        # Рядок з глобальним номером t заміщає випадковий слот з імовірністю max_rows / (t + 1);
+        # при повторі слота перемагає пізніший рядок, як і в послідовному алгоритмі
+        rest = vectors[head:]
+        if len(rest):
+            t = self.seen + head + np.arange(len(rest))
+            slots = self._rng.integers(0, t + 1)
+            keep = slots < self.max_rows
+            self._rows[slots[keep]] = rest[keep]
+        self.seen += len(vectors)
+
+    def array(self) -> np.ndarray:
+        if self._rows is None:
+            return np.zeros((0, 0), dtype=np.float32)
+        return self._rows[:self._filled]
+
+
+def spherical_kmeans(vectors: np.ndarray, k: int, iterations: int = KMEANS_ITERATIONS,
+                     seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """K-means за косинусом: (L2-нормовані центроїди k × dim, розміри кластерів)."""
+    data = _normalize(vectors)
+    k = min(k, len(data))
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(len(data), k, replace=False)]
+    assign = np.full(len(data), -1)
+
+    for _ in range(iterations):
+        sims = data @ centroids.T
+        new_assign = sims.argmax(axis=1)
+        if np.array_equal(new_assign, assign):
+            break
+        assign = new_assign
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, data)
+        empty = np.bincount(assign, minlength=k) == 0
+        if empty.any():
+            # Порожній кластер переїжджає до найгірше покритих точок
+            worst = np.argsort(sims.max(axis=1))[:int(empty.sum())]
+            sums[empty] = data[worst]
+        centroids = _normalize(sums)
+
+    return centroids, np.bincount(assign, minlength=k)
+
+
+def routing_summary(vectors: np.ndarray, model: str, n_centroids: int = ROUTING_CENTROIDS) -> Optional[Dict]:
+    """Дескриптор для content.search_index (і meta.json пакета): центроїди векторів модуля."""
+    if not len(vectors) or n_centroids <= 0:
+        return None
+    centroids, sizes = spherical_kmeans(vectors, n_centroids)
+    return {
+        "type": "routing",
+        "model": model,
+        "centroids": np.round(centroids, 4).tolist(),
+        "sizes": sizes.tolist(),
+    }
+
+
+def routing_from_search_index(search_index: List[Dict]) -> Optional[Dict]:
+    for entry in search_index or []:
+        if entry.get("type") == "routing":
+            return entry
+    return None
+
+
+class ModuleRouter:
+    """
+    Маршрутизація запиту між модулями: косинус запиту з усіма центроїдами —
+    одне множення матриці на вектор на модель ембеддінгів; оцінка модуля —
+    найближчий з його центроїдів.
+    """
+    def __init__(self, summaries: Dict[str, Dict]):
+        self._groups: Dict[str, Tuple[List[str], np.ndarray, np.ndarray]] = {}
+        by_model: Dict[str, List[Tuple[str, np.ndarray]]] = {}
+        for module_id, summary in summaries.items():
+            centroids = np.asarray(summary.get("centroids") or [], dtype=np.float32)
+            if centroids.ndim == 2 and len(centroids):
+                by_model.setdefault(summary.get("model"), []).append((module_id, centroids))
+        for model, items in by_model.items():
+            ids = [module_id for module_id, _ in items]
+            offsets = np.cumsum([0] + [len(c) for _, c in items[:-1]])
+            self._groups[model] = (ids, np.vstack([c for _, c in items]), offsets)
+
+    @property
+    def module_ids(self) -> List[str]:
+        return [module_id for ids, _, _ in self._groups.values() for module_id in ids]
+
+    def scores(self, query: str, embed: Callable[[str, List[str]], np.ndarray]) -> Dict[str, float]:
+        """Оцінка кожного модуля з підсумком; `embed(model, [query])` — вектор запиту."""
+        scores: Dict[str, float] = {}
+        for model, (ids, centroids, offsets) in self._groups.items():
+            sims = centroids @ _normalize(embed(model, [query])[0])
+            scores.update(zip(ids, np.maximum.reduceat(sims, offsets).tolist()))
+        return scores
+
+    def route(self, query: str, top_m: int, embed: Callable[[str, List[str]], np.ndarray]) -> List[str]:
+        """Top-M модулів, куди варто відправити повний векторний пошук."""
+        scores = self.scores(query, embed)
+        return sorted(scores, key=scores.get, reverse=True)[:max(0, top_m)]
@@ -0,0 +1,76 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pyarrow as pa
+
+logger = logging.getLogger("ark_shards")
+
+DEFAULT_TABLE = "vectors"
+SHARD_TABLE = "vectors_{:03d}"
+# Потоки для паралельного пошуку по шардах одного запиту
+SHARD_THREADS = int(os.getenv("ARK_SHARD_THREADS", os.cpu_count() or 1))
+
+
+def shard_name(shard: int, shards: int) -> str:
+    return DEFAULT_TABLE if shards <= 1 else SHARD_TABLE.format(shard)
+
+
+def split_by_shard(frame: pa.Table, shards: int) -> Dict[str, pa.Table]:
+    """Рядки розкладаються за id % shards: той самий чанк завжди в тому ж шарді (оновлення, видалення)."""
+    if shards <= 1:
+        return {DEFAULT_TABLE: frame}
+    shard_of = frame.column("id").to_numpy() % shards
+    return {shard_name(i, shards): frame.filter(pa.array(shard_of == i)) for i in range(shards)}
+
+
+def shards_entry(shards: int, tables: Dict[str, object]) -> List[Dict]:
+    """Дескриптор шардів для content.search_index (порожній список для одної таблиці)."""
+    if shards <= 1:
+        return []
+    return [{
+        "type": "shards",
+        "shards": shards,
+        "tables": list(tables),
+        "counts": [table.count_rows() for table in tables.values()],
+    }]
+
+
+def shards_from_search_index(search_index: List[Dict]) -> Optional[Dict]:
+    for entry in search_index or []:
+        if entry.get("type") == "shards":
+            return entry
+    return None
+
+
+def table_names(search_index: List[Dict]) -> List[str]:
+    entry = shards_from_search_index(search_index)
+    return list(entry["tables"]) if entry else [DEFAULT_TABLE]
+
+
+def merge_top_k(results: List[pa.Table], top_k: int) -> pa.Table:
+    """Глобальний top-k з top-k кожного шарду (за косинусною відстанню)."""
+    if len(results) == 1:
+        return results[0]
+    merged = pa.concat_tables(results)
+    order = np.argsort(merged.column("_distance").to_numpy(), kind="stable")[:top_k]
+    return merged.take(pa.array(order))
+
+
+class ShardPool:
+    """Спільний пул потоків для пошуку по шардах: один запит займає всі ядра."""
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(ShardPool, cls).__new__(cls)
+            cls._instance._pool = ThreadPoolExecutor(max_workers=max(1, SHARD_THREADS),
+                                                     thread_name_prefix="ark-shard")
+        return cls._instance
+
+    def map(self, fn: Callable, tables: List) -> List:
+        if len(tables) == 1:
+            return [fn(tables[0])]
+        return list(self._pool.map(fn, tables))
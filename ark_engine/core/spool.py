@@ -0,0 +1,108 @@
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+logger = logging.getLogger("ark_spool")
+
+# Рядок спулу: (chunk id, джерело, текст)
+SpoolRow = Tuple[int, str, str]
+
+# Поля content, які ростуть разом з корпусом і читаються зі спулу,
+# а не тримаються в пам'яті.
+_SPOOLED_FIELDS = {
+    "docs": lambda row: row[2],
+    "references": lambda row: row[1],
+    "search_index": lambda row: {"id": row[0], "source": row[1]},
+}
+
+
+class ChunkSpool:
+    """
+    Тимчасовий JSONL-файл з чанками потокової збірки.
+    Тексти потрапляють у .ark.json лише на фінальному кроці, тому в пам'яті
+    одночасно живе не більше одного батчу.
+    """
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.count = 0
+        self._file = open(self.path, "w", encoding="utf-8")
+
+    def append(self, ids: List[int], sources: List[str], texts: List[str]):
+        for row in zip(ids, sources, texts):
+            self._file.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self.count += len(texts)
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def remove(self):
+        self.close()
+        if self.path.exists():
+            self.path.unlink()
+
+    def __iter__(self) -> Iterator[SpoolRow]:
+        self.close()
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                chunk_id, source, text = json.loads(line)
+                yield chunk_id, source, text
+
+
+def iter_content_json(spool: ChunkSpool, small: Dict[str, Any], ensure_ascii: bool = True) -> Iterator[str]:
+    """
+    Серіалізує content по шматках. При ensure_ascii=True результат побайтово
+    збігається з json.dumps(content, sort_keys=True), тобто з тим, що хешують
+    calculate_checksum та ArkLoader.
+    Якщо ключ спульованого поля є і в `small`, його елементи дописуються
+    після рядків спулу (напр. дескриптор BM25 у search_index).
+    """
+    yield "{"
+    for n, key in enumerate(sorted(set(small) | set(_SPOOLED_FIELDS))):
+        if n:
+            yield ", "
+        yield json.dumps(key) + ": "
+        if key not in _SPOOLED_FIELDS:
+            yield json.dumps(small[key], sort_keys=True, ensure_ascii=ensure_ascii)
+            continue
+
+        field = _SPOOLED_FIELDS[key]
+        i = -1
+        yield "["
+        for i, row in enumerate(spool):
+            yield (", " if i else "") + json.dumps(field(row), sort_keys=True, ensure_ascii=ensure_ascii)
+        for j, item in enumerate(small.get(key, [])):
+            yield (", " if i + j >= 0 else "") + json.dumps(item, sort_keys=True, ensure_ascii=ensure_ascii)
+        yield "]"
+    yield "}"
+
+
+def write_spooled_module(
+    output_file: Path,
+    header: Dict[str, Any],
+    metadata: Dict[str, Any],
+    spool: ChunkSpool,
+    small_content: Dict[str, Any],
+) -> str:
+    """
+    Записує .ark.json, читаючи великі поля зі спулу у два проходи:
+    спершу рахуємо checksum, потім пишемо файл із готовим заголовком.
+    """
+    hasher = hashlib.sha256()
+    for piece in iter_content_json(spool, small_content):
+        hasher.update(piece.encode("utf-8"))
+    checksum = hasher.hexdigest()
+
+    with open(output_file, "w", encoding="utf-8") as f:
+        f.write('{\n"header": ')
+        f.write(json.dumps(dict(header, checksum=checksum), ensure_ascii=False, indent=2))
+        f.write(',\n"metadata": ')
+        f.write(json.dumps(metadata, ensure_ascii=False, indent=2))
+        f.write(',\n"content": ')
+        for piece in iter_content_json(spool, small_content, ensure_ascii=False):
+            f.write(piece)
+        f.write(',\n"signature_block": {},\n"update_manifest": {}\n}\n')
+
+    return checksum
@@ -2,7 +2,7 @@ import os
 import logging
 import mimetypes
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
 # Data processing libraries
 import pandas as pd
@@ -67,6 +67,12 @@ class MonsterLoader:
             '.tiff': self._read_image,
             '.webp': self._read_image,
         }
+        # Формати зі сторінками/аркушами: load_pages віддає їх окремо (для номера сторінки чанка)
+        self._page_handlers = {
+            '.pdf': self._pdf_pages,
+            '.xlsx': self._excel_sheets,
+            '.xls': self._excel_sheets,
+        }
 
     def load(self, file_path: Path) -> Optional[str]:
         """Головний метод маршрутизації."""
@@ -89,6 +95,21 @@ class MonsterLoader:
             logger.error(f"Failed to process {file_path}: {e}")
             return None
 
+    def load_pages(self, file_path: Path) -> Optional[List[str]]:
+        """
+        Текст по сторінках (PDF) або аркушах (Excel); "\n\n".join(pages) == load().
+        None — формат без сторінок або помилка (тоді слід викликати load()).
+        """
+        handler = self._page_handlers.get(file_path.suffix.lower())
+        if handler is None or not file_path.exists():
+            return None
+        try:
+            logger.info(f"Processing {file_path.name} by pages")
+            return handler(file_path)
+        except Exception as e:
+            logger.error(f"Failed to split {file_path} into pages: {e}")
+            return None
+
     # --- HANDLERS ---
 
     def _read_text(self, path: Path) -> str:
@@ -122,21 +143,24 @@ class MonsterLoader:
             return soup.get_text(separator='\n')
 
     def _read_pdf(self, path: Path) -> str:
-        text = []
         try:
-            reader = PdfReader(path)
-            for i, page in enumerate(reader.pages):
-                page_text = page.extract_text()
-                if page_text:
-                    text.append(page_text)
-                else:
-                    # TODO: Якщо текст пустий, тут можна викликати OCR для сторінки (image extraction)
-                    text.append(f"[Page {i+1}: No text layer detected]")
-            return "\n\n".join(text)
+            return "\n\n".join(self._pdf_pages(path))
         except Exception as e:
             logger.error(f"PDF Error: {e}")
             return ""
 
+    def _pdf_pages(self, path: Path) -> List[str]:
+        text = []
+        reader = PdfReader(path)
+        for i, page in enumerate(reader.pages):
+            page_text = page.extract_text()
+            if page_text:
+                text.append(page_text)
+            else:
+                # TODO: Якщо текст пустий, тут можна викликати OCR для сторінки (image extraction)
+                text.append(f"[Page {i+1}: No text layer detected]")
+        return text
+
     def _read_docx(self, path: Path) -> str:
         doc = docx.Document(path)
         full_text = []
@@ -165,16 +189,19 @@ class MonsterLoader:
         return "\n".join(text_runs)
 
     def _read_excel(self, path: Path) -> str:
+        return "\n\n".join(self._excel_sheets(path))
+
+    def _excel_sheets(self, path: Path) -> List[str]:
         # Читаємо всі листи
         dfs = pd.read_excel(path, sheet_name=None)
         output = []
         for sheet_name, df in dfs.items():
-            output.append(f"### Sheet: {sheet_name}")
             if len(df) > 50:
-                output.append(df.to_json(orient='records', force_ascii=False))
+                table = df.to_json(orient='records', force_ascii=False)
             else:
-                output.append(df.to_markdown(index=False))
-        return "\n\n".join(output)
+                table = df.to_markdown(index=False)
+            output.append(f"### Sheet: {sheet_name}\n\n{table}")
+        return output
 
     def _read_epub(self, path: Path) -> str:
         book = epub.read_epub(path)
@@ -1,4 +1,5 @@
 import hashlib
+import os
 import json
 import uuid
 from datetime import datetime, timezone
@@ -15,3 +16,26 @@ def calculate_checksum(data: dict) -> str:
     """
     dumped = json.dumps(data, sort_keys=True).encode("utf-8")
     return hashlib.sha256(dumped).hexdigest()
+
+def calculate_file_sha256(file_path) -> str:
+    """
+    Обчислює SHA256 вмісту файлу, читаючи його блоками.
+    """
+    sha256_hash = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for byte_block in iter(lambda: f.read(1024 * 1024), b""):
+            sha256_hash.update(byte_block)
+    return sha256_hash.hexdigest()
+
+def current_rss_mb() -> float:
+    """
+    Поточний resident set size процесу в MB (Linux: /proc, інакше — пік через resource).
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        import resource
+        # ru_maxrss у KB на Linux і в байтах на macOS — тут достатньо оцінки
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
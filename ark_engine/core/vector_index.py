@@ -0,0 +1,105 @@
+import logging
+import math
+import os
+from typing import Any, Dict, List, Optional, Sequence
+
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger("ark_vector_index")
+
+# Нижче цього порогу brute-force скан LanceDB швидший за побудову й обхід індексу
+DEFAULT_ANN_MIN_ROWS = 100_000
+INDEX_TYPES = ("IVF_PQ", "IVF_HNSW_SQ")
+
+
+class AnnIndexConfig(BaseModel):
+    """Параметри ANN індексу таблиці 'vectors' та пошуку по ньому."""
+    index_type: str = Field("IVF_PQ", description="IVF_PQ або IVF_HNSW_SQ.")
+    min_rows: int = Field(DEFAULT_ANN_MIN_ROWS, description="Індекс будується лише від цієї кількості рядків.")
+    num_partitions: Optional[int] = Field(None, description="Кількість IVF-розділів (за замовчуванням ≈ sqrt(rows)).")
+    num_sub_vectors: Optional[int] = Field(None, description="Кількість PQ-підвекторів (за замовчуванням dim / 8).")
+    nprobes: int = Field(20, description="Скільки розділів переглядати під час пошуку.")
+    refine_factor: Optional[int] = Field(None, description="Перерахунок refine_factor·k кандидатів на повних векторах.")
+
+    def resolve(self, rows: int, dim: int) -> Dict[str, Any]:
+        num_partitions = self.num_partitions or max(1, min(4096, int(math.sqrt(rows))))
+        num_sub_vectors = self.num_sub_vectors
+        if not num_sub_vectors:
+            # PQ вимагає, щоб dim ділився на кількість підвекторів
+            num_sub_vectors = max(1, dim // 8)
+            while dim % num_sub_vectors:
+                num_sub_vectors -= 1
+        return {"num_partitions": num_partitions, "num_sub_vectors": num_sub_vectors}
+
+
+def create_ann_index(table, config: AnnIndexConfig) -> Optional[Dict[str, Any]]:
+    """
+    Будує (або перебудовує) ANN індекс таблиці, якщо рядків не менше `min_rows`.
+    Повертає опис індексу для metadata.vector_index або None, якщо індекс не потрібен.
+    """
+    if config.index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown vector index type: {config.index_type}. Use one of {INDEX_TYPES}.")
+
+    rows = table.count_rows()
+    if rows < config.min_rows:
+        logger.info(f"{rows} rows < {config.min_rows}: keeping brute-force search")
+        return None
+
+    dim = table.schema.field("vector").type.list_size
+    params = config.resolve(rows, dim)
+    table.create_index(
+        metric="cosine",
+        vector_column_name="vector",
+        index_type=config.index_type,
+        replace=True,
+        **params,
+    )
+    logger.info(f"Built {config.index_type} index over {rows} rows: {params}")
+    return {
+        "type": config.index_type,
+        "rows": rows,
+        **params,
+        "nprobes": config.nprobes,
+        "refine_factor": config.refine_factor,
+    }
+
+
+def create_scalar_indexes(table, columns: Sequence[str]) -> List[str]:
+    """
+    BTREE індекси скалярних колонок: prefilter-пошук з фільтрами читає лише
+    відповідні рядки. Колонки, яких немає в таблиці (старі модулі), пропускаються.
+    """
+    present = set(table.schema.names)
+    created = []
+    for column in columns:
+        if column not in present:
+            continue
+        try:
+            table.create_scalar_index(column, replace=True)
+            created.append(column)
+        except Exception as e:
+            logger.warning(f"Scalar index on '{column}' was not created: {e}")
+    return created
+
+
+def search_params(vector_index: Optional[Dict[str, Any]], nprobes: Optional[int] = None,
+                  refine_factor: Optional[int] = None) -> Dict[str, Optional[int]]:
+    """
+    Параметри пошуку: аргумент виклику > ARK_SEARCH_NPROBES / ARK_SEARCH_REFINE_FACTOR >
+    значення, збережені в модулі під час збірки. Без індексу — порожньо (brute force).
+    """
+    if not vector_index:
+        return {}
+    if nprobes is None:
+        nprobes = int(os.getenv("ARK_SEARCH_NPROBES", 0)) or vector_index.get("nprobes")
+    if refine_factor is None:
+        refine_factor = int(os.getenv("ARK_SEARCH_REFINE_FACTOR", 0)) or vector_index.get("refine_factor")
+    return {"nprobes": nprobes, "refine_factor": refine_factor}
+
+
+def apply_search_params(query, params: Dict[str, Optional[int]]):
+    if params.get("nprobes"):
+        query = query.nprobes(params["nprobes"])
+    if params.get("refine_factor"):
+        query = query.refine_factor(params["refine_factor"])
+    return query
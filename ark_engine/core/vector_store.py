@@ -0,0 +1,99 @@
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("ark_vector_store")
+
+# До цієї кількості рядків точний matrix @ query швидший за LanceDB
+# (див. `ark bench numpy`); більші модулі лишаються на LanceDB
+NUMPY_MAX_ROWS = int(os.getenv("ARK_NUMPY_MAX_ROWS", 50_000))
+VECTORS_FILE = "vectors.npy"
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.clip(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12, None)
+
+
+def _top_k(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-k по останній осі: argpartition + сортування лише k кандидатів."""
+    k = min(k, scores.shape[-1])
+    if k <= 0:
+        shape = scores.shape[:-1] + (0,)
+        return np.zeros(shape, dtype=np.int64), np.zeros(shape, dtype=np.float32)
+    top = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    top_scores = np.take_along_axis(scores, top, axis=-1)
+    order = np.argsort(-top_scores, axis=-1)
+    return np.take_along_axis(top, order, axis=-1), np.take_along_axis(top_scores, order, axis=-1)
+
+
+class NumpyVectorStore:
+    """
+    Точний векторний пошук у процесі: L2-нормовані float32 вектори (рядок i ↔ docs[i])
+    у memory-mapped .npy, косинус = matrix @ query, top-k через np.argpartition.
+    Для малих модулів і завантажень у чат це дешевше за з'єднання з LanceDB.
+    """
+    def __init__(self, vectors: np.ndarray):
+        self.vectors = vectors
+
+    @classmethod
+    def from_array(cls, vectors) -> "NumpyVectorStore":
+        return cls(_normalize(vectors) if len(vectors) else np.zeros((0, 0), dtype=np.float32))
+
+    @classmethod
+    def load(cls, uri: str) -> "NumpyVectorStore":
+        return cls(np.load(Path(uri) / VECTORS_FILE, mmap_mode="r"))
+
+    @staticmethod
+    def save(out_dir: Path, vectors: np.ndarray) -> Dict[str, object]:
+        """Записує нормовані вектори і повертає дескриптор для content.search_index."""
+        out_dir = Path(out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        vectors = _normalize(vectors)
+        np.save(out_dir / VECTORS_FILE, vectors)
+        meta = {"type": "numpy", "uri": str(out_dir.absolute()), "count": len(vectors),
+                "dim": int(vectors.shape[1]) if vectors.ndim == 2 else 0}
+        with open(out_dir / "meta.json", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        return meta
+
+    @classmethod
+    def from_search_index(cls, search_index: List[Dict], max_rows: Optional[int] = None) -> Optional["NumpyVectorStore"]:
+        max_rows = NUMPY_MAX_ROWS if max_rows is None else max_rows
+        for entry in search_index or []:
+            if entry.get("type") == "numpy" and entry.get("count", 0) <= max_rows:
+                try:
+                    return cls.load(entry["uri"])
+                except (OSError, KeyError, ValueError) as e:
+                    logger.error(f"Failed to open NumPy vectors at {entry.get('uri')}: {e}")
+        return None
+
+    @property
+    def count(self) -> int:
+        return len(self.vectors)
+
+    def search(self, query: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(позиції в docs, косинусні скори) top_k рядків для одного запиту."""
+        if not self.count:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        return _top_k(self.vectors @ _normalize(query), top_k)
+
+    def search_batch(self, queries: np.ndarray, top_k: int,
+                     mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Пакет запитів одним matmul: масиви (len(queries) × top_k).
+        `mask` (bool по docs) — шукати лише серед дозволених фільтрами рядків.
+        """
+        queries = _normalize(np.atleast_2d(queries))
+        allowed = None if mask is None else np.flatnonzero(mask)
+        if not self.count or (allowed is not None and not len(allowed)):
+            empty = np.zeros((len(queries), 0))
+            return empty.astype(np.int64), empty.astype(np.float32)
+        if allowed is None:
+            return _top_k(queries @ self.vectors.T, top_k)
+        positions, scores = _top_k(queries @ self.vectors[allowed].T, top_k)
+        return allowed[positions], scores
@@ -0,0 +1,181 @@
+import heapq
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from itertools import islice
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from ark_engine.core.filters import SearchFilters
+from ark_engine.core.loader import ArkLoader
+from ark_engine.core.query_cache import embed_queries
+from ark_engine.core.routing import ModuleRouter
+from ark_engine.store.index import IndexManager
+from ark_engine.store.models import IndexEntry
+
+logger = logging.getLogger("ark_federated")
+
+# Скільки модулів шукаються одночасно і скільки чекати на кожен (секунди)
+FEDERATED_THREADS = int(os.getenv("ARK_FEDERATED_THREADS", min(8, os.cpu_count() or 1)))
+FEDERATED_TIMEOUT = float(os.getenv("ARK_FEDERATED_TIMEOUT", 5.0))
+
+
+class FederatedHit(BaseModel):
+    """Результат федеративного пошуку з прив'язкою до пакета магазину."""
+    module_id: str
+    module_title: str
+    source: Optional[str] = None
+    text: str
+    score: float
+    raw_score: float
+
+
+class RouteStats(BaseModel):
+    """Скільки модулів відсік роутер для одного запиту."""
+    modules: int
+    searched: int
+    pruned: int
+
+
+class _LoadedModule:
+    def __init__(self, rag, sources: Dict[str, str], score_space: str):
+        self.rag = rag
+        self.sources = sources
+        # Скори одного простору (одна модель ембеддінгів або keyword) порівнювані між модулями
+        self.score_space = score_space
+
+
+class FederatedSearch:
+    """
+    Пошук top-k одразу по всіх встановлених пакетах: модулі шукаються паралельно
+    з таймаутом, скори нормуються, результати зливаються heap-merge у глобальний top-k.
+    Завантажені ArkRAG кешуються між запитами.
+    """
+    def __init__(self, index: Optional[IndexManager] = None, max_workers: int = FEDERATED_THREADS,
+                 timeout: float = FEDERATED_TIMEOUT):
+        self.index = index or IndexManager()
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self._modules: Dict[Tuple[str, str], _LoadedModule] = {}
+        self._lock = threading.Lock()
+        self._router: Optional[ModuleRouter] = None
+        self._router_key: Optional[Tuple] = None
+
+    def _load(self, entry: IndexEntry) -> _LoadedModule:
+        key = (entry.id, entry.version)
+        with self._lock:
+            loaded = self._modules.get(key)
+        if loaded is not None:
+            return loaded
+
+        # ArkRAG тягне LanceDB і LLM-рушій — імпортуємо лише коли справді шукаємо
+        from ark_engine.core.rag import ArkRAG
+
+        module = ArkLoader.load(Path(entry.path))
+        rag = ArkRAG(module)
+        sources = {}
+        for doc, row in zip(rag.docs, (e for e in module.content.search_index if "id" in e)):
+            sources.setdefault(doc, row.get("source"))
+        has_vectors = rag.numpy_store is not None or rag.quantized is not None or bool(rag.vector_tables)
+        loaded = _LoadedModule(rag, sources, rag.embedding_model if has_vectors else "keyword")
+        with self._lock:
+            self._modules[key] = loaded
+        return loaded
+
+    @staticmethod
+    def _routing_summary(entry: IndexEntry) -> Optional[Dict]:
+        """Центроїди з meta.json пакета (пишуться інсталятором), без завантаження модуля."""
+        try:
+            with open(Path(entry.path).parent / "meta.json", "r", encoding="utf-8") as f:
+                return json.load(f).get("routing")
+        except (OSError, ValueError):
+            return None
+
+    def router(self, entries: List[IndexEntry]) -> ModuleRouter:
+        key = tuple((e.id, e.version) for e in entries)
+        if self._router is None or self._router_key != key:
+            summaries = {e.id: self._routing_summary(e) for e in entries}
+            self._router = ModuleRouter({k: v for k, v in summaries.items() if v})
+            self._router_key = key
+        return self._router
+
+    def route(self, query: str, top_m: int,
+              module_ids: Optional[List[str]] = None) -> Tuple[List[str], RouteStats]:
+        """
+        Модулі для повного пошуку: top-M за близькістю запиту до центроїдів.
+        Пакети без центроїдів (зібрані до маршрутизації) не відсікаються.
+        """
+        entries = self._entries(module_ids)
+        router = self.router(entries)
+        routed = set(router.module_ids)
+        keep = set(router.route(query, top_m, embed_queries)) if routed else set()
+        selected = [e.id for e in entries if e.id not in routed or e.id in keep]
+        return selected, RouteStats(modules=len(entries), searched=len(selected), pruned=len(entries) - len(selected))
+
+    def _entries(self, module_ids: Optional[List[str]]) -> List[IndexEntry]:
+        return [e for e in self.index.list_packages() if module_ids is None or e.id in module_ids]
+
+    def _search_module(self, entry: IndexEntry, query: str, top_k: int,
+                       filters: Optional[SearchFilters] = None) -> Tuple[str, List[FederatedHit]]:
+        loaded = self._load(entry)
+        hits = [
+            FederatedHit(module_id=entry.id, module_title=entry.title, source=loaded.sources.get(text),
+                         text=text, score=score, raw_score=score)
+            for text, score in loaded.rag.search(query, top_k=top_k, filters=filters)
+        ]
+        return loaded.score_space, hits
+
+    @staticmethod
+    def _normalize(results: List[Tuple[str, List[FederatedHit]]]):
+        """
+        Ділить скори на максимум свого простору: косинуси однієї моделі лишаються
+        порівнюваними між модулями, а BM25 та інші моделі зводяться до тієї ж шкали 0..1.
+        """
+        best: Dict[str, float] = {}
+        for space, hits in results:
+            for hit in hits:
+                best[space] = max(best.get(space, 0.0), hit.raw_score)
+        for space, hits in results:
+            for hit in hits:
+                hit.score = hit.raw_score / best[space] if best[space] > 0 else 0.0
+
+    def search(self, query: str, top_k: int = 5, module_ids: Optional[List[str]] = None,
+               timeout: Optional[float] = None, route_top_m: Optional[int] = None,
+               filters: Optional[SearchFilters] = None) -> List[FederatedHit]:
+        """
+        Глобальний top-k по встановлених пакетах (або лише `module_ids`).
+        `route_top_m` — шукати лише в M модулях, найближчих до запиту за центроїдами.
+        `filters` застосовуються в кожному модулі (SearchFilters).
+        """
+        if route_top_m is not None:
+            module_ids, stats = self.route(query, route_top_m, module_ids)
+            logger.info(f"Routed to {stats.searched} of {stats.modules} modules ({stats.pruned} pruned)")
+        entries = self._entries(module_ids)
+        if not entries or top_k <= 0:
+            return []
+
+        timeout = self.timeout if timeout is None else timeout
+        pool = ThreadPoolExecutor(max_workers=min(self.max_workers, len(entries)))
+        try:
+            futures = {pool.submit(self._search_module, e, query, top_k, filters): e for e in entries}
+            done, pending = wait(futures, timeout=timeout)
+        finally:
+            # Повільні модулі дошукуються у фоні (і лишаються в кеші), але не блокують відповідь
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        for future in pending:
+            logger.warning(f"Module {futures[future].id} timed out after {timeout}s; skipped")
+        results = []
+        for future in (f for f in futures if f in done):  # порядок пакетів — стабільні нічиї
+            try:
+                results.append(future.result())
+            except Exception as e:
+                logger.error(f"Federated search failed for {futures[future].id}: {e}")
+
+        self._normalize(results)
+        ranked = [sorted(hits, key=lambda h: h.score, reverse=True) for _, hits in results]
+        return list(islice(heapq.merge(*ranked, key=lambda h: h.score, reverse=True), top_k))
@@ -8,6 +8,7 @@ from datetime import datetime
 # Core imports
 from ark_engine.core.loader import ArkLoader
 from ark_engine.core.models import ArkModule
+from ark_engine.core.routing import routing_from_search_index
 
 # Store imports
 from ark_engine.store.models import IndexEntry, PackageMeta
@@ -71,14 +72,21 @@ class Installer:
                 shutil.rmtree(target_lancedb)
             shutil.copytree(source_lancedb, target_lancedb)
             logger.info(f"Copied vector index to {target_lancedb}")
-            
-            # Оновлюємо шлях у JSON, щоб він вказував на локальну папку в store
-            # Це брудний хак, але для MVP необхідно, бо шляхи змінилися
-            # В ідеалі Loader має резолвити шляхи відносно файлу
-            # Але зараз ми просто залишимо як є, сподіваючись на відносні шляхи або фікс у Loader
+            # module.ark не переписуємо (підпис): ArkLoader резолвить URI індексів
+            # на каталоги з тим самим ім'ям поруч з файлом, тобто на ці копії
         else:
             logger.warning(f"Vector index not found at {source_lancedb}. Search might fail.")
 
+        # BM25 індекс, квантовані та NumPy-вектори лежать поруч так само
+        for kind in ("bm25", "qvec", "npvec"):
+            source_index = source_path.parent / f"{module_id}.{kind}"
+            if source_index.exists():
+                target_index = target_dir / f"{module_id}.{kind}"
+                if target_index.exists():
+                    shutil.rmtree(target_index)
+                shutil.copytree(source_index, target_index)
+                logger.info(f"Copied {kind} index to {target_index}")
+
         # --- КРОК 5: МЕТАДАНІ ---
         file_hash = calculate_file_hash(target_file)
         
@@ -98,7 +106,9 @@ class Installer:
             doc_count=len(module.content.docs),
             embedding_count=vector_count, # <-- ВИПРАВЛЕНО (було len(embeddings))
             total_size_bytes=get_file_size(target_file),
-            checksum=file_hash
+            checksum=file_hash,
+            # Копія в meta.json: роутер не відкриває сам модуль
+            routing=routing_from_search_index(module.content.search_index)
         )
 
         with open(meta_file, "w", encoding="utf-8") as f:
@@ -1,6 +1,6 @@
 # ark_engine/store/models.py (ОНОВЛЕНО)
 
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel, Field
 from datetime import datetime
 
@@ -19,6 +19,9 @@ class PackageMeta(BaseModel):
     total_size_bytes: int = 0
     checksum: str 
 
+    # Центроїди векторів модуля для маршрутизації федеративного пошуку (див. core/routing.py)
+    routing: Optional[Dict[str, Any]] = None
+
 class IndexEntry(BaseModel):
     """Запис в головному index.json."""
     id: str
@@ -101,3 +101,68 @@ def test_doctor_removes_orphans(store_manager):
     store_manager.doctor()
     
     assert len(store_manager.list()) == 0
+
+def test_federated_search_merges_normalized_top_k(store_manager):
+    import time
+    from ark_engine.store.federated import FederatedSearch, _LoadedModule
+
+    class FakeRAG:
+        def __init__(self, results, delay=0.0):
+            self.results, self.delay = results, delay
+        def search(self, query, top_k=3, filters=None):
+            time.sleep(self.delay)
+            return self.results[:top_k]
+
+    modules = {
+        "a": _LoadedModule(FakeRAG([("a1", 0.8), ("a2", 0.4)]), {"a1": "a.pdf"}, "minilm"),
+        "b": _LoadedModule(FakeRAG([("b1", 0.6)]), {}, "minilm"),
+        "kw": _LoadedModule(FakeRAG([("k1", 0.2), ("k2", 0.12)]), {}, "keyword"),
+        "slow": _LoadedModule(FakeRAG([("s1", 1.0)], delay=1.0), {}, "minilm"),
+    }
+    for module_id in modules:
+        store_manager.index.add_package(IndexEntry(
+            id=module_id, version="1.0", title=module_id.upper(), installed_at=datetime.now(), path="/x"
+        ))
+
+    federated = FederatedSearch(store_manager.index, timeout=0.3)
+    federated._load = lambda entry: modules[entry.id]
+    hits = federated.search("q", top_k=4)
+
+    # "slow" не вклався в таймаут; скори діляться на максимум свого простору
+    assert [(h.module_id, h.text) for h in hits] == [("a", "a1"), ("kw", "k1"), ("b", "b1"), ("kw", "k2")]
+    assert hits[0].score == 1.0 and hits[0].raw_score == 0.8 and hits[0].source == "a.pdf"
+    assert hits[2].score == pytest.approx(0.75)
+
+def test_installed_module_uses_its_own_index_copies(store_manager, tmp_path):
+    import numpy as np
+    from ark_engine.core.bm25 import BM25Builder
+    from ark_engine.core.loader import ArkLoader
+    from ark_engine.core.rag import ArkRAG
+    from ark_engine.core.vector_store import NumpyVectorStore
+
+    build = tmp_path / "build"
+    build.mkdir()
+    docs = ["Інструкція з встановлення модуля", "Вектори та тексти"]
+    bm25 = BM25Builder(build / "idx-pkg.bm25")
+    bm25.add(docs)
+    npvec = NumpyVectorStore.save(build / "idx-pkg.npvec", np.eye(2, dtype=np.float32))
+    data = {
+        "header": {"id": "idx-pkg", "title": "Indexed", "author": "Tester", "created_at": datetime.now().isoformat(),
+                   "version": "1.0.0", "checksum": "fake_checksum", "license": "MIT"},
+        "metadata": {"language": "uk", "categories": [], "tags": [], "locale": "uk_UA",
+                     "intended_use": "test", "risk_level": "low"},
+        "content": {"docs": docs, "media": [], "search_index": [bm25.finalize(), npvec]},
+    }
+    source = build / "idx-pkg.ark"
+    source.write_text(json.dumps(data), encoding="utf-8")
+
+    entry = store_manager.installer.install_local(source, allow_untrusted=True)
+    shutil.rmtree(build)
+
+    module = ArkLoader.load(Path(entry.path))
+    package_dir = Path(entry.path).parent
+    assert all(Path(e["uri"]).parent == package_dir for e in module.content.search_index)
+
+    rag = ArkRAG(module)
+    assert rag.numpy_store is not None and rag.keyword_index is not None
+    assert rag._keyword_search("встановлення", 1, None)[0][0] == docs[0]
@@ -0,0 +1,77 @@
+import math
+import numpy as np
+from ark_engine.core import bm25
+from ark_engine.core.bm25 import BM25Builder, BM25Index, tokenize
+
+DOCS = [
+    "Як встановити модуль Ковчег",
+    "Модуль містить вектори та тексти",
+    "",
+    "Kovcheg module install guide: install, verify, run",
+    "вектори вектори вектори",
+]
+
+def _reference(query, docs):
+    tokenized = [tokenize(d) for d in docs]
+    avgdl = sum(map(len, tokenized)) / len(docs)
+    terms = set(tokenize(query))
+    upper = 0.0
+    scores = np.zeros(len(docs))
+    for t in terms:
+        df = sum(t in toks for toks in tokenized)
+        if not df:
+            continue
+        idf = math.log1p((len(docs) - df + 0.5) / (df + 0.5))
+        upper += idf * (bm25.K1 + 1)
+        for i, toks in enumerate(tokenized):
+            tf = toks.count(t)
+            norm = bm25.K1 * (1 - bm25.B + bm25.B * len(toks) / avgdl)
+            scores[i] += idf * tf * (bm25.K1 + 1) / (tf + norm)
+    return scores / upper if upper else scores
+
+def test_bm25_matches_reference_with_spills(tmp_path, monkeypatch):
+    monkeypatch.setattr(bm25, "SPILL_POSTINGS", 3)  # кожен add скидається на диск
+    builder = BM25Builder(tmp_path / "m.bm25")
+    builder.add(DOCS[:2])
+    builder.add(DOCS[2:])
+    meta = builder.finalize()
+    assert meta["docs"] == len(DOCS)
+    assert not list((tmp_path / "m.bm25").glob("_spill_*"))
+
+    index = BM25Index.from_search_index([{"id": 0, "source": "a"}, meta])
+    for query in ("модуль вектори", "INSTALL kovcheg", "невідоме слово", ""):
+        np.testing.assert_allclose(index.score(query), _reference(query, DOCS), rtol=1e-5, atol=1e-6)
+    assert index.score("вектори").argmax() == 4
+
+def test_bm25_score_many_matches_single_queries(tmp_path):
+    builder = BM25Builder(tmp_path / "m.bm25")
+    builder.add(DOCS)
+    index = BM25Index.from_search_index([builder.finalize()])
+
+    queries = ["модуль вектори", "невідоме слово", "", "install вектори модуль", "вектори"]
+    batch = index.score_many(queries)
+    assert batch.shape == (len(queries), len(DOCS))
+    for row, query in zip(batch, queries):
+        np.testing.assert_allclose(row, index.score(query), rtol=1e-6, atol=1e-7)
+
+def test_bm25_terms_are_stored_as_utf8(tmp_path):
+    out = tmp_path / "m.bm25"
+    builder = BM25Builder(out)
+    builder.add(DOCS)
+    index = BM25Index.from_search_index([builder.finalize()])
+
+    vocab = sorted({t.encode("utf-8") for d in DOCS for t in tokenize(d)})
+    blob = np.load(out / "terms.npy")
+    assert blob.dtype == np.uint8 and blob.tobytes() == b"".join(vocab)
+    assert len(index.terms) == len(vocab) and index.terms[0] == vocab[0]
+
+    # Індекс старого формату (<U{MAX_TERM_LEN}) відкривається і рахує те саме
+    queries = ("модуль вектори", "INSTALL kovcheg", "невідоме слово")
+    expected = [index.score(q) for q in queries]
+    offsets = np.load(out / "term_offsets.npy")
+    legacy = [blob[s:e].tobytes().decode("utf-8") for s, e in zip(offsets[:-1], offsets[1:])]
+    np.save(out / "terms.npy", np.array(legacy, dtype=f"<U{bm25.MAX_TERM_LEN}"))
+    (out / "term_offsets.npy").unlink()
+    old = BM25Index(str(out))
+    for query, scores in zip(queries, expected):
+        np.testing.assert_allclose(old.score(query), scores)
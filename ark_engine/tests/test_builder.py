@@ -5,6 +5,7 @@ from pathlib import Path
 from ark_engine.core.builder import ArkBuilder
 from ark_engine.core.cleaners import TextCleaner
 from ark_engine.core.chunker import TextChunker
+from ark_engine.core.extraction import DocumentExtractor, iter_extracted
 
 @pytest.fixture
 def raw_data_dir(tmp_path):
@@ -30,6 +31,29 @@ def test_chunker():
     chunks = chunker.chunk(text)
     assert len(chunks) >= 2
 
+def test_parallel_extraction_keeps_order(raw_data_dir):
+    files = sorted(f for f in raw_data_dir.glob("**/*") if f.is_file())
+    extractor = DocumentExtractor(ocr_enabled=False)
+
+    serial = [(p, chunks) for p, chunks, *_ in iter_extracted(files, jobs=1, extractor=extractor)]
+    parallel = [(p, chunks) for p, chunks, *_ in iter_extracted(files, jobs=2, extractor=extractor)]
+
+    assert serial == parallel
+
+def test_extraction_workers_snapshot_files_for_the_manifest(raw_data_dir):
+    from ark_engine.core.manifest import BuildManifest
+    files = sorted(f for f in raw_data_dir.glob("**/*") if f.is_file())
+    results = list(iter_extracted(files, jobs=2, extractor=DocumentExtractor(ocr_enabled=False)))
+    assert [r[-1] for r in results] == [BuildManifest.snapshot(f) for f in files]
+
+def test_frame_keeps_vectors_as_fixed_size_list():
+    import numpy as np
+    vectors = np.arange(12, dtype=np.float32).reshape(3, 4)
+    table = ArkBuilder._frame(vectors, ["a", "b", "c"], ["x", "x", "y"], [0, 1, 5])
+    assert table.schema.field("vector").type.list_size == 4
+    assert table.column("vector").combine_chunks().flatten().to_numpy().reshape(3, 4).tolist() == vectors.tolist()
+    assert "vector" not in ArkBuilder._frame(None, ["a"], ["x"], [0]).column_names
+
 def test_builder_pipeline(raw_data_dir, tmp_path):
     output_file = tmp_path / "test.ark.json"
     
@@ -56,3 +80,43 @@ def test_builder_pipeline(raw_data_dir, tmp_path):
     assert len(docs) > 0
     assert len(embeddings) == len(docs)
     assert len(embeddings[0]) == 384
+
+def test_update_keeps_vectors_when_embedding_fails(raw_data_dir, tmp_path, monkeypatch):
+    import lancedb
+    output_file = tmp_path / "test.ark.json"
+    ArkBuilder(input_dir=str(raw_data_dir), output_file=str(output_file), title="Test Module").build()
+    content = json.loads(output_file.read_text(encoding="utf-8"))["content"]
+    table = lancedb.connect(content["vector_index_uri"]).open_table("vectors")
+    rows = table.count_rows()
+    module_before = output_file.read_bytes()
+
+    (raw_data_dir / "hello.txt").write_text("Changed document text.", encoding="utf-8")
+    def crash(self, chunks):
+        raise RuntimeError("embedding model crashed")
+    monkeypatch.setattr(ArkBuilder, "_embed", crash)
+
+    with pytest.raises(RuntimeError):
+        ArkBuilder(input_dir=str(raw_data_dir), output_file=str(output_file)).update(str(output_file))
+
+    table = lancedb.connect(content["vector_index_uri"]).open_table("vectors")
+    assert table.count_rows() == rows
+    assert output_file.read_bytes() == module_before
+
+def test_update_refreshes_mtime_of_touched_files(raw_data_dir, tmp_path):
+    import lancedb
+    from datetime import datetime
+    from ark_engine.core.filters import SearchFilters
+
+    output_file = tmp_path / "test.ark.json"
+    ArkBuilder(input_dir=str(raw_data_dir), output_file=str(output_file), title="Test Module").build()
+
+    # Вміст той самий, змінився лише mtime
+    touched_at = datetime(2030, 1, 1).timestamp()
+    os.utime(raw_data_dir / "hello.txt", (touched_at, touched_at))
+    ArkBuilder(input_dir=str(raw_data_dir), output_file=str(output_file)).update(str(output_file))
+
+    content = json.loads(output_file.read_text(encoding="utf-8"))["content"]
+    table = lancedb.connect(content["vector_index_uri"]).open_table("vectors")
+    sql = SearchFilters(modified_after=datetime(2029, 1, 1)).to_sql()
+    sources = set(table.to_lance().to_table(columns=["source"], filter=sql).column("source").to_pylist())
+    assert sources == {"hello.txt"}
@@ -0,0 +1,48 @@
+import threading
+import numpy as np
+import pytest
+from ark_engine.core.embed_batcher import EmbeddingBatcher
+from ark_engine.core.metrics import Histogram
+
+def test_concurrent_queries_share_forward_pass():
+    calls = []
+    def encode(model, texts):
+        calls.append(list(texts))
+        return np.array([[float(len(t)), 1.0] for t in texts], dtype=np.float32)
+
+    batcher = EmbeddingBatcher(encode, window_ms=50, max_batch=64)
+    barrier = threading.Barrier(8)
+    results = {}
+    def worker(i):
+        barrier.wait()
+        results[i] = batcher.encode("m", ["q" * (i + 1), "shared"])
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    batcher.close()
+
+    assert len(calls) < 8
+    assert sum(len(c) for c in calls) == 8 + len(calls)  # "shared" кодується раз на пакет
+    for i, vectors in results.items():
+        assert vectors[:, 0].tolist() == [i + 1, 6.0]
+    stats = batcher.stats()
+    assert stats["batch_size"]["sum"] == 16
+    assert stats["queue_wait_ms"]["count"] == 16
+
+def test_encode_errors_reach_every_caller():
+    def encode(model, texts):
+        raise RuntimeError("model unavailable")
+
+    batcher = EmbeddingBatcher(encode, window_ms=1)
+    with pytest.raises(RuntimeError):
+        batcher.encode("m", ["a", "b"])
+    batcher.close()
+
+def test_histogram_buckets_are_cumulative():
+    h = Histogram([1, 10])
+    for v in (0.5, 5, 5, 50):
+        h.observe(v)
+    assert h.snapshot()["buckets"] == {"le_1": 1, "le_10": 3, "le_+Inf": 4}
@@ -0,0 +1,37 @@
+import numpy as np
+from ark_engine.core.embedding_cache import EmbeddingCache, text_key
+
+def test_cache_roundtrip_and_counters(tmp_path):
+    cache = EmbeddingCache(path=tmp_path / "cache.sqlite", max_bytes=10**6)
+    keys = [text_key("a"), text_key("b")]
+    cache.put_many("m", keys, np.array([[1.0, 0.0], [0.0, 1.0]]))
+
+    found = cache.get_many("m", keys + [text_key("c")])
+    assert np.allclose(found[keys[1]], [0.0, 1.0])
+    assert cache.hits == 2 and cache.misses == 1
+
+    # Інша модель — інший простір ключів
+    assert cache.get_many("other", keys) == {}
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    # Кожен вектор 4 float32 = 16 байт, ліміт — 3 вектори
+    cache = EmbeddingCache(path=tmp_path / "cache.sqlite", max_bytes=48)
+    for i in range(3):
+        cache.put_many("m", [text_key(str(i))], np.ones((1, 4)))
+    cache.get_many("m", [text_key("0")])
+
+    cache.put_many("m", [text_key("3")], np.ones((1, 4)))
+
+    assert cache.evictions >= 1
+    assert text_key("0") in cache.get_many("m", [text_key("0")])
+    assert cache.stats()["size_bytes"] <= 48
+
+def test_cache_replacing_entries_does_not_inflate_size(tmp_path):
+    cache = EmbeddingCache(path=tmp_path / "cache.sqlite", max_bytes=48)
+    keys = [text_key(str(i)) for i in range(3)]
+    for _ in range(3):
+        cache.put_many("m", keys, np.ones((3, 4)))
+    cache.put_many("m", [keys[0], keys[0]], np.zeros((2, 4)))
+
+    assert cache.stats()["size_bytes"] == 48 and cache.evictions == 0
+    assert len(cache.get_many("m", keys)) == 3
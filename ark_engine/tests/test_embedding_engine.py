@@ -0,0 +1,11 @@
+from ark_engine.core.embedding_engine import plan_batches
+
+def test_plan_batches_buckets_by_length():
+    lengths = [500, 10, 12, 480, 11, 9]
+    batches = plan_batches(lengths, tokens_per_batch=1000, max_batch=4)
+
+    assert sorted(i for b in batches for i in b) == list(range(len(lengths)))
+    # короткі входи разом, довгі — окремо під бюджет токенів
+    assert set(batches[0]) == {1, 2, 4, 5}
+    for batch in batches:
+        assert len(batch) * max(lengths[i] for i in batch) <= 1000
@@ -0,0 +1,41 @@
+from datetime import datetime
+
+import numpy as np
+from ark_engine.core.extraction import locate_pages
+from ark_engine.core.filters import SearchFilters, source_dir, source_ext
+from ark_engine.core.vector_store import NumpyVectorStore
+
+def test_filters_to_sql():
+    assert SearchFilters().is_empty()
+    f = SearchFilters(ext=["PDF", ".docx"], dir="/reports/2024/", source="it's.pdf", page_min=2, page_max=5)
+    assert f.to_sql() == (
+        "ext IN ('.pdf', '.docx') AND (dir = 'reports/2024' OR dir LIKE 'reports/2024/%' ESCAPE '\\') "
+        "AND source = 'it''s.pdf' AND page >= 2 AND page <= 5"
+    )
+    after = datetime(2024, 1, 1)
+    assert SearchFilters(modified_after=after).to_sql() == f"mtime >= {after.timestamp()}"
+    assert source_ext("a/b/Report.PDF") == ".pdf" and source_dir("a/b/c.txt") == "a/b" and source_dir("c.txt") == ""
+
+def test_dir_filter_treats_like_wildcards_literally(tmp_path):
+    import lancedb
+    import pyarrow as pa
+    assert SearchFilters(dir="my_docs").to_sql() == "(dir = 'my_docs' OR dir LIKE 'my\\_docs/%' ESCAPE '\\')"
+
+    dirs = ["my_docs", "my_docs/sub", "myXdocs", "myXdocs/sub", "100%", "100x/sub"]
+    table = lancedb.connect(str(tmp_path)).create_table("vectors", pa.table({"id": list(range(len(dirs))), "dir": dirs}))
+    def matching(d):
+        return sorted(table.to_lance().to_table(columns=["dir"], filter=SearchFilters(dir=d).to_sql()).column("dir").to_pylist())
+    assert matching("my_docs") == ["my_docs", "my_docs/sub"]
+    assert matching("100%") == ["100%"]
+
+def test_chunks_located_on_pages():
+    pages = ["First page text here.", "Second page starts.", "Third page."]
+    text = "\n\n".join(pages)
+    chunks = ["First page", "text here. Second page", "starts.", "Third page."]
+    assert locate_pages(text, pages, chunks) == [1, 1, 2, 3]
+
+def test_numpy_search_respects_mask():
+    store = NumpyVectorStore.from_array(np.eye(4, dtype=np.float32))
+    positions, _ = store.search_batch(np.array([[1.0, 0.9, 0.0, 0.0]]), 2, mask=np.array([False, True, False, True]))
+    assert positions.tolist() == [[1, 3]]
+    assert store.search_batch(np.ones((1, 4)), 2, mask=np.zeros(4, dtype=bool))[0].shape == (1, 0)
@@ -0,0 +1,54 @@
+import os
+import pickle
+from types import SimpleNamespace
+
+import numpy as np
+
+from ark_engine.core.kv_slots import ChatSlot, KVSlotPool
+
+def state(tag: int):
+    """Стан з тими самими полями, що LlamaState."""
+    return SimpleNamespace(input_ids=np.array([tag, tag + 1], dtype=np.intc), scores=np.zeros((1, 3), np.single),
+                           n_tokens=2, llama_state=bytes([tag]) * 4, llama_state_size=4)
+
+def pool(tmp_path, max_slots):
+    return KVSlotPool(max_slots=max_slots, spill_dir=str(tmp_path), state_factory=SimpleNamespace)
+
+def test_lru_slot_spills_to_disk_and_resumes(tmp_path):
+    slots = pool(tmp_path, 2)
+    for tag, chat in enumerate(("a", "b", "c")):
+        slots.put(chat, ChatSlot("m1", [{"role": "user", "content": chat}], state(tag)))
+
+    assert slots.stats()["slots"] == 2 and slots.stats()["evictions"] == 1
+    assert len(list(tmp_path.glob("*.kvslot"))) == 1
+
+    resumed = slots.get("a", "m1")
+    assert resumed.state.llama_state == bytes([0]) * 4 and resumed.state.input_ids.tolist() == [0, 1]
+    assert resumed.messages == [{"role": "user", "content": "a"}] and slots.stats()["disk_hits"] == 1
+    # Повернення 'a' витіснило 'b' на диск, звідки його теж можна підняти
+    assert slots.get("b", "m1").state.llama_state == bytes([1]) * 4 and slots.stats()["evictions"] == 3
+
+def test_slot_of_another_model_is_not_restored(tmp_path):
+    slots = KVSlotPool(max_slots=1, spill_dir="off")
+    slots.put("a", ChatSlot("m1", [], state=state(0)))
+    assert slots.get("a", "m2") is None
+    assert slots.get("a", "m1") is None
+    slots.put("b", ChatSlot("m1", [], state=state(0)))
+    slots.drop("b")
+    assert slots.get("b", "m1") is None and slots.stats()["misses"] == 3
+
+class Exploit:
+    def __init__(self, target):
+        self.target = target
+
+    def __reduce__(self):
+        return (os.system, (f"touch {self.target}",))
+
+def test_spilled_slot_files_are_never_unpickled(tmp_path):
+    slots = pool(tmp_path, 0)
+    slots.put("a", ChatSlot("m1", [], state(0)))
+    path = next(tmp_path.glob("*.kvslot"))
+    path.write_bytes(pickle.dumps(Exploit(tmp_path / "pwned")))
+
+    assert slots.get("a", "m1") is None
+    assert not (tmp_path / "pwned").exists() and not path.exists()
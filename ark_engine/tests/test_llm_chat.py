@@ -0,0 +1,117 @@
+import zlib
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from ark_engine.core import llm
+from ark_engine.core.kv_slots import KVSlotPool
+from ark_engine.core.llm_scheduler import LLMScheduler
+
+
+def _token(message: dict) -> int:
+    return zlib.crc32(f"{message['role']}:{message['content']}".encode("utf-8")) & 0x7FFFFFFF
+
+
+class FakeLlama:
+    """
+    Llama, у якої кожне повідомлення — один «токен». Як і llama.cpp, префілить
+    лише те, що не збігається з токенами вже в контексті; `prefilled` — скільки.
+    """
+    def __init__(self):
+        self.input_ids = np.zeros(0, dtype=np.intc)
+        self.n_tokens = 0
+        self.prefilled = []
+        self.restored = 0
+
+    def tokenize(self, text: bytes, add_bos: bool = False):
+        return list(text)
+
+    def create_chat_completion(self, messages, max_tokens, stream, temperature=0.8):
+        tokens = [_token(m) for m in messages]
+        current = self.input_ids[:self.n_tokens].tolist()
+        shared = 0
+        while shared < min(len(tokens), len(current)) and tokens[shared] == current[shared]:
+            shared += 1
+        self.prefilled.append(len(tokens) - shared)
+
+        answer = f"відповідь {len(self.prefilled)}"
+        self.input_ids = np.array(tokens + [_token({"role": "assistant", "content": answer})], dtype=np.intc)
+        self.n_tokens = len(self.input_ids)
+        yield {"choices": [{"delta": {"content": answer}}]}
+
+    def save_state(self):
+        return SimpleNamespace(input_ids=self.input_ids.copy(), scores=np.zeros((self.n_tokens, 2), np.single),
+                               n_tokens=self.n_tokens, llama_state=b"", llama_state_size=0)
+
+    def load_state(self, state):
+        self.input_ids = state.input_ids.copy()
+        self.n_tokens = state.n_tokens
+        self.restored += 1
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    engine = llm.LLMEngine()
+    model = FakeLlama()
+    monkeypatch.setattr(engine, "_models", [model])
+    monkeypatch.setattr(engine, "_model_key", "fake")
+    monkeypatch.setattr(engine, "prefix_cache", False)
+    monkeypatch.setattr(engine, "slots", KVSlotPool(max_slots=4, spill_dir="off"))
+    monkeypatch.setattr(engine, "scheduler", LLMScheduler(slots=1))
+    return engine, model
+
+
+def ask(engine, query: str, context: str, chat_id: str) -> str:
+    return "".join(engine.generate_stream(query, context, chat_id=chat_id))
+
+
+def test_follow_up_turns_prefill_only_the_new_message(engine):
+    engine, model = engine
+    for turn in range(3):
+        ask(engine, f"питання {turn}", "короткий фрагмент", "chat")
+        # Інша розмова між ходами витісняє KV-кеш з моделі
+        ask(engine, "стороннє", "інший фрагмент", "other")
+
+    chat = model.prefilled[0::2]
+    assert chat == [2, 1, 1]
+    assert model.restored >= 2
+
+
+def test_long_documents_fall_back_to_compact_history_and_still_reuse_the_slot(engine):
+    engine, model = engine
+    documents = "д" * 600
+    for turn in range(3):
+        ask(engine, f"питання {turn}", documents, "chat")
+        ask(engine, "стороннє", "інший фрагмент", "other")
+
+    chat = model.prefilled[0::2]
+    # Документи попередніх ходів не вміщуються: історія йде без них, і префілиться
+    # лише останній хід (питання, відповідь) і нове повідомлення, а не вся розмова
+    assert chat == [2, 3, 3]
+    slot = engine.slots.get("chat", "fake")
+    assert len(slot.compact) == 7 and all(documents not in m["content"] for m in slot.compact)
+
+
+def test_system_prompt_state_round_trips_through_disk(engine, tmp_path, monkeypatch):
+    engine, model = engine
+    gguf = tmp_path / "model.gguf"
+    gguf.write_bytes(b"GGUF")
+    monkeypatch.setattr(engine, "_model_path", gguf)
+    monkeypatch.setattr(engine, "_prefix_state", None)
+    monkeypatch.setattr(engine, "_prefix_tokens", None)
+
+    engine._load_prefix(model)
+    tokens = engine._prefix_tokens
+    assert tokens and engine._prefix_path().exists()
+
+    # Після рестарту стан читається з файлу, модель нічого не префілить
+    fresh = FakeLlama()
+    engine._load_prefix(fresh)
+    assert fresh.prefilled == [] and engine._prefix_tokens == tokens
+    assert engine._prefix_state.input_ids.tolist()[:len(tokens)] == tokens
+
+    # Стан іншого ключа (промпт, модель, версія llama.cpp) не підхоплюється
+    monkeypatch.setattr(engine, "_model_key", "other")
+    engine._load_prefix(fresh)
+    assert len(fresh.prefilled) == 2
@@ -0,0 +1,65 @@
+import threading
+import time
+
+import pytest
+from ark_engine.core.llm_scheduler import (
+    BATCH, INTERACTIVE, DeadlineExceeded, LLMScheduler, RequestCancelled, SchedulerBusy
+)
+
+def test_interactive_requests_overtake_batch_and_full_queue_rejects():
+    scheduler = LLMScheduler(slots=1, max_queue=2)
+    running = scheduler.submit(INTERACTIVE)
+    running.__enter__()
+
+    order = []
+    def worker(ticket, name):
+        with ticket:
+            order.append(name)
+
+    batch = scheduler.submit(BATCH)
+    interactive = scheduler.submit(INTERACTIVE)
+    with pytest.raises(SchedulerBusy) as busy:
+        scheduler.submit(INTERACTIVE)
+    assert busy.value.retry_after >= 1
+
+    threads = [threading.Thread(target=worker, args=(batch, "batch")),
+               threading.Thread(target=worker, args=(interactive, "interactive"))]
+    threads[0].start()
+    time.sleep(0.05)
+    threads[1].start()
+    time.sleep(0.05)
+    assert scheduler.stats()["queued"] == {"interactive": 1, "batch": 1}
+
+    running.release()
+    for t in threads:
+        t.join(timeout=2)
+    assert order == ["interactive", "batch"]
+    stats = scheduler.stats()
+    assert stats["rejected"] == 1 and stats["completed"] == 3 and stats["queue_wait_ms"]["count"] == 3
+
+def test_deadline_and_abandoned_requests_free_the_queue():
+    scheduler = LLMScheduler(slots=1, max_queue=1)
+    with scheduler.submit(INTERACTIVE):
+        with pytest.raises(DeadlineExceeded):
+            with scheduler.submit(INTERACTIVE, deadline=0.05):
+                pass
+        # Запит, чий стрім так і не почався, після дедлайну не займає чергу
+        scheduler.submit(INTERACTIVE, deadline=0.0)
+        scheduler.submit(INTERACTIVE)
+    assert scheduler.stats()["expired"] == 2
+
+def test_cancelled_requests_are_counted_and_free_their_place():
+    scheduler = LLMScheduler(slots=1, max_queue=1)
+    running = scheduler.submit(INTERACTIVE)
+    running.__enter__()
+    queued = scheduler.submit(INTERACTIVE)
+
+    queued.cancel()
+    with pytest.raises(RequestCancelled):
+        queued.__enter__()
+    running.cancel()
+    assert running.cancelled
+    running.release()
+
+    stats = scheduler.stats()
+    assert stats["cancelled"] == 2 and stats["running"] == 0 and stats["queued"]["interactive"] == 0
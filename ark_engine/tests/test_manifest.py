@@ -0,0 +1,47 @@
+import os
+import pytest
+from pathlib import Path
+from ark_engine.core.manifest import BuildManifest
+
+@pytest.fixture
+def source_dir(tmp_path):
+    d = tmp_path / "src"
+    d.mkdir()
+    (d / "a.txt").write_text("alpha", encoding="utf-8")
+    (d / "b.txt").write_text("beta", encoding="utf-8")
+    return d
+
+def _snapshot_all(manifest, source_dir):
+    for f in sorted(source_dir.iterdir()):
+        record = BuildManifest.snapshot(f)
+        record.chunk_ids = manifest.allocate_ids(2)
+        manifest.files[f.name] = record
+
+def test_manifest_detects_added_changed_removed(source_dir):
+    manifest = BuildManifest(module_id="m1")
+    _snapshot_all(manifest, source_dir)
+    assert manifest.next_chunk_id == 4
+
+    (source_dir / "a.txt").write_text("alpha v2", encoding="utf-8")
+    (source_dir / "b.txt").unlink()
+    (source_dir / "c.txt").write_text("gamma", encoding="utf-8")
+
+    files = sorted(source_dir.iterdir())
+    changed, removed, touched = manifest.diff(files, source_dir)
+
+    assert [f.name for f in changed] == ["a.txt", "c.txt"]
+    assert removed == ["b.txt"] and touched == []
+
+def test_manifest_ignores_touch_without_content_change(source_dir, tmp_path):
+    manifest = BuildManifest(module_id="m1")
+    _snapshot_all(manifest, source_dir)
+
+    st = (source_dir / "a.txt").stat()
+    os.utime(source_dir / "a.txt", (st.st_atime, st.st_mtime + 10))
+
+    changed, removed, touched = manifest.diff(sorted(source_dir.iterdir()), source_dir)
+    assert changed == [] and removed == [] and touched == ["a.txt"]
+
+    path = tmp_path / "m1.manifest.json"
+    manifest.save(path)
+    assert BuildManifest.load(path).files["a.txt"].mtime == st.st_mtime + 10
@@ -0,0 +1,26 @@
+import threading
+from unittest.mock import MagicMock
+from ark_engine.core import model_registry
+from ark_engine.core.model_registry import ModelRegistry
+
+def test_registry_loads_once_and_caps_resident_models(monkeypatch):
+    loads = []
+    def fake_load(name, torch_threads=None):
+        loads.append(name)
+        return MagicMock(name=name)
+    monkeypatch.setattr(model_registry, "load_embedding_model", fake_load)
+
+    registry = ModelRegistry()
+    registry.clear()
+    monkeypatch.setattr(registry, "max_models", 2)
+
+    threads = [threading.Thread(target=registry.get, args=("a",)) for _ in range(8)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert loads == ["a"]
+
+    registry.get("b")
+    registry.get("a")
+    registry.get("c")  # "b" — найдавніше використана
+    assert registry.loaded() == ["a", "c"]
+    registry.clear()
@@ -0,0 +1,49 @@
+import numpy as np
+from ark_engine.core.quantization import QuantizedVectorWriter, QuantizedVectors
+
+def _data(n=2000, dim=64, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(n, dim)).astype(np.float32)
+    queries = vectors[:50] + rng.normal(scale=0.3, size=(50, dim)).astype(np.float32)
+    return vectors, queries
+
+def _recall(store, vectors, queries, k=10, factor=4):
+    normed = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    hits = 0
+    for q in queries:
+        truth = set(np.argsort(-(normed @ q))[:k].tolist())
+        positions, _ = store.search(q, k, factor)
+        hits += len(truth.intersection(positions.tolist()))
+    return hits / (k * len(queries))
+
+def test_quantized_storage_recall_and_size(tmp_path):
+    vectors, queries = _data()
+    recalls = {}
+    for kind in ("float16", "int8", "binary"):
+        writer = QuantizedVectorWriter(tmp_path / kind, kind)
+        writer.add(vectors[:1000])
+        writer.add(vectors[1000:])
+        store = QuantizedVectors(writer.finalize()["uri"])
+        assert store.count == len(vectors)
+        recalls[kind] = _recall(store, vectors, queries)
+        if kind == "binary":
+            # Випадкові ізотропні дані — найгірший випадок для знакових бітів;
+            # перевіряємо, що рескоринг повертає втрачений recall
+            assert store.codes["bits"].nbytes * 32 == vectors.nbytes
+            assert _recall(store, vectors, queries, factor=1) < recalls[kind] < _recall(store, vectors, queries, factor=10)
+    assert recalls["float16"] > 0.99 and recalls["int8"] > 0.95
+
+def test_codes_carry_over_between_stores(tmp_path):
+    vectors, queries = _data(n=300)
+    writer = QuantizedVectorWriter(tmp_path / "a", "binary")
+    writer.add(vectors)
+    old = QuantizedVectors(writer.finalize()["uri"])
+
+    # Як в update: частина рядків копіюється кодами, частина квантується заново
+    writer = QuantizedVectorWriter(tmp_path / "b", "binary", ranges=old.quantizer.ranges)
+    writer.add_codes(old.take(np.arange(100, 300)))
+    writer.add(vectors[:100])
+    new = QuantizedVectors(writer.finalize()["uri"])
+    for part in ("int8", "bits"):
+        np.testing.assert_array_equal(new.codes[part][:200], old.codes[part][100:])
+        np.testing.assert_array_equal(new.codes[part][200:], old.codes[part][:100])
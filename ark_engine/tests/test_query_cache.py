@@ -0,0 +1,40 @@
+import numpy as np
+from ark_engine.core.query_cache import QueryCache, normalize_query
+
+def test_normalized_queries_share_entry():
+    cache = QueryCache()
+    cache.put("m", "Як  встановити модуль? ", np.ones(4))
+    assert cache.get("m", "Як встановити модуль?") is not None
+    assert cache.get("other", "Як встановити модуль?") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+def test_cache_bounded_by_entries_and_bytes():
+    cache = QueryCache(max_entries=2, max_bytes=10**6)
+    for q in ("a", "b", "c"):
+        cache.put("m", q, np.ones(4))
+    assert cache.get("m", "a") is None
+    assert cache.stats()["evictions"] == 1
+
+    small = QueryCache(max_entries=100, max_bytes=32)  # два вектори по 16 байт
+    for q in ("a", "b", "c"):
+        small.put("m", q, np.ones(4))
+    assert small.stats()["entries"] == 2 and small.stats()["bytes"] <= 32
+
+def test_embed_queries_encodes_unique_misses_once(monkeypatch):
+    from ark_engine.core import query_cache
+    from ark_engine.core.model_registry import ModelRegistry
+
+    calls = []
+    class FakeModel:
+        def encode(self, texts, **kwargs):
+            calls.append(list(texts))
+            return np.array([[float(len(t)), 1.0] for t in texts], dtype=np.float32)
+
+    monkeypatch.setattr(query_cache, "QUERY_CACHE", QueryCache())
+    monkeypatch.setattr(ModelRegistry, "get", lambda self, name: FakeModel())
+    query_cache.QUERY_CACHE.put(query_cache.embedding_model_key("m"), "cached", np.zeros(2))
+
+    vectors = query_cache.embed_queries("m", ["ab", "cached", "ab ", "abcd"])
+    assert calls == [["ab", "abcd"]]
+    assert vectors.shape == (4, 2)
+    assert vectors[:, 0].tolist() == [2.0, 0.0, 2.0, 4.0]
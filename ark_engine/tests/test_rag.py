@@ -30,3 +30,26 @@ def test_rag_search(mock_module):
     results = rag.search("query", top_k=1)
     assert len(results) == 1
     assert results[0][0] == "Apple is a fruit"
+
+def test_search_many_batches_keyword_fallback(mock_module):
+    rag = ArkRAG(mock_module)
+    queries = ["apple fruit", "planet", "nothing here", "mars planet apple"]
+
+    results = rag.search_many(queries, top_k=2)
+    assert [r[0][0] if r else None for r in results] == ["Apple is a fruit", "Mars is a planet", None, "Mars is a planet"]
+    assert results == [rag._keyword_search(q, 2) for q in queries]
+
+def test_filters_on_in_process_modules_open_lancedb_once(mock_module):
+    import numpy as np
+    from ark_engine.core.filters import SearchFilters
+
+    rag = ArkRAG(mock_module, vectors=np.eye(2, dtype=np.float32))
+    table = MagicMock()
+    table.schema.names = ["id", "text", "ext", "dir", "mtime"]
+    table.to_lance.return_value.to_table.return_value.column.return_value.to_numpy.return_value = np.array([1])
+    opened = []
+    rag._connect_lancedb = lambda names: opened.append(names) or [table]
+
+    for ext in ("pdf", "pdf", "txt"):
+        rag._filter_mask(rag._filter_sql(SearchFilters(ext=[ext])))
+    assert len(opened) == 1
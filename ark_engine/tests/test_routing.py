@@ -0,0 +1,34 @@
+import numpy as np
+from ark_engine.core.routing import ModuleRouter, VectorSample, routing_summary, spherical_kmeans
+
+def _clusters(rng, centers, n=200, noise=0.05):
+    return np.vstack([c + noise * rng.standard_normal((n, len(c))) for c in centers]).astype(np.float32)
+
+def test_kmeans_recovers_clusters_and_sample_is_bounded():
+    rng = np.random.default_rng(0)
+    centers = np.eye(8, dtype=np.float32)[:3]
+    vectors = _clusters(rng, centers)
+
+    centroids, sizes = spherical_kmeans(vectors, 3)
+    assert sorted(sizes.tolist()) == [200, 200, 200]
+    assert np.allclose(np.sort((centroids @ centers.T).max(axis=0)), 1.0, atol=0.01)
+
+    sample = VectorSample(max_rows=50)
+    for start in range(0, len(vectors), 64):
+        sample.add(vectors[start:start + 64])
+    assert sample.array().shape == (50, 8) and sample.seen == 600
+
+def test_router_keeps_modules_closest_to_query():
+    rng = np.random.default_rng(1)
+    axes = np.eye(8, dtype=np.float32)
+    summaries = {
+        f"m{i}": routing_summary(_clusters(rng, [axes[i]], n=50), "minilm", n_centroids=2)
+        for i in range(4)
+    }
+    summaries["other"] = routing_summary(_clusters(rng, [axes[5]], n=50), "e5", n_centroids=2)
+    router = ModuleRouter(summaries)
+
+    queries = {"minilm": axes[2] + 0.5 * axes[3], "e5": -axes[5]}
+    embed = lambda model, texts: queries[model][None, :]
+    assert router.route("q", 2, embed) == ["m2", "m3"]
+    assert set(router.module_ids) == set(summaries)
@@ -0,0 +1,23 @@
+import pyarrow as pa
+from ark_engine.core.shards import merge_top_k, shards_entry, split_by_shard, table_names
+
+def test_rows_split_by_id_and_recorded_in_search_index():
+    frame = pa.table({"text": [f"t{i}" for i in range(10)], "id": list(range(10))})
+    parts = split_by_shard(frame, 3)
+    assert list(parts) == ["vectors_000", "vectors_001", "vectors_002"]
+    assert parts["vectors_001"].column("id").to_pylist() == [1, 4, 7]
+    assert list(split_by_shard(frame, 1)) == ["vectors"]
+
+    class FakeTable:
+        def __init__(self, n): self.n = n
+        def count_rows(self): return self.n
+
+    entries = shards_entry(3, {name: FakeTable(p.num_rows) for name, p in parts.items()})
+    assert entries[0]["counts"] == [4, 3, 3]
+    assert table_names([{"id": 0, "source": "a"}] + entries) == list(parts)
+    assert table_names([{"id": 0, "source": "a"}]) == ["vectors"] and shards_entry(1, {}) == []
+
+def test_merge_keeps_global_top_k():
+    a = pa.table({"text": ["a1", "a2"], "_distance": [0.1, 0.5]})
+    b = pa.table({"text": ["b1", "b2"], "_distance": [0.2, 0.3]})
+    assert merge_top_k([a, b], 3).column("text").to_pylist() == ["a1", "b1", "b2"]
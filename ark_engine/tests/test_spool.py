@@ -0,0 +1,28 @@
+import json
+from ark_engine.core.spool import ChunkSpool, write_spooled_module
+from ark_engine.core.indexer import Indexer
+from ark_engine.core.loader import ArkLoader
+from ark_engine.core.utils import calculate_checksum
+
+def test_spooled_module_checksum_matches_in_memory(tmp_path):
+    docs = ["Привіт, світ", "Second \"quoted\" chunk", "третій"]
+    sources = ["a.txt", "a.txt", "папка/b.md"]
+    ids = [0, 1, 5]
+
+    spool = ChunkSpool(tmp_path / "m.spool.jsonl")
+    spool.append(ids[:2], sources[:2], docs[:2])
+    spool.append(ids[2:], sources[2:], docs[2:])
+
+    small = {"vector_index_uri": "/tmp/m.lancedb", "media": []}
+    out = tmp_path / "m.ark.json"
+    checksum = write_spooled_module(out, {"id": "m", "title": "T"}, {"language": "uk"}, spool, small)
+
+    expected = calculate_checksum(dict(
+        small, docs=docs, references=sources, search_index=Indexer.build_index(sources, ids)
+    ))
+    assert checksum == expected
+
+    data = json.loads(out.read_text(encoding="utf-8"))
+    assert data["content"]["docs"] == docs
+    assert data["header"]["checksum"] == expected
+    assert ArkLoader._calculate_checksum(data["content"]) == expected
@@ -0,0 +1,14 @@
+from ark_engine.core.vector_index import AnnIndexConfig, search_params
+
+def test_resolve_defaults_fit_dimension():
+    params = AnnIndexConfig().resolve(rows=250_000, dim=384)
+    assert params == {"num_partitions": 500, "num_sub_vectors": 48}
+    assert 100 % AnnIndexConfig().resolve(rows=10, dim=100)["num_sub_vectors"] == 0
+
+def test_search_params_precedence(monkeypatch):
+    stored = {"nprobes": 20, "refine_factor": None}
+    assert search_params(None, nprobes=5) == {}
+    assert search_params(stored) == {"nprobes": 20, "refine_factor": None}
+    monkeypatch.setenv("ARK_SEARCH_NPROBES", "40")
+    assert search_params(stored)["nprobes"] == 40
+    assert search_params(stored, nprobes=8, refine_factor=4) == {"nprobes": 8, "refine_factor": 4}
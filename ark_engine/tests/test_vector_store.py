@@ -0,0 +1,21 @@
+import numpy as np
+from ark_engine.core.vector_store import NumpyVectorStore
+
+def test_numpy_store_matches_brute_force(tmp_path):
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(500, 32)).astype(np.float32)
+    queries = rng.normal(size=(7, 32)).astype(np.float32)
+
+    entry = NumpyVectorStore.save(tmp_path / "m.npvec", vectors * 3)  # норма не важлива
+    store = NumpyVectorStore.from_search_index([{"id": 0, "source": "a"}, entry])
+    assert isinstance(store.vectors, np.memmap)
+    assert NumpyVectorStore.from_search_index([entry], max_rows=100) is None
+
+    normed = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    batch_pos, batch_scores = store.search_batch(queries, 5)
+    for q, pos, scores in zip(queries, batch_pos, batch_scores):
+        expected = np.argsort(-(normed @ (q / np.linalg.norm(q))))[:5]
+        single_pos, single_scores = store.search(q, 5)
+        assert pos.tolist() == expected.tolist() == single_pos.tolist()
+        np.testing.assert_allclose(scores, single_scores, rtol=1e-5)
+        assert np.all(np.diff(scores) <= 0)
@@ -10,6 +10,7 @@ from web_ui.backend.modules_router import router as modules_router
 from web_ui.backend.rag_router import router as rag_router
 from web_ui.backend.settings import settings
 from web_ui.backend.chat_router import router as chat_router
+from web_ui.backend.metrics_router import router as metrics_router
 
 # --- Setup ---
 logging.basicConfig(level=logging.INFO)
@@ -30,10 +31,29 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+def warmup_models():
+    if settings.EMBEDDING_WARMUP:
+        from ark_engine.core.model_registry import ModelRegistry
+        ModelRegistry().warmup()
+        logger.info("✅ Embedding model warmed up")
+
+@app.on_event("startup")
+def start_embed_batcher():
+    if settings.EMBED_BATCHING:
+        from ark_engine.core.embed_batcher import install_batcher
+        install_batcher(window_ms=settings.EMBED_BATCH_WINDOW_MS, max_batch=settings.EMBED_BATCH_MAX)
+
+@app.on_event("shutdown")
+def stop_embed_batcher():
+    from ark_engine.core.embed_batcher import uninstall_batcher
+    uninstall_batcher()
+
 # --- Routers ---
 app.include_router(modules_router, prefix="/api/v1")
 app.include_router(rag_router, prefix="/api/v1")
 app.include_router(chat_router, prefix="/api/v1")
+app.include_router(metrics_router, prefix="/api/v1")
 
 # --- Static Files Logic ---
 # Визначаємо шлях до frontend папки (всередині контейнера це /app/web_ui/frontend)
@@ -1,15 +1,17 @@
 import shutil
 import os
-from fastapi import APIRouter, UploadFile, File, HTTPException, Form
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Request
 from pydantic import BaseModel
 from typing import List, Optional
 import json
 from pathlib import Path
 
+from ark_engine.core.filters import SearchFilters
 from web_ui.backend import db
-from web_ui.backend.session_manager import get_session
-from web_ui.backend.rag_router import get_or_load_rag
+from web_ui.backend.session_manager import drop_session, get_session
+from ark_engine.core.llm_scheduler import DeadlineExceeded, RequestCancelled
+from web_ui.backend.rag_router import admit_llm_request, get_or_load_rag
+from web_ui.backend.streaming import ndjson_stream
 
 router = APIRouter()
 
@@ -39,6 +41,7 @@ def create_new_chat(req: CreateChatReq):
 @router.delete("/chats/{chat_id}")
 def delete_chat(chat_id: str):
     db.delete_chat(chat_id)
+    drop_session(chat_id)
     return {"status": "ok"}
 
 @router.get("/chats/{chat_id}", response_model=ChatHistory)
@@ -69,11 +72,15 @@ async def upload_file_to_chat(chat_id: str, file: UploadFile = File(...)):
             os.remove(file_path)
 
 @router.post("/chats/{chat_id}/ask_stream")
-async def ask_chat_stream(chat_id: str, req: dict):
+async def ask_chat_stream(chat_id: str, req: dict, request: Request):
     query = req.get("query")
     module_id = req.get("module_id")
     
     if not query: raise HTTPException(400, "Query empty")
+    try:
+        filters = SearchFilters(**req["filters"]) if req.get("filters") else None
+    except (TypeError, ValueError) as e:
+        raise HTTPException(422, f"Invalid filters: {e}")
 
     session = get_session(chat_id)
     
@@ -84,21 +91,37 @@ async def ask_chat_stream(chat_id: str, req: dict):
         except Exception as e:
             print(f"Warning: Could not load base module: {e}")
 
-    db.add_message(chat_id, "user", query)
+    if req.get("priority", "interactive") not in ("interactive", "batch"):
+        raise HTTPException(422, "priority must be 'interactive' or 'batch'")
+    ticket = admit_llm_request(req.get("priority", "interactive"), req.get("deadline_s"))
+    try:
+        db.add_message(chat_id, "user", query)
+    except Exception:
+        # Відповіді не буде — місце в черзі (чи слот) не повинне чекати дедлайну
+        ticket.cancel()
+        ticket.release()
+        raise
 
     def iter_response():
-        # Збільшено top_k з 3 до 6 для кращого контексту
-        sources = session.search(query, top_k=6)
-        
-        sources_data = [{"chunk": t, "score": float(s)} for t, s in sources]
-        
-        yield json.dumps({"type": "sources", "data": sources_data}, ensure_ascii=False) + "\n"
+        try:
+            # Збільшено top_k з 3 до 6 для кращого контексту
+            sources = session.search(query, top_k=6, filters=filters)
 
-        full_answer = ""
-        for token in session.ask_stream(query):
-            full_answer += token
-            yield json.dumps({"type": "token", "content": token}, ensure_ascii=False) + "\n"
-        
-        db.add_message(chat_id, "system", full_answer, sources=sources_data)
+            sources_data = [{"chunk": t, "score": float(s)} for t, s in sources]
+
+            yield json.dumps({"type": "sources", "data": sources_data}, ensure_ascii=False) + "\n"
+
+            full_answer = ""
+            for token in session.ask_stream(query, filters=filters, ticket=ticket):
+                full_answer += token
+                yield json.dumps({"type": "token", "content": token}, ensure_ascii=False) + "\n"
+
+            db.add_message(chat_id, "system", full_answer, sources=sources_data)
+        except DeadlineExceeded as e:
+            yield json.dumps({"type": "error", "content": str(e)}, ensure_ascii=False) + "\n"
+        except RequestCancelled:
+            return
+        finally:
+            ticket.release()
 
-    return StreamingResponse(iter_response(), media_type="application/x-ndjson")
+    return ndjson_stream(request, iter_response(), ticket)
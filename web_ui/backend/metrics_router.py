@@ -0,0 +1,20 @@
+import logging
+from fastapi import APIRouter
+
+from ark_engine.core.embed_batcher import active_batcher
+from ark_engine.core.llm import LLMEngine
+from ark_engine.core.query_cache import QUERY_CACHE
+
+logger = logging.getLogger("metrics_router")
+router = APIRouter()
+
+@router.get("/metrics")
+def get_metrics():
+    """Лічильники кешів та черг бекенду (JSON)."""
+    batcher = active_batcher()
+    return {
+        "query_cache": QUERY_CACHE.stats(),
+        "embed_batcher": batcher.stats() if batcher else None,
+        "llm_chat_slots": LLMEngine().slots.stats(),
+        "llm_scheduler": LLMEngine().scheduler.stats(),
+    }
@@ -1,14 +1,17 @@
 import json
 import logging
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
-from typing import List
+from typing import List, Literal, Optional
 from pathlib import Path
 
+from ark_engine.core.filters import SearchFilters
+from ark_engine.core.llm import LLMEngine
+from ark_engine.core.llm_scheduler import PRIORITIES, DeadlineExceeded, RequestCancelled, SchedulerBusy, Ticket
 from ark_engine.core.loader import ArkLoader
 from ark_engine.core.rag import ArkRAG
 from web_ui.backend.settings import settings
+from web_ui.backend.streaming import ndjson_stream
 
 logger = logging.getLogger("rag_router")
 router = APIRouter()
@@ -18,6 +21,18 @@ RAG_CACHE = {}
 class AskRequest(BaseModel):
     query: str
     module_id: str
+    filters: Optional[SearchFilters] = None
+    # Пакетні задачі поступаються місцем у черзі LLM інтерактивним запитам
+    priority: Literal["interactive", "batch"] = "interactive"
+    # Скільки секунд запит готовий чекати на вільний слот генерації
+    deadline_s: Optional[float] = None
+
+def admit_llm_request(priority: str = "interactive", deadline_s: Optional[float] = None) -> Ticket:
+    """Місце в черзі LLM до початку стріму: при повній черзі — 429 з Retry-After."""
+    try:
+        return LLMEngine().scheduler.submit(PRIORITIES[priority], deadline_s)
+    except SchedulerBusy as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
 
 def get_or_load_rag(module_id: str) -> ArkRAG:
     if module_id in RAG_CACHE:
@@ -54,27 +69,36 @@ def get_or_load_rag(module_id: str) -> ArkRAG:
     return rag
 
 @router.post("/ask_stream")
-async def ask_question_stream(req: AskRequest):
+async def ask_question_stream(req: AskRequest, request: Request):
     """Новий ендпоінт для потокової передачі"""
     rag_engine = get_or_load_rag(req.module_id)
+    ticket = admit_llm_request(req.priority, req.deadline_s)
 
     # Генератор, який спочатку віддає метадані (джерела), а потім текст
     def iter_response():
-        # 1. Спочатку шукаємо джерела
-        sources = rag_engine.search(req.query, top_k=3)
-        
-        # Відправляємо джерела як перший чанк (JSON рядок)
-        sources_data = json.dumps({
-            "type": "sources",
-            "data": [{"chunk": t, "score": s} for t, s in sources]
-        }, ensure_ascii=False)
-        yield sources_data + "\n"
+        try:
+            # 1. Спочатку шукаємо джерела
+            sources = rag_engine.search(req.query, top_k=3, filters=req.filters)
+
+            # Відправляємо джерела як перший чанк (JSON рядок)
+            sources_data = json.dumps({
+                "type": "sources",
+                "data": [{"chunk": t, "score": s} for t, s in sources]
+            }, ensure_ascii=False)
+            yield sources_data + "\n"
 
-        # 2. Потім стрімимо токени
-        for token in rag_engine.ask_stream(req.query):
-            # Екрануємо спецсимволи для JSON, якщо треба, або шлемо raw
-            # Тут використовуємо простий формат: prefix "data: "
-            msg = json.dumps({"type": "token", "content": token}, ensure_ascii=False)
-            yield msg + "\n"
+            # 2. Потім стрімимо токени
+            for token in rag_engine.ask_stream(req.query, filters=req.filters, ticket=ticket):
+                # Екрануємо спецсимволи для JSON, якщо треба, або шлемо raw
+                # Тут використовуємо простий формат: prefix "data: "
+                msg = json.dumps({"type": "token", "content": token}, ensure_ascii=False)
+                yield msg + "\n"
+        except DeadlineExceeded as e:
+            yield json.dumps({"type": "error", "content": str(e)}, ensure_ascii=False) + "\n"
+        except RequestCancelled:
+            return
+        finally:
+            # Звільняє слот (або місце в черзі, якщо до генерації не дійшло)
+            ticket.release()
 
-    return StreamingResponse(iter_response(), media_type="application/x-ndjson")
+    return ndjson_stream(request, iter_response(), ticket)
@@ -2,26 +2,42 @@ import shutil
 import os
 import logging
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional
+
+import numpy as np
 
 # Імпорти ядра
+from ark_engine.core.filters import SearchFilters
 from ark_engine.core.text_loader import MonsterLoader
 from ark_engine.core.chunker import TextChunker
 from ark_engine.core.embedder import Embedder
+from ark_engine.core.llm import LLMEngine
 from ark_engine.core.rag import ArkRAG
 from ark_engine.core.models import ArkModule, ArkContent
 
 logger = logging.getLogger("session_manager")
 
+# Один Embedder на процес: модель береться з ModelRegistry і не перезавантажується
+# на кожне завантаження файлу
+_embedder = None
+
+def get_embedder() -> Embedder:
+    global _embedder
+    if _embedder is None:
+        _embedder = Embedder('all-MiniLM-L6-v2') # Та сама модель
+    return _embedder
+
 class SessionRAG:
     """
     Об'єднує основний модуль .ark та тимчасові файли користувача.
     """
-    def __init__(self, base_rag: ArkRAG = None):
+    def __init__(self, base_rag: ArkRAG = None, chat_id: Optional[str] = None):
         self.base_rag = base_rag
+        # Id чату: LLM тримає історію розмови та її KV-кеш у слоті цього чату
+        self.chat_id = chat_id
         self.dynamic_rag = None # RAG для завантажених файлів
         self.temp_docs = []
-        self.temp_embeddings = []
+        self.temp_embeddings = np.zeros((0, 0), dtype=np.float32)
 
     def set_base_module(self, rag: ArkRAG):
         self.base_rag = rag
@@ -39,36 +55,38 @@ class SessionRAG:
         chunker = TextChunker(max_chars=1000)
         chunks = chunker.chunk(text)
         
-        # 3. Embed
-        embedder = Embedder('all-MiniLM-L6-v2') # Та сама модель
-        embeddings = embedder.embed(chunks)
+        # 3. Embed (через спільний дисковий кеш: повторні завантаження не перераховуються)
+        embedder = get_embedder()
+        embeddings = embedder.embed_array(chunks)
+        if embedder.cache:
+            logger.info(f"Embedding cache: {embedder.cache.stats()}")
 
         # 4. Add to dynamic storage
         self.temp_docs.extend(chunks)
-        self.temp_embeddings.extend(embeddings)
+        if len(embeddings):
+            parts = [self.temp_embeddings, embeddings] if len(self.temp_embeddings) else [embeddings]
+            self.temp_embeddings = np.vstack(parts)
 
         # 5. Re-build dynamic RAG instance
         # Ми створюємо фейковий модуль, щоб використати існуючий клас ArkRAG
-        fake_content = ArkContent(
-            docs=self.temp_docs,
-            embeddings=self.temp_embeddings
-        )
+        fake_content = ArkContent(docs=self.temp_docs)
         # Створюємо мінімальний об'єкт-заглушку
         class MockModule:
             def __init__(self, content): self.content = content
         
-        self.dynamic_rag = ArkRAG(MockModule(fake_content))
+        # Вектори лишаються в пам'яті: точний пошук NumpyVectorStore, без LanceDB
+        self.dynamic_rag = ArkRAG(MockModule(fake_content), vectors=self.temp_embeddings)
         return len(chunks)
 
-    def search(self, query: str, top_k: int = 3):
+    def search(self, query: str, top_k: int = 3, filters: Optional[SearchFilters] = None):
         results = []
         
         # Пошук в основному модулі
         if self.base_rag:
-            results.extend(self.base_rag.search(query, top_k=top_k))
+            results.extend(self.base_rag.search(query, top_k=top_k, filters=filters))
             
-        # Пошук у файлах користувача
-        if self.dynamic_rag:
+        # Пошук у файлах користувача (у них немає колонок фільтрів — з фільтрами не шукаємо)
+        if self.dynamic_rag and (filters is None or filters.is_empty()):
             results.extend(self.dynamic_rag.search(query, top_k=top_k))
             
         # Сортуємо все разом за релевантністю і беремо топ-K
@@ -76,7 +94,7 @@ class SessionRAG:
         results.sort(key=lambda x: x[1], reverse=True)
         return results[:top_k]
 
-    def ask_stream(self, query: str):
+    def ask_stream(self, query: str, filters: Optional[SearchFilters] = None, ticket=None):
         # Використовуємо LLM з базового RAG (або створюємо новий, якщо бази немає)
         llm_engine = self.base_rag.llm if self.base_rag else None
         
@@ -89,7 +107,7 @@ class SessionRAG:
             return
 
         # 1. Гібридний пошук
-        results = self.search(query, top_k=6)
+        results = self.search(query, top_k=6, filters=filters)
         
         if not results:
             yield "На жаль, я не знайшов достатньо релевантної інформації у ваших документах."
@@ -99,7 +117,7 @@ class SessionRAG:
         context = "\n".join([f"[Джерело {i+1}]: {txt}" for i, (txt, _) in enumerate(results)])
         
         # 3. Генерація
-        yield from llm_engine.generate_stream(query, context)
+        yield from llm_engine.generate_stream(query, context, chat_id=self.chat_id, ticket=ticket)
 
 # Глобальне сховище сесій {chat_id: SessionRAG}
 # В реальному проді це має бути Redis або кеш з TTL
@@ -107,5 +125,10 @@ ACTIVE_SESSIONS: Dict[str, SessionRAG] = {}
 
 def get_session(chat_id: str) -> SessionRAG:
     if chat_id not in ACTIVE_SESSIONS:
-        ACTIVE_SESSIONS[chat_id] = SessionRAG()
+        ACTIVE_SESSIONS[chat_id] = SessionRAG(chat_id=chat_id)
     return ACTIVE_SESSIONS[chat_id]
+
+def drop_session(chat_id: str):
+    """Закриває сесію видаленого чату разом зі станом KV його розмови."""
+    ACTIVE_SESSIONS.pop(chat_id, None)
+    LLMEngine().drop_chat(chat_id)
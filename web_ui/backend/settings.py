@@ -5,5 +5,11 @@ class Settings(BaseSettings):
     ARK_MODULES_PATH: str = "/app/data"
     API_PORT: int = 8000
     API_HOST: str = "0.0.0.0" 
+    # Завантажити й прогріти модель ембеддінгів при старті, а не на першому запиті
+    EMBEDDING_WARMUP: bool = False
+    # Мікро-батчинг ембеддінгів запитів: одночасні запити кодуються одним викликом моделі
+    EMBED_BATCHING: bool = True
+    EMBED_BATCH_WINDOW_MS: float = 5.0
+    EMBED_BATCH_MAX: int = 32
 
 settings = Settings()
@@ -0,0 +1,64 @@
+import logging
+import threading
+from typing import Iterator
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import iterate_in_threadpool
+
+from ark_engine.core.llm_scheduler import Ticket
+
+logger = logging.getLogger("streaming")
+
+
+class CancellableStream:
+    """
+    Синхронний генератор відповіді, який можна зупинити з іншого потоку:
+    `cancel()` позначає запит скасованим і закриває генератор, щойно поточний
+    крок (максимум один токен) завершиться — слот LLM звільняється одразу.
+    """
+    def __init__(self, lines: Iterator[str], ticket: Ticket):
+        self.lines = lines
+        self.ticket = ticket
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        with self._lock:
+            if self._closed:
+                raise StopIteration
+            return next(self.lines)
+
+    def cancel(self):
+        self.ticket.cancel()
+        with self._lock:
+            self._closed = True
+            self.lines.close()
+
+
+def ndjson_stream(request: Request, lines: Iterator[str], ticket: Ticket) -> StreamingResponse:
+    """
+    NDJSON-стрім, що стежить за клієнтом: після закриття вкладки чи нового
+    питання (розрив з'єднання) генерація LLM скасовується, а не йде до max_tokens.
+    """
+    stream = CancellableStream(lines, ticket)
+
+    async def body():
+        finished = False
+        try:
+            async for line in iterate_in_threadpool(stream):
+                if await request.is_disconnected():
+                    return
+                yield line
+            finished = True
+        finally:
+            # Розрив з'єднання (return вище) або скасування самої відповіді сервером
+            if not finished:
+                logger.info("Client disconnected; cancelling generation")
+                # cancel() чекає на поточний токен — не блокуємо цим event loop
+                threading.Thread(target=stream.cancel, name="ark-llm-cancel", daemon=True).start()
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
@@ -209,6 +209,10 @@ const App = {
                 signal: this.state.controller.signal
             });
 
+            if (res.status === 429) {
+                const wait = res.headers.get('Retry-After') || '?';
+                throw new Error(`сервер зайнятий, спробуйте через ${wait} с`);
+            }
             if (!res.ok) throw new Error(`Error: ${res.status}`);
 
             const reader = res.body.getReader();
@@ -229,6 +233,8 @@ const App = {
                             this.scrollToBottom();
                         } else if (json.type === 'sources') {
                             this.renderCitations(json.data);
+                        } else if (json.type === 'error') {
+                            botBubble.innerText = json.content;
                         }
                     } catch (e) {}
                 }
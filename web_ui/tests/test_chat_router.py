@@ -0,0 +1,26 @@
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+
+from ark_engine.core.llm_scheduler import INTERACTIVE, LLMScheduler
+from web_ui.backend import chat_router
+
+
+def test_failed_message_write_frees_the_llm_ticket(monkeypatch):
+    scheduler = LLMScheduler(slots=1, max_queue=1)
+    monkeypatch.setattr(chat_router, "admit_llm_request",
+                        lambda priority, deadline_s: scheduler.submit(INTERACTIVE, deadline_s))
+    monkeypatch.setattr(chat_router, "get_session", lambda chat_id: MagicMock())
+
+    def unknown_chat(*args, **kwargs):
+        raise KeyError("unknown chat")
+    monkeypatch.setattr(chat_router.db, "add_message", unknown_chat)
+
+    with pytest.raises(KeyError):
+        asyncio.run(chat_router.ask_chat_stream("missing", {"query": "?"}, request=MagicMock()))
+
+    stats = scheduler.stats()
+    assert stats["cancelled"] == 1 and stats["queued"]["interactive"] == 0 and stats["running"] == 0
+    # Черга одразу вільна для наступного запиту
+    scheduler.submit(INTERACTIVE)
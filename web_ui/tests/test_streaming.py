@@ -0,0 +1,86 @@
+import asyncio
+import threading
+import time
+
+from ark_engine.core.llm_scheduler import INTERACTIVE, LLMScheduler
+from web_ui.backend.streaming import CancellableStream, ndjson_stream
+
+
+class FakeRequest:
+    """Клієнт, що відключається після `after` прочитаних рядків."""
+    def __init__(self, after: int):
+        self.after = after
+        self.checks = 0
+
+    async def is_disconnected(self) -> bool:
+        self.checks += 1
+        return self.checks > self.after
+
+
+def llm_lines(ticket, closed: threading.Event):
+    """Як iter_response у роутерах: генерація в слоті, який звільняється у finally."""
+    with ticket:
+        try:
+            for i in range(1000):
+                if ticket.cancelled:
+                    return
+                yield f'{{"type": "token", "content": "{i}"}}\n'
+        finally:
+            closed.set()
+
+
+def wait_for(predicate, timeout: float = 2.0) -> bool:
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_cancellable_stream_cancels_ticket_and_closes_generator():
+    scheduler = LLMScheduler(slots=1)
+    ticket = scheduler.submit(INTERACTIVE)
+    closed = threading.Event()
+    stream = CancellableStream(llm_lines(ticket, closed), ticket)
+
+    assert next(stream).startswith('{"type": "token"')
+    stream.cancel()
+
+    assert ticket.cancelled and closed.is_set()
+    assert list(stream) == []
+    stats = scheduler.stats()
+    assert stats["cancelled"] == 1 and stats["running"] == 0
+
+
+def test_disconnect_cancels_generation_and_frees_slot():
+    scheduler = LLMScheduler(slots=1)
+    ticket = scheduler.submit(INTERACTIVE)
+    closed = threading.Event()
+    response = ndjson_stream(FakeRequest(after=2), llm_lines(ticket, closed), ticket)
+
+    async def consume():
+        return [line async for line in response.body_iterator]
+
+    lines = asyncio.run(consume())
+    assert len(lines) == 2
+    # cancel() виконується в окремому потоці, щоб не блокувати event loop
+    assert wait_for(closed.is_set)
+    assert ticket.cancelled
+    stats = scheduler.stats()
+    assert stats["cancelled"] == 1 and stats["running"] == 0
+
+
+def test_finished_stream_is_not_cancelled():
+    scheduler = LLMScheduler(slots=1)
+    ticket = scheduler.submit(INTERACTIVE)
+    closed = threading.Event()
+    lines = (f"{i}\n" for i in range(3))
+    response = ndjson_stream(FakeRequest(after=100), lines, ticket)
+
+    async def consume():
+        return [line async for line in response.body_iterator]
+
+    assert asyncio.run(consume()) == ["0\n", "1\n", "2\n"]
+    time.sleep(0.05)
+    assert not ticket.cancelled and scheduler.stats()["cancelled"] == 0